@@ -0,0 +1,279 @@
+"""Micro-benchmarks of every group operation, with and without Jacobians.
+
+Run with `python bench.py` (or `python -m bench`) from the repository root.
+Every case is timed on the scalar classes and on the batch classes and
+reports the time per call, the time per element (a scalar call is one
+element), the throughput in elements per second and the peak number of
+bytes allocated during one call as traced by tracemalloc. --memory adds the
+bytes held by one instance of each scalar class and --chains times products
+of chains of transforms with the quaternion SE3 against the 4x4 SE3Matrix
+for several chain lengths. With --json the
+results are written keyed by group/path/operation/jacobian so that the files
+of two commits can be diffed, and --compare prints the cases that slowed
+down relative to such a file.
+
+Each operation is repeated on the same operands, as in a measurement model
+that evaluates many residuals on one pose, so memoized quantities (R, Adj
+and the inverse) are served from the cache after the first call.
+"""
+import argparse
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from so2 import SO2, SO2Batch
+from se2 import SE2, SE2Batch
+from so3 import SO3, SO3Batch
+from quaternion import Quaternion, QuaternionBatch
+from se3 import SE3, SE3Batch
+from dual_quaternion import DualQuaternionSE3, DualQuaternionSE3Batch
+from se3_matrix import SE3Matrix, compose_chain
+from complex_se2 import ComplexSO2, ComplexSE2
+from products import cumulative_compose, product
+
+# name: (scalar class, batch class, dof, action, dimension of the acted on vectors)
+GROUPS = {'SO2': (SO2, SO2Batch, 1, 'rota', 2),
+          'SE2': (SE2, SE2Batch, 3, 'transa', 2),
+          'SO3': (SO3, SO3Batch, 3, 'rota', 3),
+          'Quaternion': (Quaternion, QuaternionBatch, 3, 'rota', 3),
+          'SE3': (SE3, SE3Batch, 6, 'transa', 3)}
+
+UNARY = (None, 'Jr', 'Jl')
+BINARY = (None, 'Jr', 'Jl', 'Jr2', 'Jl2')
+BOXMINUS = (None, 'Jr1', 'Jl1', 'Jr2', 'Jl2')
+
+def _tangent(name, dof, n, rng):
+    # Rotation parts are kept inside the ball of radius pi/2 so Log(Exp(xi)) = xi
+    shape = () if dof == 1 else (dof,)
+    xi = rng.uniform(-1.0, 1.0, size=shape if n is None else (n, *shape))
+    if name in ('SO3', 'Quaternion'):
+        xi *= 0.9
+    return xi
+
+def cases(name, batch_size, rng):
+    """Yields (path, op, jacobian, n, fn) for every benchmarked call of a group."""
+    scalar, batch, dof, action, vdim = GROUPS[name]
+    I = 1.0 if dof == 1 else np.eye(dof)
+    for path, G, n in (('scalar', scalar, None), ('batch', batch, batch_size)):
+        xi, xi2 = _tangent(name, dof, n, rng), _tangent(name, dof, n, rng)
+        X, Y = G.Exp(xi), G.Exp(xi2)
+        v = rng.uniform(-10.0, 10.0, size=vdim if n is None else (n, vdim))
+        elems = 1 if n is None else n
+
+        def call(fn, *args, jac=None, **kwargs):
+            # The operands are bound now, so a case still runs on them after the loop has moved on
+            if jac is not None:
+                kwargs[jac] = I
+            return functools.partial(fn, *args, **kwargs)
+
+        for jac in UNARY:
+            yield path, 'Exp', jac, elems, call(G.Exp, xi, jac=jac)
+            yield path, 'Log', jac, elems, call(G.Log, X, jac=jac)
+            yield path, 'inv', jac, elems, call(X.inv, jac=jac)
+            yield path, action, jac, elems, call(getattr(X, action), v, jac=jac)
+            yield path, 'boxplusr', jac, elems, call(X.boxplusr, xi2, jac=jac)
+            yield path, 'boxplusl', jac, elems, call(X.boxplusl, xi2, jac=jac)
+        for jac in BINARY:
+            yield path, 'compose', jac, elems, call(X.compose, Y, jac=jac)
+        for jac in BOXMINUS:
+            yield path, 'boxminusr', jac, elems, call(X.boxminusr, Y, jac=jac)
+            yield path, 'boxminusl', jac, elems, call(X.boxminusl, Y, jac=jac)
+        if path == 'batch': # All prefix products of the batch, see products.py
+            yield path, 'cumulative_compose', None, elems, call(cumulative_compose, X)
+            yield path, 'product', None, elems, call(product, X)
+        if G in (SE2, SE3): # One pose applied to a whole point cloud
+            cloud = rng.uniform(-10.0, 10.0, size=(batch_size, vdim))
+            for jac in UNARY:
+                yield path, 'transa_cloud', jac, batch_size, call(X.transa, cloud, jac=jac)
+        if G in (SO3, Quaternion, SE2, SE3): # Writing into preallocated outputs, see workspace.py
+            out, v_out = G.Identity(), np.empty(dof)
+            yield path, 'compose_out', None, elems, call(X.compose, Y, out=out)
+            yield path, 'inv_out', None, elems, call(X.inv, out=out)
+            yield path, 'Exp_out', None, elems, call(G.Exp, xi, out=out)
+            yield path, 'Log_out', None, elems, call(G.Log, X, out=v_out)
+        if G in (SE3, SE3Batch): # The dual quaternion representation against SE3, see dual_quaternion.py
+            DQ = DualQuaternionSE3 if G is SE3 else DualQuaternionSE3Batch
+            A, B = DQ.fromSE3(X), DQ.fromSE3(Y)
+            yield path, 'interpolate', None, elems, lambda X=X, Y=Y, G=G: X * G.Exp(0.3 * G.Log(X.inv() * Y))
+            yield path, 'dq_compose', None, elems, call(A.__mul__, B)
+            yield path, 'dq_inv', None, elems, call(A.inv)
+            yield path, 'dq_transa', None, elems, call(A.transa, v)
+            yield path, 'dq_sclerp', None, elems, call(A.sclerp, B, 0.3)
+        if G in (SO2, SO2Batch, SE2, SE2Batch): # The complex number representation, see complex_se2.py
+            C = ComplexSO2.fromSO2 if name == 'SO2' else ComplexSE2.fromSE2
+            A, B = C(X), C(Y)
+            yield path, 'cx_compose', None, elems, call(A.__mul__, B)
+            yield path, 'cx_inv', None, elems, call(A.inv)
+            yield path, f'cx_{action}', None, elems, call(getattr(A, action), v)
+        if G is Quaternion: # Closed form kernels writing into preallocated buffers
+            q_out, v_out = np.empty(4), np.empty(3)
+            yield path, 'otimes_out', None, elems, call(X.otimes, Y, out=q_out)
+            yield path, 'rota_out', None, elems, call(X.rota, v, out=v_out)
+
+def measure(fn, min_time=0.02, repeat=5):
+    """Returns (seconds per call, peak bytes allocated during one call)."""
+    fn() # Warm up caches and lazily imported code
+    start = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - start, 1e-7)
+    number = max(1, int(min_time / single))
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return best, peak
+
+def run(groups=tuple(GROUPS), ops=None, paths=('scalar', 'batch'), batch_size=1000,
+        min_time=0.02, repeat=5, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    for name in groups:
+        for path, op, jac, n, fn in cases(name, batch_size, rng):
+            if path not in paths or (ops is not None and op not in ops):
+                continue
+            seconds, peak = measure(fn, min_time, repeat)
+            key = f'{name}/{path}/{op}/{jac or "none"}'
+            results[key] = {'group': name, 'path': path, 'op': op, 'jacobian': jac, 'n': n,
+                            'ns_per_op': seconds * 1e9,
+                            'ns_per_element': seconds * 1e9 / n,
+                            'elements_per_s': n / seconds,
+                            'peak_bytes_per_op': peak}
+    return results
+
+def memory(groups=tuple(GROUPS), n=10000, seed=0):
+    """Returns the bytes per instance of the scalar class of each group.
+
+    n elements are built with Exp and kept alive, and the memory they hold (the
+    object, its arrays and its cache) is traced by tracemalloc.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+    for name in groups:
+        scalar, _, dof, _, _ = GROUPS[name]
+        xi = list(_tangent(name, dof, n, rng))
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        elements = [scalar.Exp(x) for x in xi]
+        size = tracemalloc.get_traced_memory()[0] - base - sys.getsizeof(elements)
+        tracemalloc.stop()
+        results[name] = size / len(elements)
+    return results
+
+def chains(lengths=(2, 8, 32, 128, 512), batch_size=1000, min_time=0.02, repeat=5, seed=0):
+    """Returns the ns per chain product keyed by backend/length, see se3_matrix.py.
+
+    A chain of n random poses is multiplied left to right with SE3 and with
+    SE3Matrix, and with compose_chain. The batch cases multiply batch_size
+    chains at once, as SE3Batch products and as one stacked compose_chain.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+    for n in lengths:
+        Ts = [SE3.random(rng=rng) for i in range(n)]
+        Ms = [SE3Matrix.fromSE3(T) for T in Ts]
+        batches = [SE3Batch.random(batch_size, rng) for i in range(n)]
+        stack = np.zeros((batch_size, n, 4, 4)) # (B,N,4,4), chain b is stack[b]
+        for i, Tb in enumerate(batches):
+            stack[:,i,:3,:3], stack[:,i,:3,3], stack[:,i,3,3] = Tb.R, Tb.t, 1.0
+
+        def product(elements):
+            def fn():
+                res = elements[0]
+                for T in elements[1:]:
+                    res = res * T
+                return res
+            return fn
+
+        for backend, fn in (('SE3', product(Ts)),
+                            ('SE3Matrix', product(Ms)),
+                            ('compose_chain', lambda Ms=Ms: compose_chain(Ms)),
+                            ('SE3Batch', product(batches)),
+                            ('compose_chain_batch', lambda stack=stack: compose_chain(stack))):
+            results[f'{backend}/{n}'] = measure(fn, min_time, repeat)[0] * 1e9
+    return results
+
+def metadata(batch_size):
+    return {'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'batch_size': batch_size}
+
+def compare(results, baseline, threshold):
+    """Returns (key, ratio) for the cases at least threshold times slower than baseline."""
+    slower = []
+    for key, res in results.items():
+        if key in baseline:
+            ratio = res['ns_per_op'] / baseline[key]['ns_per_op']
+            if ratio >= threshold:
+                slower.append((key, ratio))
+    return sorted(slower, key=lambda item: -item[1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--groups', nargs='+', choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument('--ops', nargs='+', help="Only run these operations (e.g. Exp compose)")
+    parser.add_argument('--paths', nargs='+', choices=['scalar', 'batch'], default=['scalar', 'batch'])
+    parser.add_argument('-n', '--batch-size', type=int, default=1000)
+    parser.add_argument('--min-time', type=float, default=0.02, help="Seconds per timing repeat")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true', help="Also report the bytes per scalar instance")
+    parser.add_argument('--chains', nargs='*', type=int,
+                        help="Also time chain products of these lengths (default 2 8 32 128 512)")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--compare', help="Results file of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Slowdown ratio reported by --compare")
+    args = parser.parse_args(argv)
+
+    results = run(args.groups, args.ops, args.paths, args.batch_size, args.min_time, args.repeat, args.seed)
+
+    print(f'{"case":<40} {"ns/op":>12} {"ns/elem":>10} {"elem/s":>12} {"bytes/op":>10}')
+    for key, res in results.items():
+        print(f'{key:<40} {res["ns_per_op"]:>12.0f} {res["ns_per_element"]:>10.1f} '
+              f'{res["elements_per_s"]:>12.3g} {res["peak_bytes_per_op"]:>10d}')
+
+    output = {'meta': metadata(args.batch_size), 'results': results}
+    if args.memory:
+        output['memory'] = memory(args.groups, seed=args.seed)
+        print(f'\n{"group":<40} {"bytes/instance":>14}')
+        for name, size in output['memory'].items():
+            print(f'{name:<40} {size:>14.0f}')
+
+    if args.chains is not None:
+        lengths = args.chains or (2, 8, 32, 128, 512)
+        output['chains'] = chains(lengths, args.batch_size, args.min_time, args.repeat, args.seed)
+        print(f'\n{"chain":<40} {"ns/chain":>14}')
+        for key, ns in output['chains'].items():
+            print(f'{key:<40} {ns:>14.0f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.threshold)
+        for key, ratio in slower:
+            print(f'SLOWER {key}: {ratio:.2f}x')
+        return 1 if slower else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
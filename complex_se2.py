@@ -0,0 +1,209 @@
+"""SO2 as unit complex numbers and SE2 as pairs (rotation, translation) of them.
+
+A rotation by theta is z = cos(theta) + i sin(theta) and a pose is (z, t)
+with the translation t = x + i y. Composition is complex multiplication,
+(z1, t1)(z2, t2) = (z1 z2, t1 + z1 t2), and the inverse is (z*, -z* t).
+Every element wraps numpy complex arrays, of shape () for a single element
+or (N,) for N of them, so the same class covers the scalar and batch cases.
+They convert to and from SO2/SO2Batch and SE2/SE2Batch with fromSO2/toSO2
+and fromSE2/toSE2. Jacobians are left to those classes.
+"""
+import numpy as np
+from so2 import SO2, SO2Batch, wrap
+from se2 import SE2, SE2Batch
+
+def _complex(v): # x + i y of (..., 2) points
+    if v.ndim == 1:
+        return complex(v[0], v[1])
+    return v[...,0] + 1j * v[...,1]
+
+def _points(z): # (..., 2) points of complex numbers
+    if np.ndim(z) == 0:
+        return np.array([z.real, z.imag])
+    return np.stack([z.real, z.imag], axis=-1)
+
+def _exp_coefficient(theta):
+    # V = A + i B of SE2.Exp as one complex number, A = sin/theta and B = (1 - cos)/theta
+    small = np.abs(theta) <= 1e-8
+    theta_ = np.where(small, 1.0, theta)
+    A = np.where(small, 1 - theta**2 / 6.0, np.sin(theta_) / theta_)
+    B = np.where(small, theta / 2.0 - theta**3 / 24.0, (1 - np.cos(theta_)) / theta_)
+    return A + 1j * B
+
+class ComplexSO2:
+    __slots__ = ('z',)
+
+    def __init__(self, z):
+        self.z = np.asarray(z, dtype=complex)
+
+    @classmethod
+    def fromAngle(cls, theta):
+        return cls(np.exp(1j * np.asarray(theta, dtype=float)))
+
+    @classmethod
+    def fromSO2(cls, R):
+        if isinstance(R, SO2Batch):
+            return cls.fromAngle(R.theta)
+        return cls(R.arr[0,0] + 1j * R.arr[1,0])
+
+    def toSO2(self): # An SO2 for a single element and an SO2Batch otherwise
+        if self.z.ndim == 0:
+            c, s = self.z.real, self.z.imag
+            return SO2._unchecked(np.array([[c, -s], [s, c]]))
+        return SO2Batch(self.angle)
+
+    @property
+    def angle(self):
+        return np.angle(self.z)
+
+    @property
+    def R(self): # (..., 2, 2) rotation matrices
+        c, s = self.z.real, self.z.imag
+        return np.stack([np.stack([c, -s], axis=-1), np.stack([s, c], axis=-1)], axis=-2)
+
+    def __len__(self):
+        return len(self.z)
+
+    def __getitem__(self, i):
+        return ComplexSO2(self.z[i])
+
+    def __mul__(self, R2):
+        assert isinstance(R2, ComplexSO2)
+        return ComplexSO2(self.z * R2.z)
+
+    def __str__(self):
+        return str(self.z)
+
+    def __repr__(self):
+        return f'ComplexSO2({self.z})'
+
+    def compose(self, R2):
+        return self * R2
+
+    def inv(self):
+        return ComplexSO2(self.z.conj())
+
+    def rota(self, v): # v is (2,) or (N,2)
+        return _points(self.z * _complex(v))
+
+    def rotp(self, v):
+        return _points(self.z.conj() * _complex(v))
+
+    def normalize(self):
+        self.z = self.z / np.abs(self.z)
+
+    def isValidRotation(self):
+        return np.abs(np.abs(self.z) - 1.0) <= 1e-8
+
+    @staticmethod
+    def Identity(n=None):
+        return ComplexSO2(np.ones(() if n is None else n, dtype=complex))
+
+    @classmethod
+    def random(cls, n=None, rng=None):
+        rng = np.random if rng is None else rng
+        return cls.fromAngle(rng.uniform(-np.pi, np.pi, size=n))
+
+    @classmethod
+    def Exp(cls, theta):
+        return cls.fromAngle(theta)
+
+    @staticmethod
+    def Log(R):
+        return R.angle
+
+
+class ComplexSE2:
+    __slots__ = ('z', 't')
+
+    def __init__(self, z, t):
+        # z is the rotation and t = x + i y the translation, complex arrays of one shape
+        self.z = np.asarray(z, dtype=complex)
+        self.t = np.asarray(t, dtype=complex)
+
+    @classmethod
+    def fromAngleAndt(cls, theta, t): # t is (2,) or (N,2)
+        return cls(np.exp(1j * np.asarray(theta, dtype=float)), _complex(np.asarray(t, dtype=float)))
+
+    @classmethod
+    def fromSE2(cls, T):
+        if isinstance(T, SE2Batch):
+            return cls.fromAngleAndt(T.theta, T.t)
+        return cls(T.arr[0,0] + 1j * T.arr[1,0], T.arr[0,2] + 1j * T.arr[1,2])
+
+    def toSE2(self): # An SE2 for a single element and an SE2Batch otherwise
+        if self.z.ndim == 0:
+            c, s, x, y = self.z.real, self.z.imag, self.t.real, self.t.imag
+            return SE2._unchecked(np.array([[c, -s, x], [s, c, y], [0.0, 0.0, 1.0]]))
+        return SE2Batch(np.column_stack([self.t.real, self.t.imag, self.angle]))
+
+    @property
+    def angle(self):
+        return np.angle(self.z)
+
+    @property
+    def rotation(self):
+        return ComplexSO2(self.z)
+
+    @property
+    def translation(self): # (..., 2) translations
+        return _points(self.t)
+
+    def __len__(self):
+        return len(self.z)
+
+    def __getitem__(self, i):
+        return ComplexSE2(self.z[i], self.t[i])
+
+    def __mul__(self, T2):
+        assert isinstance(T2, ComplexSE2)
+        return ComplexSE2(self.z * T2.z, self.t + self.z * T2.t)
+
+    def __str__(self):
+        return f'{self.z} {self.t}'
+
+    def __repr__(self):
+        return f'ComplexSE2({self.z}, {self.t})'
+
+    def compose(self, T2):
+        return self * T2
+
+    def inv(self):
+        z_inv = self.z.conj()
+        return ComplexSE2(z_inv, -z_inv * self.t)
+
+    def transa(self, v): # v is (2,) or (N,2)
+        return _points(self.z * _complex(v) + self.t)
+
+    def transp(self, v):
+        return _points(self.z.conj() * (_complex(v) - self.t))
+
+    def normalize(self):
+        self.z = self.z / np.abs(self.z)
+
+    def isValidTransform(self):
+        return np.abs(np.abs(self.z) - 1.0) <= 1e-8
+
+    @staticmethod
+    def Identity(n=None):
+        shape = () if n is None else n
+        return ComplexSE2(np.ones(shape, dtype=complex), np.zeros(shape, dtype=complex))
+
+    @classmethod
+    def random(cls, n=None, rng=None):
+        rng = np.random if rng is None else rng
+        theta = rng.uniform(-np.pi, np.pi, size=n)
+        t = rng.uniform(-5, 5, size=(2,) if n is None else (n,2))
+        return cls.fromAngleAndt(theta, t)
+
+    @classmethod
+    def Exp(cls, vec): # vec is (3,) or (N,3) ordered [x, y, theta] as SE2.Exp
+        vec = np.asarray(vec, dtype=float)
+        theta = vec[...,2]
+        return cls(np.exp(1j * theta), _exp_coefficient(theta) * (vec[...,0] + 1j * vec[...,1]))
+
+    @staticmethod
+    def Log(T): # Returns (3,) or (N,3) [x, y, theta] with theta wrapped to [-pi, pi)
+        theta = wrap(T.angle)
+        v = T.t / _exp_coefficient(theta)
+        return np.stack([v.real, v.imag, theta], axis=-1)
@@ -0,0 +1,266 @@
+"""SE3 as unit dual quaternions r + eps d with d = 1/2 (0, t) r.
+
+Composition is the dual quaternion product and the inverse is the (double)
+conjugate, and both convert to and from SE3 through the [t, q] 7-vector
+(from7vec / T). ScLERP interpolates along the screw motion between two poses,
+which is the SE3 geodesic T1 Exp(tau Log(T1^-1 T2)).
+"""
+import math
+import numpy as np
+import validation
+from quaternion import hamilton, rotate, _rotate_floats, CONJUGATE
+from se3 import SE3, SE3Batch
+
+DUAL_CONJUGATE = np.tile(CONJUGATE, 2) # r* + eps d*
+
+def _qmul(pw, px, py, pz, qw, qx, qy, qz): # Hamilton product on python floats
+    return (pw*qw - px*qx - py*qy - pz*qz,
+            pw*qx + px*qw + py*qz - pz*qy,
+            pw*qy + py*qw + pz*qx - px*qz,
+            pw*qz + pz*qw + px*qy - py*qx)
+
+def _compose_floats(a, b):
+    # (r1 + eps d1)(r2 + eps d2) = r1 r2 + eps (r1 d2 + d1 r2) on python floats, canonicalized to rw >= 0
+    r = _qmul(*a[:4], *b[:4])
+    d1, d2 = _qmul(*a[:4], *b[4:]), _qmul(*a[4:], *b[:4])
+    dq = (*r, d1[0] + d2[0], d1[1] + d2[1], d1[2] + d2[2], d1[3] + d2[3])
+    return dq if r[0] >= 0 else tuple(-x for x in dq)
+
+def _translation_floats(a): # t = 2 (d r*)_v on python floats
+    _, x, y, z = _qmul(*a[4:], a[0], -a[1], -a[2], -a[3])
+    return 2*x, 2*y, 2*z
+
+def _power_floats(a, tau):
+    # a^tau of a unit dual quaternion on python floats. With phi the half angle of r,
+    # k = sin(tau phi)/sin(phi) and c = (tau cos(tau phi) - k cos(phi))/sin(phi)^2
+    # r' = (cos(tau phi), k rv) and d' = (tau k dw, k dv - c dw rv)
+    rw, rx, ry, rz, dw, dx, dy, dz = a
+    s = math.sqrt(rx*rx + ry*ry + rz*rz)
+    phi = math.atan2(s, rw)
+    if phi > 1e-3:
+        k = math.sin(tau * phi) / s
+        c = (tau * math.cos(tau * phi) - k * rw) / s**2
+    else:
+        k = tau * (1 + (1 - tau**2) * phi**2 / 6)
+        c = tau * (1 - tau**2) / 3
+    return (math.cos(tau * phi), k*rx, k*ry, k*rz,
+            tau * k * dw, k*dx - c*dw*rx, k*dy - c*dw*ry, k*dz - c*dw*rz)
+
+def _from7vec(arr): # (..., 8) dual quaternions of (..., 7) [t, q] arrays with qw >= 0
+    t, q = arr[...,:3], arr[...,3:]
+    d = 0.5 * hamilton(np.concatenate([np.zeros(t.shape[:-1] + (1,)), t], axis=-1), q)
+    return np.concatenate([q, d], axis=-1)
+
+def _translation(dq): # (..., 3) translations 2 (d r*)_v of (..., 8) dual quaternions
+    return 2 * hamilton(dq[...,4:], dq[...,:4] * CONJUGATE)[...,1:]
+
+class DualQuaternionSE3:
+    __slots__ = ('arr',) # [rw, rx, ry, rz, dw, dx, dy, dz]
+
+    def __init__(self, arr, copy=True):
+        # arr is copied unless copy=False. A real part with rw < 0 is flipped into a fresh array
+        if validation.enabled:
+            assert arr.shape == (8,)
+        if copy or arr[0] < 0:
+            arr = np.array(arr, dtype=float) if arr[0] >= 0 else -arr
+        self.arr = arr
+
+    @classmethod
+    def _unchecked(cls, arr): # Wraps a canonical (8,) array and skips the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = arr
+        return obj
+
+    @classmethod
+    def from7vec(cls, arr):
+        return cls._unchecked(_from7vec(SE3.from7vec(arr).T))
+
+    @classmethod
+    def fromSE3(cls, T):
+        return cls._unchecked(_from7vec(T.arr))
+
+    def toSE3(self):
+        return SE3._unchecked(self.T)
+
+    @property
+    def T(self): # [t, q] as in SE3.T
+        return np.concatenate([self.t, self.real])
+
+    @property
+    def real(self):
+        return self.arr[:4]
+
+    @property
+    def dual(self):
+        return self.arr[4:]
+
+    @property
+    def t(self):
+        return np.array(_translation_floats(self.arr.tolist()))
+
+    @property
+    def R(self):
+        return self.toSE3().R
+
+    def __mul__(self, other):
+        if isinstance(other, DualQuaternionSE3Batch):
+            return DualQuaternionSE3Batch._fromProduct(self.arr, other.arr)
+        if validation.enabled:
+            assert isinstance(other, DualQuaternionSE3)
+        return DualQuaternionSE3._unchecked(np.array(_compose_floats(self.arr.tolist(), other.arr.tolist())))
+
+    def __str__(self):
+        return str(self.arr)
+
+    def __repr__(self):
+        return f'DualQuaternionSE3({self.arr})'
+
+    def compose(self, other):
+        return self * other
+
+    def inv(self): # The conjugate r* + eps d* of a unit dual quaternion
+        return DualQuaternionSE3._unchecked(self.arr * DUAL_CONJUGATE)
+
+    def transa(self, v): # v is (3,) or an (N,3) point cloud
+        a = self.arr.tolist()
+        tx, ty, tz = _translation_floats(a)
+        if v.ndim == 2:
+            return rotate(self.real, v) + np.array([tx, ty, tz])
+        x, y, z = _rotate_floats(*a[:4], *v.tolist())
+        return np.array([x + tx, y + ty, z + tz])
+
+    def transp(self, v):
+        return self.inv().transa(v)
+
+    def sclerp(self, other, tau):
+        """Screw linear interpolation, self at tau = 0 and other at tau = 1."""
+        delta = _compose_floats(self.inv().arr.tolist(), other.arr.tolist())
+        return DualQuaternionSE3._unchecked(np.array(_compose_floats(self.arr.tolist(), _power_floats(delta, tau))))
+
+    def normalize(self):
+        # Rescales r to unit length and removes the component of d along r (r . d = 0)
+        r, d = self.real / np.linalg.norm(self.real), self.dual / np.linalg.norm(self.real)
+        self.arr = np.concatenate([r, d - (r @ d) * r])
+
+    def isValidTransform(self):
+        r, d = self.real, self.dual
+        return np.abs(r @ r - 1.0) <= 1e-8 and np.abs(r @ d) <= 1e-8
+
+    @staticmethod
+    def Identity():
+        return DualQuaternionSE3._unchecked(np.array([1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]))
+
+    @classmethod
+    def random(cls, rng=None):
+        return cls.fromSE3(SE3.random(rng=rng))
+
+
+class DualQuaternionSE3Batch:
+    """N dual quaternions stored as one (N,8) array laid out like DualQuaternionSE3.arr.
+
+    Mirrors the DualQuaternionSE3 API with every operation vectorized over the
+    first axis. Operations broadcast against a single DualQuaternionSE3.
+    """
+    def __init__(self, arr):
+        arr = np.asarray(arr, dtype=float)
+        assert arr.ndim == 2 and arr.shape[1] == 8
+        neg = arr[:,0] < 0
+        if np.any(neg):
+            arr = np.where(neg[:,None], -arr, arr)
+        self.arr = np.ascontiguousarray(arr)
+
+    @classmethod
+    def _fromProduct(cls, a, b): # Batch of the products of (..., 8) arrays a and b
+        r = hamilton(a[...,:4], b[...,:4])
+        d = hamilton(a[...,:4], b[...,4:]) + hamilton(a[...,4:], b[...,:4])
+        return cls(np.atleast_2d(np.concatenate([r, d], axis=-1)))
+
+    @classmethod
+    def from7vec(cls, arr):
+        return cls.fromSE3(SE3Batch(arr))
+
+    @classmethod
+    def fromSE3(cls, T):
+        return cls(_from7vec(T.arr))
+
+    def toSE3(self):
+        return SE3Batch(self.T)
+
+    @classmethod
+    def fromList(cls, dqs):
+        return cls(np.array([dq.arr for dq in dqs]))
+
+    @staticmethod
+    def Identity(n):
+        return DualQuaternionSE3Batch(np.tile(DualQuaternionSE3.Identity().arr, (n,1)))
+
+    @classmethod
+    def random(cls, n, rng=None):
+        return cls.fromSE3(SE3Batch.random(n, rng))
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return DualQuaternionSE3._unchecked(self.arr[i].copy())
+        return DualQuaternionSE3Batch(self.arr[i])
+
+    @property
+    def T(self): # (N,7) [t, q] as in SE3Batch.arr
+        return np.concatenate([self.t, self.real], axis=1)
+
+    @property
+    def real(self):
+        return self.arr[:,:4]
+
+    @property
+    def dual(self):
+        return self.arr[:,4:]
+
+    @property
+    def t(self):
+        return _translation(self.arr)
+
+    def __mul__(self, other):
+        assert isinstance(other, (DualQuaternionSE3, DualQuaternionSE3Batch))
+        return DualQuaternionSE3Batch._fromProduct(self.arr, other.arr)
+
+    def compose(self, other):
+        return self * other
+
+    def inv(self):
+        return DualQuaternionSE3Batch(self.arr * DUAL_CONJUGATE)
+
+    def transa(self, v): # v is (3,) or (N,3)
+        return rotate(self.real, v) + self.t
+
+    def transp(self, v):
+        return self.inv().transa(v)
+
+    def sclerp(self, other, tau):
+        """Screw linear interpolation, self at tau = 0 and other at tau = 1.
+
+        other is a DualQuaternionSE3 or a batch of the same length and tau is a
+        scalar or an (N,) array.
+        """
+        delta = (self.inv() * other).arr
+        tau = np.asarray(tau, dtype=float)[...,None] if np.ndim(tau) else float(tau)
+        rw, rv, dw, dv = delta[:,:1], delta[:,1:4], delta[:,4:5], delta[:,5:]
+        s = np.linalg.norm(rv, axis=1, keepdims=True)
+        phi = np.arctan2(s, rw)
+        small = phi <= 1e-3
+        s_ = np.where(small, 1.0, s)
+        k = np.where(small, tau * (1 + (1 - tau**2) * phi**2 / 6), np.sin(tau * phi) / s_)
+        c = np.where(small, tau * (1 - tau**2) / 3, (tau * np.cos(tau * phi) - k * rw) / s_**2)
+        power = np.concatenate([np.cos(tau * phi), k * rv, tau * k * dw, k * dv - c * dw * rv], axis=1)
+        return DualQuaternionSE3Batch._fromProduct(self.arr, power)
+
+    def normalize(self):
+        norm = np.linalg.norm(self.real, axis=1, keepdims=True)
+        r, d = self.real / norm, self.dual / norm
+        self.arr = np.concatenate([r, d - np.sum(r * d, axis=1, keepdims=True) * r], axis=1)
+
+    def isValidTransform(self):
+        r, d = self.real, self.dual
+        return (np.abs(np.sum(r * r, axis=1) - 1.0) <= 1e-8) & (np.abs(np.sum(r * d, axis=1)) <= 1e-8)
@@ -0,0 +1,195 @@
+import numpy as np
+
+# Below this angle the closed form coefficients cancel catastrophically so
+# the Taylor series (accurate to machine precision up to here) is used instead
+TAYLOR_THRESHOLD = 1e-1
+
+def so3_coefficients(theta, se3=False):
+    """Coefficients shared by the SO3/SE3 exponential, logarithm and Jacobians.
+
+    Evaluates sin/cos once for an array of angles and returns
+        A = sin(t)/t, B = (1 - cos(t))/t^2, C = (t - sin(t))/t^3,
+        D = (1 - A/(2B))/t^2
+    so that Exp = I + A W + B W^2, Jl = I + B W + C W^2 and
+    Jl^-1 = I - W/2 + D W^2. With se3=True the two extra coefficients of the
+    Q block of the SE3 Jacobians are appended:
+        c2 = (1 - t^2/2 - cos(t))/t^4, c3 = c2 - 3 (t - sin(t) - t^3/6)/t^5
+    The small angle branch is chosen per element with a mask.
+    """
+    small = theta < TAYLOR_THRESHOLD
+    th = np.where(small, 1.0, theta) # Keeps the unused branch finite
+    t2 = theta**2
+    t4 = t2**2
+    ct, st = np.cos(th), np.sin(th)
+
+    A = np.where(small, 1 - t2/6 + t4/120 - t2*t4/5040 + t4**2/362880, st/th)
+    B = np.where(small, 0.5 - t2/24 + t4/720 - t2*t4/40320 + t4**2/3628800, (1 - ct)/th**2)
+    C = np.where(small, 1/6 - t2/120 + t4/5040 - t2*t4/362880 + t4**2/39916800, (th - st)/th**3)
+    D = np.where(small, 1/12 + t2/720 + t4/30240 + t2*t4/1209600 + t4**2/47900160,
+                 (1 - th * st / (2 * np.where(small, 1.0, 1 - ct)))/th**2)
+    if not se3:
+        return A, B, C, D
+
+    c2 = np.where(small, -(1/24 - t2/720 + t4/40320 - t2*t4/3628800 + t4**2/479001600),
+                  (1 - th**2/2 - ct)/th**4)
+    d = np.where(small, -(1/120 - t2/5040 + t4/362880 - t2*t4/39916800 + t4**2/6227020800),
+                 (th - st - th**3/6)/th**5)
+    return A, B, C, D, c2, c2 - 3 * d
+
+def _check_which(which):
+    for name in which:
+        if name not in ('Jr', 'Jl'):
+            raise ValueError("Jacobians must be named 'Jr' or 'Jl'")
+
+def _batch_type(group):
+    # Imported here since every group module imports the kernels above
+    from so2 import SO2, SO2Batch
+    from se2 import SE2, SE2Batch
+    from so3 import SO3, SO3Batch
+    from quaternion import Quaternion, QuaternionBatch
+    from se3 import SE3, SE3Batch
+    batches = {SO2: SO2Batch, SE2: SE2Batch, SO3: SO3Batch, Quaternion: QuaternionBatch, SE3: SE3Batch}
+    if group in batches:
+        return batches[group], True
+    if group in batches.values():
+        return group, False
+    raise ValueError("Unknown group")
+
+def exp_with_jacobians(group, xi, which=('Jr', 'Jl')):
+    """Exp of a batch of tangent vectors together with the requested Jacobians.
+
+    group is one of the group classes (SO2, SE2, SO3, Quaternion, SE3) or
+    their batch counterparts and xi is an (N,dof) array. The map and all of
+    the Jacobians are evaluated in one pass that shares the trigonometric
+    terms and intermediate products. Returns (X, *jacobians) with the
+    Jacobians as (N,dof,dof) stacks (SO2's scalar Jacobians as (N,) arrays)
+    in the order given by which. Passing a scalar group class with a single
+    (dof,) vector returns a single element and (dof,dof) Jacobians.
+    """
+    _check_which(which)
+    batch, scalar = _batch_type(group)
+    single = scalar and np.ndim(xi) == (0 if batch.__name__ == 'SO2Batch' else 1)
+    xi = np.asarray(xi, dtype=float)
+    if single:
+        xi = xi[None]
+    X, jacs = batch._exp_jacobians(xi, which)
+    if single:
+        return (X[0], *[jacs[name][0] for name in which])
+    return (X, *[jacs[name] for name in which])
+
+def log_with_jacobians(group, X, which=('Jr', 'Jl')):
+    """Log of a batch of group elements together with the requested Jacobians.
+
+    The counterpart of exp_with_jacobians. X is a batch (or a single element
+    of a scalar group class) and the Jacobians are those of the Log map.
+    Returns (xi, *jacobians).
+    """
+    _check_which(which)
+    batch, scalar = _batch_type(group)
+    single = scalar and not isinstance(X, batch)
+    if single:
+        X = batch.fromList([X])
+    xi, jacs = batch._log_jacobians(X, which)
+    if single:
+        return (xi[0], *[jacs[name][0] for name in which])
+    return (xi, *[jacs[name] for name in which])
+
+def sample_gaussian(group, mean, cov, n, side='right', rng=None):
+    """Draws n samples of a concentrated Gaussian on a group.
+
+    The samples are mean (+) xi with xi ~ N(0, cov) on the tangent space, i.e.
+    mean * Exp(xi) for side='right' and Exp(xi) * mean for side='left'. All
+    tangent samples come from one Cholesky factorization of cov and are mapped
+    with one batched Exp and compose. Returns the batch counterpart of group.
+    rng is an np.random.Generator for reproducible draws.
+    """
+    if side not in ('right', 'left'):
+        raise ValueError("side must be 'right' or 'left'")
+    batch, _ = _batch_type(group)
+    rng = np.random if rng is None else rng
+    L = np.linalg.cholesky(np.atleast_2d(cov))
+    xi = rng.standard_normal((n, L.shape[0])) @ L.T
+    if L.shape[0] == 1: # SO2 tangent vectors are scalars
+        xi = xi[:,0]
+    E = batch.Exp(xi)
+    return mean * E if side == 'right' else E * mean
+
+class JacobianChain:
+    """Lazily evaluated product of Jacobian factors.
+
+    Passing Jr=True or Jl=True (or an existing chain) to any group operation
+    returns a JacobianChain instead of an array. The factors met while the
+    Jacobian propagates through nested calls (boxminus -> compose -> inv ->
+    Log) are recorded rather than multiplied, and identity factors are
+    skipped. The product is formed once, when it is read through .J or
+    np.asarray. Chains are immutable so a partial chain can be reused.
+    """
+    __array_ufunc__ = None # Makes ndarray @ chain defer to __rmatmul__
+
+    def __init__(self, factors=(), dim=None):
+        self.factors = tuple(factors)
+        self.dim = dim
+
+    def __rmatmul__(self, J):
+        return JacobianChain((J, *self.factors), self.dim)
+
+    def __matmul__(self, J):
+        if isinstance(J, JacobianChain):
+            return JacobianChain(self.factors + J.factors, self.dim or J.dim)
+        return JacobianChain((*self.factors, J), self.dim)
+
+    def __neg__(self):
+        return -1.0 * self
+
+    def __mul__(self, s):
+        assert np.ndim(s) == 0
+        if not self.factors:
+            return JacobianChain((s * np.eye(self.dim),), self.dim)
+        return JacobianChain((s * self.factors[0], *self.factors[1:]), self.dim)
+
+    __rmul__ = __mul__
+
+    def __len__(self):
+        return len(self.factors)
+
+    def __repr__(self):
+        return f'JacobianChain({len(self)} factors)'
+
+    @property
+    def J(self):
+        if not self.factors:
+            if self.dim is None:
+                raise ValueError("The dimension of an empty Jacobian chain is unknown")
+            return np.eye(self.dim)
+        if len(self.factors) > 2 and all(np.ndim(J) == 2 for J in self.factors):
+            return np.linalg.multi_dot(self.factors)
+        J = self.factors[0]
+        for factor in self.factors[1:]:
+            J = J @ factor
+        return J
+
+    def __array__(self, dtype=None, copy=None):
+        J = self.J
+        return J if dtype is None else J.astype(dtype)
+
+def _fill(out, values):
+    # Writes the values into the out buffer when one is given. A group element
+    # built on out shares it, so the buffer must not be reused while that element is alive
+    if out is None:
+        return np.array(values)
+    out[:] = values
+    return out
+
+def chain(J, Jin, dim=None):
+    """Propagates the incoming Jacobian Jin through the factor J.
+
+    J is None for an identity factor, in which case a chain is returned as is
+    and an array is copied, so the result never aliases the caller's Jin.
+    Jin=True starts a new JacobianChain; a chain records J lazily and an array
+    is multiplied eagerly.
+    """
+    if Jin is True:
+        Jin = JacobianChain(dim=dim if J is None else np.shape(J)[-1])
+    if J is None:
+        return Jin.copy() if isinstance(Jin, np.ndarray) else Jin
+    return J @ Jin
@@ -0,0 +1,99 @@
+"""Products of many group elements.
+
+cumulative_compose integrates a batch of increments into the trajectory of
+all their prefix products, T_k = T_{k-1} dT_k, for SO2Batch, SE2Batch,
+SO3Batch, QuaternionBatch and SE3Batch. Rather than composing the steps one
+after the other it runs a scan of depth log2(N), each level one vectorized
+product of the batch class, and can split long sequences across processes.
+
+product multiplies many elements in a balanced tree, which takes log2(N)
+vectorized levels and accumulates the rounding error of log2(N) products
+instead of N. It can renormalize every level and reports how far the
+products drifted from the group (the orthogonality error of rotation
+matrices and the norm error of quaternions).
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from so2 import SO2, SO2Batch
+from se2 import SE2, SE2Batch
+from so3 import SO3, SO3Batch
+from quaternion import Quaternion, QuaternionBatch
+from se3 import SE3, SE3Batch
+
+BATCHES = {SO2: SO2Batch, SE2: SE2Batch, SO3: SO3Batch, Quaternion: QuaternionBatch, SE3: SE3Batch}
+
+def _scan(X):
+    # Prefix products of the batch X. The products x_2k x_2k+1 of neighbouring pairs are scanned
+    # recursively, which gives the prefixes ending at odd indices, and the prefix ending at an
+    # even index 2k > 0 is the one ending at 2k - 1 times x_2k. Each level does one pass over the
+    # pairs and one over the even elements, so the whole scan composes fewer than 2N times
+    n = len(X)
+    if n < 2:
+        return X
+    if isinstance(X, SO2Batch): # Rotations in the plane commute and compose by adding angles
+        return SO2Batch(np.cumsum(X.arr))
+    odd = _scan(X[0:n-1:2] * X[1:n:2])
+    arr = np.empty_like(X.arr)
+    arr[0] = X.arr[0]
+    arr[1::2] = odd.arr
+    arr[2::2] = (odd[:(n-1)//2] * X[2:n:2]).arr
+    return type(X)(arr)
+
+def cumulative_compose(increments, start=None, processes=None):
+    """All prefix products of a batch of increments, as a batch of the same class.
+
+    Element k of the result is dT_0 dT_1 ... dT_k, or start dT_0 ... dT_k when
+    a start element (of the scalar class) is given. With processes > 1 the
+    batch is split into that many chunks which are scanned in a process pool.
+    The chunks are then joined by composing each one on the left with the
+    product of all chunks before it.
+    """
+    n = len(increments)
+    if processes is None or processes < 2 or n < 2 * processes:
+        res = _scan(increments)
+    else:
+        size = math.ceil(n / processes)
+        chunks = [increments[i:i+size] for i in range(0, n, size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = list(pool.map(_scan, chunks))
+        carry = chunks[0][-1]
+        for i in range(1, len(chunks)): # The fix-up pass, one vectorized product per chunk
+            chunks[i] = carry * chunks[i]
+            carry = chunks[i][-1]
+        res = type(increments)(np.concatenate([chunk.arr for chunk in chunks]))
+    return res if start is None or n == 0 else start * res
+
+def _deviation(X): # Largest distance of the elements of a batch from the group
+    if isinstance(X, SO3Batch):
+        return np.abs(X.arr @ X.arr.transpose(0,2,1) - np.eye(3)).max()
+    elif isinstance(X, QuaternionBatch):
+        return np.abs(X.norm() - 1.0).max()
+    elif isinstance(X, SE3Batch):
+        return np.abs(np.linalg.norm(X.q_arr, axis=1) - 1.0).max()
+    return 0.0 # SO2Batch and SE2Batch store angles, which never leave the group
+
+def product(elements, normalize=False):
+    """The product X_0 X_1 ... X_N-1 multiplied pairwise in a balanced tree.
+
+    elements is a batch or a list of elements of one scalar class. Each level
+    of the tree multiplies all neighbouring pairs with one product of the
+    batch class. With normalize=True the products of every level are
+    renormalized (the batch normalize). Returns (element, error) where error
+    is the largest deviation from the group of any product before it was
+    renormalized (the orthogonality error of SO3 and the quaternion norm
+    error of Quaternion and SE3, zero for SO2 and SE2). Raises a ValueError
+    when elements is empty.
+    """
+    if len(elements) == 0:
+        raise ValueError("product needs at least one element")
+    X = elements if type(elements) in BATCHES.values() else BATCHES[type(elements[0])].fromList(elements)
+    error = 0.0
+    while len(X) > 1:
+        n = len(X)
+        P = X[0:n-1:2] * X[1:n:2]
+        error = max(error, _deviation(P))
+        if normalize and hasattr(P, 'normalize'):
+            P.normalize()
+        X = P if n % 2 == 0 else type(X)(np.concatenate([P.arr, X.arr[n-1:]]))
+    return X[0], error
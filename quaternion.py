@@ -1,19 +1,168 @@
+import math
 import numpy as np
+import validation
+from jacobians import so3_coefficients, chain, sample_gaussian, _fill
 
 def skew(qv):
     return np.array([[0, -qv[2], qv[1]], [qv[2], 0, -qv[0]], [-qv[1], qv[0], 0]])
 
+def skew_batch(v): # Stack of skew matrices for an (..., 3) array of vectors
+    S = np.zeros(v.shape[:-1] + (3,3))
+    S[...,0,1] = -v[...,2]
+    S[...,0,2] = v[...,1]
+    S[...,1,0] = v[...,2]
+    S[...,1,2] = -v[...,0]
+    S[...,2,0] = -v[...,1]
+    S[...,2,1] = v[...,0]
+    return S
+
+def hamilton(p, q): # Hamilton product of (..., 4) arrays without building the 4x4 matrix
+    pw, pv = p[...,:1], p[...,1:]
+    qw, qv = q[...,:1], q[...,1:]
+    w = pw * qw - np.sum(pv * qv, axis=-1, keepdims=True)
+    v = pw * qv + qw * pv + np.cross(pv, qv)
+    return np.concatenate([w, v], axis=-1)
+
+def rotate(q, v): # Actively rotates (..., 3) vectors by (..., 4) quaternions
+    qw, qv = q[...,:1], q[...,1:]
+    t = 2 * np.cross(qv, v)
+    return v + qw * t + np.cross(qv, t)
+
+def rotation_matrix(q): # (..., 3, 3) rotation matrices from (..., 4) quaternions
+    qw, qv = q[...,0,None,None], q[...,1:]
+    return (2 * qw**2 - 1) * np.eye(3) + 2 * qw * skew_batch(qv) + 2 * qv[...,:,None] * qv[...,None,:]
+
+def quaternion_from_matrix(R):
+    # (..., 4) quaternions of (..., 3, 3) rotation matrices by Shepperd's method. The
+    # branch of Quaternion.fromRotationMatrix is selected per element with masks
+    R = np.asarray(R, dtype=float)
+    d = np.trace(R, axis1=-2, axis2=-1)
+    r00, r11, r22 = R[...,0,0], R[...,1,1], R[...,2,2]
+    c0 = d > 0
+    c1 = ~c0 & (r00 > r11) & (r00 > r22)
+    c2 = ~c0 & ~c1 & (r11 > r22)
+    cases = [c0, c1, c2] # The last branch is the default of np.select
+    s = 2 * np.sqrt(1 + np.select(cases, [d, r00 - r11 - r22, r11 - r00 - r22], r22 - r00 - r11))
+    a, b, c = (R[...,1,2] - R[...,2,1])/s, (R[...,2,0] - R[...,0,2])/s, (R[...,0,1] - R[...,1,0])/s
+    e, f, g = (R[...,1,0] + R[...,0,1])/s, (R[...,2,0] + R[...,0,2])/s, (R[...,2,1] + R[...,1,2])/s
+    q = np.stack([np.select(cases, [s/4, a, b], c),
+                  -np.select(cases, [a, s/4, e], f),
+                  -np.select(cases, [b, e, s/4], g),
+                  -np.select(cases, [c, f, g], s/4)], axis=-1)
+    return np.where(q[...,:1] < 0, -q, q)
+
+def quaternion_from_rpy(rpy): # (..., 4) quaternions from (..., 3) [phi, theta, psi], see Quaternion.fromRPY
+    half = 0.5 * np.asarray(rpy, dtype=float)
+    cp, sp = np.cos(half[...,0]), np.sin(half[...,0])
+    ct, st = np.cos(half[...,1]), np.sin(half[...,1])
+    cs, ss = np.cos(half[...,2]), np.sin(half[...,2])
+    q = np.stack([cs * ct * cp + ss * st * sp,
+                  cs * ct * sp - ss * st * cp,
+                  cs * st * cp + ss * ct * sp,
+                  ss * ct * cp - cs * st * sp], axis=-1)
+    return np.where(q[...,:1] < 0, -q, q)
+
+def quaternion_to_rpy(q): # (..., 3) [phi, theta, psi] of (..., 4) unit quaternions
+    qw, qx, qy, qz = q[...,0], q[...,1], q[...,2], q[...,3]
+    phi = np.arctan2(2 * (qw * qx + qy * qz), 1 - 2 * (qx**2 + qy**2))
+    theta = np.arcsin(np.clip(2 * (qw * qy - qz * qx), -1.0, 1.0))
+    psi = np.arctan2(2 * (qw * qz + qx * qy), 1 - 2 * (qy**2 + qz**2))
+    return np.stack([phi, theta, psi], axis=-1)
+
+CONJUGATE = np.array([1.0, -1.0, -1.0, -1.0])
+
+def _hamilton_floats(pw, px, py, pz, qw, qx, qy, qz):
+    # Closed form Hamilton product on python floats, w = pw qw - pv.qv, v = pw qv + qw pv + pv x qv,
+    # canonicalized to w >= 0
+    w = pw*qw - px*qx - py*qy - pz*qz
+    x = (pw*qx + px*qw) + (py*qz - pz*qy) # Grouped so that q * q.inv() is exactly the identity
+    y = (pw*qy + py*qw) + (pz*qx - px*qz)
+    z = (pw*qz + pz*qw) + (px*qy - py*qx)
+    if w < 0:
+        return -w, -x, -y, -z
+    return w, x, y, z
+
+def _rotate_floats(qw, qx, qy, qz, vx, vy, vz):
+    # v' = v + qw t + qv x t with t = 2 qv x v, on python floats
+    tx, ty, tz = 2 * (qy*vz - qz*vy), 2 * (qz*vx - qx*vz), 2 * (qx*vy - qy*vx)
+    return (vx + qw*tx + qy*tz - qz*ty,
+            vy + qw*ty + qz*tx - qx*tz,
+            vz + qw*tz + qx*ty - qy*tx)
+
+def _exp_floats(wx, wy, wz):
+    # Quaternion.exp on python floats, canonicalized to qw >= 0
+    theta = math.sqrt(wx*wx + wy*wy + wz*wz)
+    if theta > 1e-8:
+        qw, s = math.cos(theta/2), math.sin(theta/2) / theta
+    else:
+        qw, s = 1 - theta**2/8 + theta**4/46080, 1/2 - theta**2/48 + theta**4/3840
+    if qw < 0:
+        qw, s = -qw, -s
+    return qw, s*wx, s*wy, s*wz
+
+def _log_floats(qw, qx, qy, qz):
+    # Quaternion.log on python floats
+    theta = math.sqrt(qx*qx + qy*qy + qz*qz)
+    if theta > 1e-8:
+        s = 2 * math.atan2(theta, qw) / theta
+    else:
+        s = 2 * (1/qw - theta**2 / (3 * qw**3) + theta**4/(5 * qw**5))
+    return s*qx, s*qy, s*qz
+
 class Quaternion:
-    def __init__(self, q):
-        if isinstance(q, np.ndarray):
-            if q.shape == (4,) or q.shape == (4,1) or q.shape == (1,4):
-                self.arr = q.squeeze()
-                if self.arr[0] < 0:
-                    self.arr *= -1
-            else:
-                raise ValueError("Input must be a numpy array of length 4")
-        else:
+    __slots__ = ('_arr', '_cache')
+
+    def __init__(self, q, copy=True):
+        # q is copied unless copy=False, in which case the quaternion aliases it (see view).
+        # The caller's array is never negated: with copy=False a q with qw < 0 is
+        # canonicalized into a fresh buffer, so only then a copy is made
+        if validation.enabled and not (isinstance(q, np.ndarray) and q.shape in ((4,), (4,1), (1,4))):
             raise ValueError("Input must be a numpy array of length 4")
+        q = q.squeeze()
+        if copy:
+            q = np.array(q, dtype=float)
+            if q[0] < 0:
+                np.negative(q, out=q)
+        elif q[0] < 0:
+            q = -q
+        self.arr = q
+
+    @classmethod
+    def _unchecked(cls, q): # Internal results are (4,) arrays and skip the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = q if q[0] >= 0 else -q
+        return obj
+
+    @classmethod
+    def view(cls, q):
+        """Wraps a (4,) float array without copying or checking it.
+
+        The quaternion aliases q, so q must not be modified while the quaternion
+        is in use. A q with qw < 0 is canonicalized into a fresh buffer instead.
+        """
+        return cls._unchecked(q)
+
+    @property
+    def arr(self):
+        return self._arr
+
+    @arr.setter
+    def arr(self, q):
+        self._arr = q
+        self._cache = {} # Derived quantities (R, inverse) are memoized until arr is reassigned
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def _invalidate(self): # Drops the memoized values after arr is written in place
+        self._cache = {}
+
+    def _assign(self, q): # Overwrites the quaternion in place, for out= targets
+        self._arr[:] = q
+        self._invalidate()
+        return self
 
     @property
     def qw(self):
@@ -41,13 +190,20 @@ class Quaternion:
 
     @property
     def R(self): # This produces R (same R as passed in via rotation matrix)
-        return (2 * self.qw**2 - 1) * np.eye(3) + 2 * self.qw * skew(self.qv) + 2 * np.outer(self.qv, self.qv)
+        return self._cached('R', self._rotation_matrix).copy() # Callers may write into their copy
+
+    def _rotation_matrix(self):
+        R = (2 * self.qw**2 - 1) * np.eye(3) + 2 * self.qw * skew(self.qv) + 2 * np.outer(self.qv, self.qv)
+        R.flags.writeable = False # Private to the cache, R and Adj hand out copies
+        return R
 
     @property
     def Adj(self): # This produces R(q).T (R(q).T = R)
         return self.R
 
     def __mul__(self, q):
+        if isinstance(q, QuaternionBatch):
+            return QuaternionBatch(hamilton(self.q, q.q))
         return self.otimes(q)
 
     def __str__(self):
@@ -56,57 +212,65 @@ class Quaternion:
     def __repr__(self):
         return f'[{self.qw} + {self.qx}i + {self.qy}j + {self.qz}k]'
 
-    def otimes(self, q): # Does this do the wrong thing? R1*R2 = q2 * q1 if I'm not mistaken for quaternions
-        Q = np.block([[self.qw, -self.qv], [self.qv[:,None], self.qw * np.eye(3) + self.skew()]]) #Typo in Jame's stuff. See Quat for Err State KF. See if this actually is a typo
-        return Quaternion(Q @ q.q)
+    def otimes(self, q, out=None): # Does this do the wrong thing? R1*R2 = q2 * q1 if I'm not mistaken for quaternions
+        return Quaternion._unchecked(_fill(out, _hamilton_floats(*self.arr.tolist(), *q.arr.tolist())))
 
     def skew(self):
         qv = self.qv
         return skew(qv)
 
-    def inv(self, Jr=None, Jl=None):
+    def inv(self, Jr=None, Jl=None, out=None):
+        # out is a Quaternion that is overwritten with the inverse and returned
         if not Jr is None:
-            return Quaternion(np.array([self.qw, *(-self.qv)])), -self.Adj @ Jr
+            J = chain(-self.Adj, Jr) # Before out (possibly self) is overwritten
+        if out is None:
+            q_inv = self._cached('inv', self._inverse)
+        else:
+            qw, qx, qy, qz = self.arr.tolist()
+            q_inv = out._assign((qw, -qx, -qy, -qz))
+        if not Jr is None:
+            return q_inv, J
         elif not Jl is None:
-            q_inv = Quaternion(np.array([self.qw, *(-self.qv)]))
-            return q_inv, -q_inv.Adj @ Jl
-        return Quaternion(np.array([self.qw, -self.qx, -self.qy, -self.qz]))
+            return q_inv, chain(-q_inv.Adj, Jl)
+        return q_inv
 
-    def rota(self, v, Jr=None, Jl=None):
-        qw = self.qw
-        qv = self.qv
+    def _inverse(self):
+        return Quaternion._unchecked(self.arr * CONJUGATE)
 
-        t = 2 * skew(v) @ qv
-        vp = v - qw * t + skew(t) @ qv
+    def rota(self, v, Jr=None, Jl=None, out=None):
+        vp = _fill(out, _rotate_floats(*self.arr.tolist(), *v.tolist()))
         if not Jr is None:
             J = -self.R @ skew(v)
-            return vp, J @ Jr
+            return vp, chain(J, Jr)
         elif not Jl is None:
             J = -skew(vp)
-            return vp, J @ Jl
+            return vp, chain(J, Jl)
         else:
             return vp
 
-    def rotp(self, v, Jr=None, Jl=None):
+    def rotp(self, v, Jr=None, Jl=None, out=None):
         if not Jr is None:
             q_inv, J = self.inv(Jr=Jr)
-            vp, J = q_inv.rota(v, Jr=J)
+            vp, J = q_inv.rota(v, Jr=J, out=out)
             return vp, J
         elif not Jl is None:
             q_inv, J = self.inv(Jl=Jl)
-            vp, J = q_inv.rota(v, Jl=J)
+            vp, J = q_inv.rota(v, Jl=J, out=out)
             return vp, J
         else:
-            return self.inv().rota(v)
+            return self.inv().rota(v, out=out)
 
     def normalize(self):
-        self.arr = self.q / self.norm()
+        # In place, so whatever shares arr (e.g. the SE3 that q is a view of) sees the result
+        self.arr /= self.norm()
+        self._invalidate()
 
     def norm(self):
         return np.linalg.norm(self.q)
 
     def boxplusr(self, w, Jr=None, Jl=None):
-        assert w.size == 3
+        if validation.enabled:
+            assert w.size == 3
         if not Jr is None:
             q, J = Quaternion.Exp(w, Jr=Jr)
             return self.compose(q, Jr2=J)
@@ -117,7 +281,8 @@ class Quaternion:
             return self * Quaternion.Exp(w)
 
     def boxminusr(self, q, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(q, Quaternion)
+        if validation.enabled:
+            assert isinstance(q, Quaternion)
         if Jr1 is not None:
             dq, J = q.inv().compose(self, Jr2=Jr1)
             return Quaternion.Log(dq, Jr=J)
@@ -136,7 +301,8 @@ class Quaternion:
             return Quaternion.Log(q.inv() * self)
 
     def boxplusl(self, w, Jr=None, Jl=None):
-        assert w.size == 3
+        if validation.enabled:
+            assert w.size == 3
         if Jr is not None:
             q, J = Quaternion.Exp(w, Jr=Jr)
             return q.compose(self, Jr=J)
@@ -147,7 +313,8 @@ class Quaternion:
             return Quaternion.Exp(w) * self
 
     def boxminusl(self, q, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(q, Quaternion)
+        if validation.enabled:
+            assert isinstance(q, Quaternion)
         if Jr1 is not None:
             diff, J = self.compose(q.inv(), Jr=Jr1)
             return Quaternion.Log(diff, Jr=J)
@@ -165,27 +332,80 @@ class Quaternion:
         else:
             return Quaternion.Log(self * q.inv())
 
-    def compose(self, q, Jr=None, Jl=None, Jr2=None, Jl2=None):
-        res = self * q
+    def compose(self, q, Jr=None, Jl=None, Jr2=None, Jl2=None, out=None):
+        # out is a Quaternion that is overwritten with the result and returned. The
+        # Jacobians are formed first since out may be one of the operands
         if not Jr is None:
-            return res, q.inv().Adj @ Jr
+            J = chain(q.inv().Adj, Jr)
         elif not Jl is None:
-            return res, np.eye(3) @ Jl
+            J = chain(None, Jl, 3)
         elif not Jr2 is None:
-            return res, np.eye(3) @ Jr2
+            J = chain(None, Jr2, 3)
         elif not Jl2 is None:
-            return res, self.Adj @ Jl2
+            J = chain(self.Adj, Jl2)
         else:
-            return res
+            J = None
+        if out is None:
+            res = self * q
+        else:
+            res = out._assign(_hamilton_floats(*self.arr.tolist(), *q.arr.tolist()))
+        return res if J is None else (res, J)
+
+    def compose_jac(self, q, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * q
+        if which == 'Jr':
+            return res, q.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, q, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        q_inv = q.inv()
+        dq = q_inv * self
+        if which == 'Jr':
+            tau, J = Quaternion.Log(dq, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dq.inv().Adj
+        elif which == 'Jl':
+            tau, J = Quaternion.Log(dq, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ q_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, q, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * q.inv()
+        if which == 'Jr':
+            tau, J = Quaternion.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ q.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = Quaternion.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
 
     @classmethod
-    def random(cls): #Method found at planning.cs.uiuc.edu/node198.html (SO how to generate a random quaternion quickly)
-        u = np.random.uniform(0.0, 1.0, size=3)
+    def random(cls, n=None, rng=None): #Method found at planning.cs.uiuc.edu/node198.html (SO how to generate a random quaternion quickly)
+        # n samples come back as a QuaternionBatch. rng is an np.random.Generator for reproducible draws
+        if n is not None:
+            return QuaternionBatch.random(n, rng)
+        rng = np.random if rng is None else rng
+        u = rng.uniform(0.0, 1.0, size=3)
         qw = np.sin(2 * np.pi * u[1]) * np.sqrt(1 - u[0])
         q1 = np.cos(2 * np.pi * u[1]) * np.sqrt(1 - u[0])
         q2 = np.sqrt(u[0]) * np.sin(2 * np.pi * u[2])
         q3 = np.sqrt(u[0]) * np.cos(2 * np.pi * u[2])
-        return Quaternion(np.array([qw, q1, q2, q3]))
+        return Quaternion(np.array([qw, q1, q2, q3]), copy=False)
+
+    @classmethod
+    def sample_gaussian(cls, mean, cov, n, side='right', rng=None):
+        # n draws of mean (+) xi with xi ~ N(0, cov) as a QuaternionBatch, see jacobians.sample_gaussian
+        return sample_gaussian(cls, mean, cov, n, side, rng)
 
     @classmethod
     def fromRotationMatrix(cls, R):
@@ -204,7 +424,7 @@ class Quaternion:
             q = np.array([1/s * (R[0,1] - R[1,0]), 1/s * (R[2,0] + R[0,2]), 1/s * (R[2,1] + R[1,2]), s/4])
         q[1:] *= -1
 
-        return Quaternion(q)
+        return Quaternion(q, copy=False)
 
     @classmethod
     def fromRPY(cls, rpy):
@@ -223,15 +443,18 @@ class Quaternion:
         qx = cpsi * ct * sp - spsi * st * cp
         qy = cpsi * st * cp + spsi * ct * sp
         qz = spsi * ct * cp - cpsi * st * sp
-        return cls(np.array([qw, qx, qy, qz]))
+        return cls(np.array([qw, qx, qy, qz]), copy=False)
 
     @classmethod
     def fromAxisAngle(cls, vec):
         return cls.Exp(vec)
 
+    def toRPY(self):
+        return quaternion_to_rpy(self.q)
+
     @staticmethod
     def Identity():
-        return Quaternion(np.array([1.0, 0.0, 0.0, 0.0]))
+        return Quaternion(np.array([1.0, 0.0, 0.0, 0.0]), copy=False)
 
     @staticmethod
     def hat(w):
@@ -258,23 +481,26 @@ class Quaternion:
             wx = skew(w)
             phi = np.linalg.norm(w)
             J = np.eye(3) + 0.5 * wx + (1/phi**2 - (1 + np.cos(phi))/(2 * phi * np.sin(phi))) * (wx @ wx)
-            return logq, J @ Jr
+            return logq, chain(J, Jr)
         elif not Jl is None:
             wx = skew(w)
             phi = np.linalg.norm(w)
             J = np.eye(3) - 0.5 * wx + (1/phi**2 - (1 + np.cos(phi))/(2 * phi * np.sin(phi))) * (wx @ wx)
-            return logq, J @ Jl
+            return logq, chain(J, Jl)
         else:
             return logq
 
     @staticmethod
-    def Log(q, Jr=None, Jl=None):
+    def Log(q, Jr=None, Jl=None, out=None):
+        # out is a (3,) array that is overwritten with the result and returned
         if not Jr is None:
             W, J = Quaternion.log(q, Jr=Jr)
-            return Quaternion.vee(W), J
+            return _fill(out, Quaternion.vee(W)), J
         elif not Jl is None:
             W, J = Quaternion.log(q, Jl=Jl)
-            return Quaternion.vee(W), J
+            return _fill(out, Quaternion.vee(W)), J
+        elif out is not None:
+            return _fill(out, _log_floats(*q.arr.tolist()))
         else:
             W = Quaternion.log(q)
             return Quaternion.vee(W)
@@ -283,34 +509,360 @@ class Quaternion:
     def exp(cls, W, Jr=None, Jl=None):
         vec = W[1:]
         theta = np.linalg.norm(vec)
-        v = vec / theta
 
         if np.abs(theta) > 1e-8:
             qw = np.cos(theta/2)
-            qv = v * np.sin(theta/2)
+            qv = vec / theta * np.sin(theta/2)
         else:
             qw = 1 - theta**2/8 + theta**4/46080
             temp = 1/2 - theta**2/48 + theta**4/3840
             qv = vec * temp
-        q = cls(np.array([qw, *qv]))
+        q = cls._unchecked(np.array([qw, *qv]))
 
         if not Jr is None:
             thetax = skew(vec)
-            J = np.eye(3) - (1 - np.cos(theta))/theta**2 * thetax + (theta - np.sin(theta))/theta**3 * (thetax @ thetax)
-            return q, J @ Jr
+            _, B, C, _ = so3_coefficients(theta) # Finite at theta = 0
+            J = np.eye(3) - B * thetax + C * (thetax @ thetax)
+            return q, chain(J, Jr)
         elif not Jl is None:
             thetax = skew(vec)
-            J = np.eye(3) + (1 - np.cos(theta))/theta**2 * thetax + (theta - np.sin(theta))/theta**3 * (thetax @ thetax)
-            return q, J @ Jl
+            _, B, C, _ = so3_coefficients(theta)
+            J = np.eye(3) + B * thetax + C * (thetax @ thetax)
+            return q, chain(J, Jl)
         else:
             return q
 
     @staticmethod
-    def Exp(w, Jr=None, Jl=None):
+    def Exp(w, Jr=None, Jl=None, out=None):
+        # out is a Quaternion that is overwritten with the result and returned
         W = Quaternion.hat(w)
         if not Jr is None:
-            return Quaternion.exp(W, Jr=Jr)
+            q, J = Quaternion.exp(W, Jr=Jr)
         elif not Jl is None:
-            return Quaternion.exp(W, Jl=Jl)
+            q, J = Quaternion.exp(W, Jl=Jl)
+        elif out is not None:
+            return out._assign(_exp_floats(*w.tolist()))
         else:
             return Quaternion.exp(W)
+        if out is not None:
+            q = out._assign(q.arr)
+        return q, J
+
+
+class QuaternionBatch:
+    """N unit quaternions stored as one (N,4) array [qw, qx, qy, qz].
+
+    Mirrors the Quaternion API with every operation vectorized over the
+    first axis. The sign is canonicalized (qw >= 0) with a vectorized mask
+    that writes into a new buffer, so the caller's array is never negated.
+    """
+    def __init__(self, q):
+        q = np.asarray(q, dtype=float)
+        assert q.ndim == 2 and q.shape[1] == 4
+        neg = q[:,0] < 0
+        if np.any(neg):
+            q = np.where(neg[:,None], -q, q)
+        self.arr = np.ascontiguousarray(q)
+
+    @classmethod
+    def _unchecked(cls, arr): # Wraps a canonical (N,4) array without copying it
+        obj = cls.__new__(cls)
+        obj.arr = arr
+        return obj
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i): # Slices are views into arr, as for SO3Batch and SE3Batch
+        if isinstance(i, (int, np.integer)):
+            return Quaternion._unchecked(self.arr[i].copy())
+        return QuaternionBatch._unchecked(self.arr[i])
+
+    def __mul__(self, q):
+        return self.otimes(q)
+
+    def __str__(self):
+        return str(self.q)
+
+    def __repr__(self):
+        return f'QuaternionBatch({len(self)})'
+
+    @property
+    def qw(self):
+        return self.arr[:,0]
+
+    @property
+    def qx(self):
+        return self.arr[:,1]
+
+    @property
+    def qy(self):
+        return self.arr[:,2]
+
+    @property
+    def qz(self):
+        return self.arr[:,3]
+
+    @property
+    def qv(self):
+        return self.arr[:,1:]
+
+    @property
+    def q(self):
+        return self.arr
+
+    @property
+    def R(self): # (N,3,3) stack of rotation matrices
+        return rotation_matrix(self.arr)
+
+    @property
+    def Adj(self):
+        return self.R
+
+    def otimes(self, q):
+        assert isinstance(q, (Quaternion, QuaternionBatch))
+        return QuaternionBatch(hamilton(self.q, q.q))
+
+    def inv(self, Jr=None, Jl=None):
+        q_inv = QuaternionBatch(self.arr * CONJUGATE)
+        if Jr is not None:
+            return q_inv, chain(-self.Adj, Jr)
+        elif Jl is not None:
+            return q_inv, chain(-q_inv.Adj, Jl)
+        else:
+            return q_inv
+
+    def rota(self, v, Jr=None, Jl=None): # v is (3,) or (N,3)
+        assert v.shape[-1] == 3
+        vp = rotate(self.arr, v)
+        if Jr is not None:
+            J = -self.R @ skew_batch(v)
+            return vp, chain(J, Jr)
+        elif Jl is not None:
+            J = -skew_batch(vp)
+            return vp, chain(J, Jl)
+        else:
+            return vp
+
+    def rotp(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            q_inv, J = self.inv(Jr=Jr)
+            return q_inv.rota(v, Jr=J)
+        elif Jl is not None:
+            q_inv, J = self.inv(Jl=Jl)
+            return q_inv.rota(v, Jl=J)
+        else:
+            return self.inv().rota(v)
+
+    def normalize(self):
+        self.arr = self.q / self.norm()[:,None]
+
+    def norm(self):
+        return np.linalg.norm(self.q, axis=1)
+
+    def boxplusr(self, w, Jr=None, Jl=None):
+        assert w.shape[-1] == 3
+        if Jr is not None:
+            q, J = QuaternionBatch.Exp(w, Jr=Jr)
+            return self.compose(q, Jr2=J)
+        elif Jl is not None:
+            q, J = QuaternionBatch.Exp(w, Jl=Jl)
+            return self.compose(q, Jl2=J)
+        else:
+            return self * QuaternionBatch.Exp(w)
+
+    def boxminusr(self, q, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(q, (Quaternion, QuaternionBatch))
+        if Jr1 is not None:
+            dq, J = q.inv().compose(self, Jr2=Jr1)
+            return QuaternionBatch.Log(dq, Jr=J)
+        elif Jl1 is not None:
+            dq, J = q.inv().compose(self, Jl2=Jl1)
+            return QuaternionBatch.Log(dq, Jl=J)
+        elif Jr2 is not None:
+            q_inv, J = q.inv(Jr=Jr2)
+            dq, J = q_inv.compose(self, Jr=J)
+            return QuaternionBatch.Log(dq, Jr=J)
+        elif Jl2 is not None:
+            q_inv, J = q.inv(Jl=Jl2)
+            dq, J = q_inv.compose(self, Jl=J)
+            return QuaternionBatch.Log(dq, Jl=J)
+        else:
+            return QuaternionBatch.Log(q.inv() * self)
+
+    def boxplusl(self, w, Jr=None, Jl=None):
+        assert w.shape[-1] == 3
+        if Jr is not None:
+            q, J = QuaternionBatch.Exp(w, Jr=Jr)
+            return q.compose(self, Jr=J)
+        elif Jl is not None:
+            q, J = QuaternionBatch.Exp(w, Jl=Jl)
+            return q.compose(self, Jl=J)
+        else:
+            return QuaternionBatch.Exp(w) * self
+
+    def boxminusl(self, q, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(q, (Quaternion, QuaternionBatch))
+        if Jr1 is not None:
+            diff, J = self.compose(q.inv(), Jr=Jr1)
+            return QuaternionBatch.Log(diff, Jr=J)
+        elif Jl1 is not None:
+            diff, J = self.compose(q.inv(), Jl=Jl1)
+            return QuaternionBatch.Log(diff, Jl=J)
+        elif Jr2 is not None:
+            q_inv, J = q.inv(Jr=Jr2)
+            diff, J = self.compose(q_inv, Jr2=J)
+            return QuaternionBatch.Log(diff, Jr=J)
+        elif Jl2 is not None:
+            q_inv, J = q.inv(Jl=Jl2)
+            diff, J = self.compose(q_inv, Jl2=J)
+            return QuaternionBatch.Log(diff, Jl=J)
+        else:
+            return QuaternionBatch.Log(self * q.inv())
+
+    def compose(self, q, Jr=None, Jl=None, Jr2=None, Jl2=None):
+        res = self * q
+        if Jr is not None:
+            return res, chain(q.inv().Adj, Jr)
+        elif Jl is not None:
+            return res, chain(None, Jl, 3)
+        elif Jr2 is not None:
+            return res, chain(None, Jr2, 3)
+        elif Jl2 is not None:
+            return res, chain(self.Adj, Jl2)
+        else:
+            return res
+
+    def compose_jac(self, q, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * q
+        if which == 'Jr':
+            return res, q.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, q, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        q_inv = q.inv()
+        dq = q_inv * self
+        if which == 'Jr':
+            tau, J = QuaternionBatch.Log(dq, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dq.inv().Adj
+        elif which == 'Jl':
+            tau, J = QuaternionBatch.Log(dq, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ q_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, q, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * q.inv()
+        if which == 'Jr':
+            tau, J = QuaternionBatch.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ q.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = QuaternionBatch.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    @classmethod
+    def fromList(cls, qs):
+        return cls(np.array([q.q for q in qs]))
+
+    @classmethod
+    def fromRotationMatrix(cls, R): # R is (N,3,3)
+        return cls(quaternion_from_matrix(R))
+
+    @classmethod
+    def fromRPY(cls, rpy): # rpy is (N,3)
+        return cls(quaternion_from_rpy(rpy))
+
+    @classmethod
+    def fromAxisAngle(cls, vec): # vec is (N,3)
+        return cls.Exp(vec)
+
+    def toRPY(self): # Returns an (N,3) array
+        return quaternion_to_rpy(self.q)
+
+    @staticmethod
+    def Identity(n):
+        return QuaternionBatch(np.tile(np.array([1.0, 0.0, 0.0, 0.0]), (n,1)))
+
+    @classmethod
+    def random(cls, n, rng=None): # Vectorized form of Quaternion.random
+        rng = np.random if rng is None else rng
+        u = rng.uniform(0.0, 1.0, size=(n,3))
+        a, b = np.sqrt(1 - u[:,0]), np.sqrt(u[:,0])
+        c, d = 2 * np.pi * u[:,1], 2 * np.pi * u[:,2]
+        return cls(np.column_stack([np.sin(c) * a, np.cos(c) * a, b * np.sin(d), b * np.cos(d)]))
+
+    @staticmethod
+    def hat(w):
+        return np.concatenate([np.zeros(w.shape[:-1] + (1,)), w], axis=-1)
+
+    @staticmethod
+    def vee(W):
+        return W[...,1:]
+
+    @classmethod
+    def _exp_jacobians(cls, w, which=()):
+        # Exp plus the requested Jacobians in one pass (Jr = Jl^T on SO3)
+        theta = np.linalg.norm(w, axis=1)
+        small = theta < 1e-2
+        th = np.where(small, 1.0, theta)
+        half_sinc = np.where(small, 0.5 - theta**2/48 + theta**4/3840, np.sin(th/2)/th)
+        q = cls(np.concatenate([np.cos(theta/2)[:,None], half_sinc[:,None] * w], axis=1))
+        if not which:
+            return q, {}
+
+        _, B, C, _ = so3_coefficients(theta)
+        wx = skew_batch(w)
+        Jl = np.eye(3) + B[:,None,None] * wx + C[:,None,None] * (wx @ wx)
+        return q, {'Jl': Jl, 'Jr': Jl.transpose(0,2,1)}
+
+    @classmethod
+    def Exp(cls, w, Jr=None, Jl=None): # w is (N,3)
+        assert w.ndim == 2 and w.shape[1] == 3
+        if Jr is not None:
+            q, J = cls._exp_jacobians(w, ('Jr',))
+            return q, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            q, J = cls._exp_jacobians(w, ('Jl',))
+            return q, chain(J['Jl'], Jl)
+        else:
+            return cls._exp_jacobians(w)[0]
+
+    @staticmethod
+    def _log_jacobians(q, which=()):
+        qw, qv = q.qw, q.qv
+        n = np.linalg.norm(qv, axis=1)
+        small = n < 1e-8
+        safe_n = np.where(small, 1.0, n)
+        scale = np.where(small, 2 / qw * (1 - n**2 / (3 * qw**2) + n**4 / (5 * qw**4)),
+                         2 * np.arctan2(n, qw) / safe_n)
+        w = scale[:,None] * qv
+        if not which:
+            return w, {}
+
+        _, _, _, D = so3_coefficients(scale * n)
+        wx = skew_batch(w)
+        Jr_inv = np.eye(3) + 0.5 * wx + D[:,None,None] * (wx @ wx)
+        return w, {'Jr': Jr_inv, 'Jl': Jr_inv.transpose(0,2,1)}
+
+    @staticmethod
+    def Log(q, Jr=None, Jl=None): # Returns an (N,3) array
+        assert isinstance(q, QuaternionBatch)
+        if Jr is not None:
+            w, J = QuaternionBatch._log_jacobians(q, ('Jr',))
+            return w, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            w, J = QuaternionBatch._log_jacobians(q, ('Jl',))
+            return w, chain(J['Jl'], Jl)
+        else:
+            return QuaternionBatch._log_jacobians(q)[0]
@@ -1,4 +1,8 @@
+import math
 import numpy as np
+import validation
+from jacobians import chain, sample_gaussian, _fill
+from so2 import wrap
 
 G = np.array([[[0, 0, 1],
                 [0, 0, 0],
@@ -9,23 +13,83 @@ G = np.array([[[0, 0, 1],
                 [[0, -1, 0],
                 [1, 0, 0],
                 [0, 0, 0]]])
+
+def _exp_coefficients(theta): # V = [[A, -B], [B, A]] of Exp and its inverse in Log
+    if abs(theta) > 1e-8:
+        return math.sin(theta)/theta, (1 - math.cos(theta))/theta
+    return 1 - theta**2 / 6.0 + theta**4 / 120.0, theta/2.0 - theta**3 / 24.0 + theta**5/720.0
+
+def _exp_floats(x, y, theta):
+    # SE2.Exp on python floats
+    A, B = _exp_coefficients(theta)
+    ct, st = math.cos(theta), math.sin(theta)
+    return ((ct, -st, A*x - B*y),
+            (st, ct, B*x + A*y),
+            (0.0, 0.0, 1.0))
+
+def _log_floats(T):
+    # SE2.Log on python floats of the nested list T
+    (ct, _, x), (st, _, y), _ = T
+    theta = math.atan2(st, ct)
+    A, B = _exp_coefficients(theta)
+    n = 1 / (A**2 + B**2)
+    return n * (A*x + B*y), n * (A*y - B*x), theta
+
+def _inv_floats(T):
+    # SE2.inv on python floats of the nested list T, [R^T, -R^T t]
+    (ct, _, x), (st, _, y), _ = T
+    return ((ct, st, -(ct*x + st*y)),
+            (-st, ct, st*x - ct*y),
+            (0.0, 0.0, 1.0))
+
 class SE2:
-    def __init__(self, T):
-        assert T.shape == (3,3)
-        self.arr = T
+    __slots__ = ('arr',)
 
-    def inv(self, Jr=None, Jl=None):
+    def __init__(self, T, copy=True):
+        # T is copied unless copy=False, in which case the group aliases it (see view)
+        if validation.enabled:
+            assert T.shape == (3,3)
+        self.arr = np.array(T, dtype=float) if copy else T
+
+    @classmethod
+    def _unchecked(cls, T): # Internal results are well formed and skip the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = T
+        return obj
+
+    @classmethod
+    def view(cls, T):
+        """Wraps a (3,3) homogeneous transform without copying or checking it.
+
+        The group aliases T, so T must not be modified while the group is in use.
+        """
+        return cls._unchecked(T)
+
+    def _assign(self, T): # Overwrites the matrix in place, for out= targets
+        self.arr[...] = T
+        return self
+
+    def inv(self, Jr=None, Jl=None, out=None):
+        # out is an SE2 that is overwritten with the inverse and returned
         if not Jr is None:
-            return SE2.fromRandt(self.R.T, -self.R.T @ self.t), -self.Adj @ Jr
-        if not Jl is None:
-            T_inv = SE2.fromRandt(self.R.T, -self.R.T @ self.t)
-            return T_inv, -T_inv.Adj @ Jl
+            J = chain(-self.Adj, Jr) # Before out (possibly self) is overwritten
+        if out is None:
+            T_inv = SE2._fromRandt(self.R.T, -self.R.T @ self.t)
         else:
-            return SE2.fromRandt(self.R.T, -self.R.T @ self.t)
+            T_inv = out._assign(_inv_floats(self.arr.tolist()))
+        if not Jr is None:
+            return T_inv, J
+        elif not Jl is None:
+            return T_inv, chain(-T_inv.Adj, Jl)
+        else:
+            return T_inv
 
     def __mul__(self, T2):
-        assert isinstance(T2, SE2)
-        return SE2(self.T @ T2.T)
+        if isinstance(T2, SE2Batch):
+            return SE2Batch._fromArr(SE2Batch._xyt(self)) * T2
+        if validation.enabled:
+            assert isinstance(T2, SE2)
+        return SE2._unchecked(self.T @ T2.T)
 
     def __str__(self):
         return str(self.T)
@@ -33,35 +97,55 @@ class SE2:
     def __repr(self):
         return str(self.T)
 
-    def transa(self, v, Jr=None, Jl=None):
-        assert v.size == 2
+    def transa(self, v, Jr=None, Jl=None): # v is (2,) or an (N,2) point cloud
+        if validation.enabled:
+            assert v.shape[-1] == 2
+        if v.ndim == 2:
+            return self._transa_cloud(v, Jr, Jl)
         v = np.array([*v, 1])
         vp = (self.T @ v)[:2]
         if not Jr is None:
             one_x = np.array([[0, -1], [1,0]])
             J = np.block([self.R, (self.R @ one_x @ v[:2])[:,None]])
-            return vp, J @ Jr
+            return vp, chain(J, Jr)
         elif not Jl is None:
             one_x = np.array([[0, -1], [1,0]])
             J = np.block([np.eye(2), (one_x @ vp)[:,None]])
-            return vp, J @ Jl
+            return vp, chain(J, Jl)
         else:
             return vp
 
+    def _transa_cloud(self, v, Jr, Jl):
+        # One matrix product for the whole cloud and (N,2,3) Jacobians
+        R = self.R
+        vp = v @ R.T + self.t
+        if Jr is None and Jl is None:
+            return vp
+        one_x = np.array([[0, -1], [1, 0]])
+        J = np.zeros((v.shape[0], 2, 3))
+        if Jr is not None:
+            J[:,:,:2] = R
+            J[:,:,2] = v @ (R @ one_x).T
+            return vp, chain(J, Jr)
+        J[:,:,:2] = np.eye(2)
+        J[:,:,2] = vp @ one_x.T
+        return vp, chain(J, Jl)
+
     def transp(self, v, Jr=None, Jl=None):
-        assert v.size == 2
+        if validation.enabled:
+            assert v.shape[-1] == 2
         if not Jr is None:
             T_inv, J = self.inv(Jr=Jr)
-            return T_inv.transa(v, Jr=Jr)
+            return T_inv.transa(v, Jr=J)
         elif not Jl is None:
             T_inv, J = self.inv(Jl=Jl)
             return T_inv.transa(v, Jl=J)
         else:
-            vp = self.inv().transa(v)
-        return vp[:2]
+            return self.inv().transa(v)
 
     def boxplusr(self, w, Jr=None, Jl=None):
-        assert w.size == 3
+        if validation.enabled:
+            assert w.size == 3
         if not Jr is None:
             T2, J = SE2.Exp(w, Jr=Jr)
             return self.compose(T2, Jr2=J)
@@ -72,7 +156,8 @@ class SE2:
             return self * SE2.Exp(w)
 
     def boxminusr(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(T, SE2)
+        if validation.enabled:
+            assert isinstance(T, SE2)
         if Jr1 is not None:
             dT, J = T.inv().compose(self, Jr2=Jr1)
             return SE2.Log(dT, Jr=J)
@@ -91,7 +176,8 @@ class SE2:
             return SE2.Log(T.inv() * self)
 
     def boxplusl(self, w, Jr=None, Jl=None):
-        assert w.size == 3
+        if validation.enabled:
+            assert w.size == 3
         if Jr is not None:
             T, J = SE2.Exp(w, Jr=Jr)
             return T.compose(self, Jr=J)
@@ -102,7 +188,8 @@ class SE2:
             return SE2.Exp(w) * self
 
     def boxminusl(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(T, SE2)
+        if validation.enabled:
+            assert isinstance(T, SE2)
         if Jr1 is not None:
             diff, J = self.compose(T.inv(), Jr=Jr1)
             return SE2.Log(diff, Jr=J)
@@ -120,18 +207,63 @@ class SE2:
         else:
             return SE2.Log(self * T.inv())
 
-    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None):
-        res = self * T
+    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None, out=None):
+        # out is an SE2 that is overwritten with the result and returned. The Jacobians
+        # are formed first since out may be one of the operands
         if not Jr is None:
-            return res, T.inv().Adj @ Jr
+            J = chain(T.inv().Adj, Jr)
         elif not Jl is None:
-            return res, np.eye(3) @ Jl
+            J = chain(None, Jl, 3)
         elif not Jr2 is None:
-            return res, np.eye(3) @ Jr2
+            J = chain(None, Jr2, 3)
         elif not Jl2 is None:
-            return res, self.Adj @ Jl2
+            J = chain(self.Adj, Jl2)
         else:
-            return res
+            J = None
+        if out is None:
+            res = self * T
+        else:
+            res = out
+            np.matmul(self.arr, T.arr, out=out.arr)
+        return res if J is None else (res, J)
+
+    def compose_jac(self, T, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * T
+        if which == 'Jr':
+            return res, T.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        T_inv = T.inv()
+        dT = T_inv * self
+        if which == 'Jr':
+            tau, J = SE2.Log(dT, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dT.inv().Adj
+        elif which == 'Jl':
+            tau, J = SE2.Log(dT, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ T_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * T.inv()
+        if which == 'Jr':
+            tau, J = SE2.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ T.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SE2.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
 
     @property
     def Adj(self):
@@ -163,18 +295,24 @@ class SE2:
 
     @classmethod
     def fromRandt(cls, R, t):
-        assert R.shape == (2,2)
-        assert t.size == 2
+        if validation.enabled:
+            assert R.shape == (2,2)
+            assert t.size == 2
+        return cls._fromRandt(R, t)
+
+    @classmethod
+    def _fromRandt(cls, R, t): # fromRandt without the checks, for R and t computed internally
         T = np.block([[R, t[:,None]], [np.zeros(2), 1]])
-        return cls(T)
+        return cls._unchecked(T)
 
     @staticmethod
     def Identity():
-        return SE2(np.eye(3))
+        return SE2(np.eye(3), copy=False)
 
     @staticmethod
     def log(T, Jr=None, Jl=None):
-        assert isinstance(T, SE2)
+        if validation.enabled:
+            assert isinstance(T, SE2)
         theta = np.arctan2(T.arr[1,0], T.arr[0,0])
         t = T.t
 
@@ -203,7 +341,7 @@ class SE2:
             J = np.array([[A/den, -B/den, w1],
                           [B/den, A/den, w2],
                           [0, 0, 1]])
-            return logT, J @ Jr
+            return logT, chain(J, Jr)
         elif not Jl is None:
             p = logT[:2,2]
             u1 = (theta * p[0] + p[1] - p[1] * np.cos(theta) - p[0] * np.sin(theta))/(theta**2)
@@ -214,24 +352,32 @@ class SE2:
             J = np.array([[A/den, B/den, w1],
                           [-B/den, A/den, w2],
                           [0, 0, 1]])
-            return logT, J @ Jl
+            return logT, chain(J, Jl)
         else:
             return logT
 
     @classmethod
-    def Log(cls, T, Jr=None, Jl=None):
+    def Log(cls, T, Jr=None, Jl=None, out=None):
+        # out is a (3,) array that is overwritten with the result and returned
         if not Jr is None:
             logT, J = cls.log(T, Jr=Jr)
-            return cls.vee(logT), J
+            return _fill(out, cls.vee(logT)), J
         elif not Jl is None:
             logT, J = cls.log(T, Jl=Jl)
-            return cls.vee(logT), J
+            return _fill(out, cls.vee(logT)), J
+        elif out is not None:
+            return _fill(out, _log_floats(T.arr.tolist()))
         else:
             return cls.vee(cls.log(T))
 
     @classmethod
     def exp(cls, X, Jr=None, Jl=None): #Taylor series expansion
-        assert X.shape == (3,3)
+        if validation.enabled:
+            assert X.shape == (3,3)
+        return cls._exp(X, Jr, Jl)
+
+    @classmethod
+    def _exp(cls, X, Jr=None, Jl=None): # exp without the checks, for X built internally by hat
         theta = X[1,0]
 
         if np.abs(theta) > 1e-8:
@@ -243,7 +389,8 @@ class SE2:
 
         V = np.array([[A, -B], [B, A]])
         t = V @ X[:2,2]
-        T = cls.fromAngleAndt(theta, t)
+        ct, st = np.cos(theta), np.sin(theta)
+        T = cls._fromRandt(np.array([[ct, -st], [st, ct]]), t)
 
         if not Jr is None:
             p = X[:2, -1]
@@ -252,7 +399,7 @@ class SE2:
             J = np.array([[A, B, u1],
                           [-B, A, u2],
                           [0, 0, 1]])
-            return T, J @ Jr
+            return T, chain(J, Jr)
         elif not Jl is None:
             p = X[:2, -1]
             u1 = (theta * p[0] + p[1] - p[1] * np.cos(theta) - p[0] * np.sin(theta))/(theta**2)
@@ -260,23 +407,30 @@ class SE2:
             J = np.array([[A, -B, u1],
                           [B, A, u2],
                           [0, 0, 1]])
-            return T, J @ Jl
+            return T, chain(J, Jl)
         else:
             return T
 
     @classmethod
-    def Exp(cls, vec, Jr=None, Jl=None):
+    def Exp(cls, vec, Jr=None, Jl=None, out=None):
+        # out is an SE2 that is overwritten with the result and returned
+        if out is not None and Jr is None and Jl is None:
+            return out._assign(_exp_floats(*vec.tolist()))
         logR = cls.hat(vec)
         if not Jr is None:
-            return cls.exp(logR, Jr=Jr)
+            T, J = cls._exp(logR, Jr=Jr)
         elif not Jl is None:
-            return cls.exp(logR, Jl=Jl)
+            T, J = cls._exp(logR, Jl=Jl)
         else:
-            return cls.exp(logR)
+            return cls._exp(logR)
+        if out is not None:
+            T = out._assign(T.arr)
+        return T, J
 
     @staticmethod
     def vee(X):
-        assert X.shape == (3,3)
+        if validation.enabled:
+            assert X.shape == (3,3)
         arr = np.zeros(3)
         arr[:2] = X[:2,2]
         arr[2] = X[1,0]
@@ -285,11 +439,353 @@ class SE2:
 
     @staticmethod
     def hat(arr):
-        assert arr.size == 3
+        if validation.enabled:
+            assert arr.size == 3
         return np.sum(G * arr[:,None, None], axis=0)
 
     @classmethod
-    def random(cls):
-        theta = np.random.uniform(-np.pi, np.pi)
-        t = np.random.uniform(-5, 5, size=2)
+    def random(cls, n=None, rng=None):
+        # n samples come back as an SE2Batch. rng is an np.random.Generator for reproducible draws
+        if n is not None:
+            return SE2Batch.random(n, rng)
+        rng = np.random if rng is None else rng
+        theta = rng.uniform(-np.pi, np.pi)
+        t = rng.uniform(-5, 5, size=2)
         return cls.fromAngleAndt(theta, t)
+
+    @classmethod
+    def sample_gaussian(cls, mean, cov, n, side='right', rng=None):
+        # n draws of mean (+) xi with xi ~ N(0, cov) as an SE2Batch, see jacobians.sample_gaussian
+        return sample_gaussian(cls, mean, cov, n, side, rng)
+
+
+class SE2Batch:
+    """N planar poses stored as one (N,3) array of [x, y, theta].
+
+    Mirrors the SE2 API with every operation vectorized over the first axis.
+    Operations broadcast against a single SE2 and Jacobians are returned as
+    (N,3,3) stacks (or (N,2,3) for transa/transp).
+    """
+    def __init__(self, arr):
+        arr = np.array(arr, dtype=float)
+        assert arr.ndim == 2 and arr.shape[1] == 3
+        arr[:,2] = wrap(arr[:,2])
+        self.arr = arr
+
+    @classmethod
+    def _fromArr(cls, xyt): # Accepts a single (3,) pose as a batch of one
+        return cls(np.atleast_2d(xyt))
+
+    @staticmethod
+    def _xyt(T):
+        if isinstance(T, SE2Batch):
+            return T.arr
+        return np.array([*T.t, np.arctan2(T.arr[1,0], T.arr[0,0])])
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return SE2.fromAngleAndt(self.arr[i,2], self.arr[i,:2].copy())
+        return SE2Batch(self.arr[i])
+
+    def __mul__(self, T2):
+        assert isinstance(T2, (SE2, SE2Batch))
+        xyt = SE2Batch._xyt(T2)
+        t = self.t + np.einsum('...ij,...j->...i', self.R, xyt[...,:2])
+        return SE2Batch(np.column_stack([t, self.theta + xyt[...,2]]))
+
+    def __str__(self):
+        return str(self.arr)
+
+    def __repr__(self):
+        return f'SE2Batch({len(self)})'
+
+    def inv(self, Jr=None, Jl=None):
+        t_inv = -np.einsum('nji,nj->ni', self.R, self.t)
+        T_inv = SE2Batch(np.column_stack([t_inv, -self.theta]))
+        if Jr is not None:
+            return T_inv, chain(-self.Adj, Jr)
+        elif Jl is not None:
+            return T_inv, chain(-T_inv.Adj, Jl)
+        else:
+            return T_inv
+
+    def transa(self, v, Jr=None, Jl=None): # v is (2,) or (N,2)
+        assert v.shape[-1] == 2
+        R = self.R
+        vp = self.t + np.einsum('...ij,...j->...i', R, v)
+        if Jr is not None:
+            J = np.zeros((len(self), 2, 3))
+            J[:,:,:2] = R
+            J[:,:,2] = np.einsum('...ij,...j->...i', R, v @ np.array([[0, 1], [-1, 0]]))
+            return vp, chain(J, Jr)
+        elif Jl is not None:
+            J = np.zeros((len(self), 2, 3))
+            J[:,:,:2] = np.eye(2)
+            J[:,0,2] = -vp[:,1]
+            J[:,1,2] = vp[:,0]
+            return vp, chain(J, Jl)
+        else:
+            return vp
+
+    def transp(self, v, Jr=None, Jl=None):
+        assert v.shape[-1] == 2
+        if Jr is not None:
+            T_inv, J = self.inv(Jr=Jr)
+            return T_inv.transa(v, Jr=J)
+        elif Jl is not None:
+            T_inv, J = self.inv(Jl=Jl)
+            return T_inv.transa(v, Jl=J)
+        else:
+            return self.inv().transa(v)
+
+    def boxplusr(self, w, Jr=None, Jl=None):
+        assert w.shape[-1] == 3
+        if Jr is not None:
+            T2, J = SE2Batch.Exp(w, Jr=Jr)
+            return self.compose(T2, Jr2=J)
+        elif Jl is not None:
+            T2, J = SE2Batch.Exp(w, Jl=Jl)
+            return self.compose(T2, Jl2=J)
+        else:
+            return self * SE2Batch.Exp(w)
+
+    def boxminusr(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(T, (SE2, SE2Batch))
+        if Jr1 is not None:
+            dT, J = T.inv().compose(self, Jr2=Jr1)
+            return SE2Batch.Log(dT, Jr=J)
+        elif Jl1 is not None:
+            dT, J = T.inv().compose(self, Jl2=Jl1)
+            return SE2Batch.Log(dT, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            dT, J = T_inv.compose(self, Jr=J)
+            return SE2Batch.Log(dT, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            dT, J = T_inv.compose(self, Jl=J)
+            return SE2Batch.Log(dT, Jl=J)
+        else:
+            return SE2Batch.Log(T.inv() * self)
+
+    def boxplusl(self, w, Jr=None, Jl=None):
+        assert w.shape[-1] == 3
+        if Jr is not None:
+            T, J = SE2Batch.Exp(w, Jr=Jr)
+            return T.compose(self, Jr=J)
+        elif Jl is not None:
+            T, J = SE2Batch.Exp(w, Jl=Jl)
+            return T.compose(self, Jl=J)
+        else:
+            return SE2Batch.Exp(w) * self
+
+    def boxminusl(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(T, (SE2, SE2Batch))
+        if Jr1 is not None:
+            diff, J = self.compose(T.inv(), Jr=Jr1)
+            return SE2Batch.Log(diff, Jr=J)
+        elif Jl1 is not None:
+            diff, J = self.compose(T.inv(), Jl=Jl1)
+            return SE2Batch.Log(diff, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            diff, J = self.compose(T_inv, Jr2=J)
+            return SE2Batch.Log(diff, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            diff, J = self.compose(T_inv, Jl2=J)
+            return SE2Batch.Log(diff, Jl=J)
+        else:
+            return SE2Batch.Log(self * T.inv())
+
+    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None):
+        res = self * T
+        if Jr is not None:
+            return res, chain(T.inv().Adj, Jr)
+        elif Jl is not None:
+            return res, chain(None, Jl, 3)
+        elif Jr2 is not None:
+            return res, chain(None, Jr2, 3)
+        elif Jl2 is not None:
+            return res, chain(self.Adj, Jl2)
+        else:
+            return res
+
+    def compose_jac(self, T, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * T
+        if which == 'Jr':
+            return res, T.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        T_inv = T.inv()
+        dT = T_inv * self
+        if which == 'Jr':
+            tau, J = SE2Batch.Log(dT, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dT.inv().Adj
+        elif which == 'Jl':
+            tau, J = SE2Batch.Log(dT, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ T_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * T.inv()
+        if which == 'Jr':
+            tau, J = SE2Batch.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ T.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SE2Batch.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    @property
+    def Adj(self):
+        adj = np.zeros((len(self), 3, 3))
+        adj[:,:2,:2] = self.R
+        adj[:,0,2] = self.arr[:,1]
+        adj[:,1,2] = -self.arr[:,0]
+        adj[:,2,2] = 1.0
+        return adj
+
+    @property
+    def theta(self):
+        return self.arr[:,2]
+
+    @property
+    def R(self): # (N,2,2) stack of rotation matrices
+        ct, st = np.cos(self.theta), np.sin(self.theta)
+        return np.stack([np.stack([ct, -st], axis=-1), np.stack([st, ct], axis=-1)], axis=-2)
+
+    @property
+    def t(self):
+        return self.arr[:,:2]
+
+    @property
+    def T(self): # (N,3,3) stack of homogeneous matrices
+        T = np.zeros((len(self), 3, 3))
+        T[:,:2,:2] = self.R
+        T[:,:2,2] = self.t
+        T[:,2,2] = 1.0
+        return T
+
+    @classmethod
+    def fromAngleAndt(cls, theta, t):
+        return cls(np.column_stack([t, theta]))
+
+    @classmethod
+    def fromList(cls, Ts):
+        return cls(np.array([SE2Batch._xyt(T) for T in Ts]))
+
+    @staticmethod
+    def Identity(n):
+        return SE2Batch(np.zeros((n,3)))
+
+    @classmethod
+    def random(cls, n, rng=None):
+        rng = np.random if rng is None else rng
+        theta = rng.uniform(-np.pi, np.pi, size=n)
+        t = rng.uniform(-5, 5, size=(n,2))
+        return cls(np.column_stack([t, theta]))
+
+    @staticmethod
+    def _coefficients(theta):
+        # A = sin/theta, B = (1 - cos)/theta, a = (1 - cos)/theta^2, b = (theta - sin)/theta^2
+        small = np.abs(theta) < 1e-2
+        th = np.where(small, 1.0, theta)
+        th2 = theta**2
+        ct, st = np.cos(th), np.sin(th)
+        A = np.where(small, 1 - th2/6 + th2**2/120, st/th)
+        B = np.where(small, theta * (0.5 - th2/24 + th2**2/720), (1 - ct)/th)
+        a = np.where(small, 0.5 - th2/24 + th2**2/720, (1 - ct)/th**2)
+        b = np.where(small, theta * (1/6 - th2/120 + th2**2/5040), (th - st)/th**2)
+        return A, B, a, b
+
+    @staticmethod
+    def _jacobian(A, B, a, b, p, left):
+        # Right (or left) Jacobian of Exp at [p, theta]
+        J = np.zeros((p.shape[0], 3, 3))
+        J[:,0,0] = A
+        J[:,1,1] = A
+        J[:,2,2] = 1.0
+        if left:
+            J[:,0,1], J[:,1,0] = -B, B
+            J[:,0,2] = p[:,0] * b + p[:,1] * a
+            J[:,1,2] = -p[:,0] * a + p[:,1] * b
+        else:
+            J[:,0,1], J[:,1,0] = B, -B
+            J[:,0,2] = p[:,0] * b - p[:,1] * a
+            J[:,1,2] = p[:,0] * a + p[:,1] * b
+        return J
+
+    @classmethod
+    def _exp_jacobians(cls, vec, which=()):
+        # Exp plus the requested Jacobians sharing the A, B, a, b coefficients
+        p, theta = vec[:,:2], vec[:,2]
+        A, B, a, b = SE2Batch._coefficients(theta)
+        t = np.column_stack([A * p[:,0] - B * p[:,1], B * p[:,0] + A * p[:,1]])
+        T = cls(np.column_stack([t, theta]))
+        return T, {name: SE2Batch._jacobian(A, B, a, b, p, left=name == 'Jl') for name in which}
+
+    @classmethod
+    def Exp(cls, vec, Jr=None, Jl=None): # vec is (N,3) ordered [x, y, theta]
+        assert vec.ndim == 2 and vec.shape[1] == 3
+        if Jr is not None:
+            T, J = cls._exp_jacobians(vec, ('Jr',))
+            return T, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            T, J = cls._exp_jacobians(vec, ('Jl',))
+            return T, chain(J['Jl'], Jl)
+        else:
+            return cls._exp_jacobians(vec)[0]
+
+    @staticmethod
+    def _log_jacobians(T, which=()):
+        theta, t = T.theta, T.t
+        A, B, a, b = SE2Batch._coefficients(theta)
+        den = A**2 + B**2
+        p = np.column_stack([A * t[:,0] + B * t[:,1], -B * t[:,0] + A * t[:,1]]) / den[:,None]
+        logT = np.column_stack([p, theta])
+
+        # The Jacobians of Exp are [[M, u], [0, 1]] so the inverse is [[M^-1, -M^-1 u], [0, 1]]
+        jacs = {}
+        for name in which:
+            J = SE2Batch._jacobian(A, B, a, b, p, left=name == 'Jl')
+            M_inv = J[:,:2,:2].transpose(0,2,1) / den[:,None,None]
+            J[:,:2,:2] = M_inv
+            J[:,:2,2] = -(M_inv @ J[:,:2,2,None])[:,:,0]
+            jacs[name] = J
+        return logT, jacs
+
+    @staticmethod
+    def Log(T, Jr=None, Jl=None): # Returns an (N,3) array ordered [x, y, theta]
+        assert isinstance(T, SE2Batch)
+        if Jr is not None:
+            logT, J = SE2Batch._log_jacobians(T, ('Jr',))
+            return logT, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            logT, J = SE2Batch._log_jacobians(T, ('Jl',))
+            return logT, chain(J['Jl'], Jl)
+        else:
+            return SE2Batch._log_jacobians(T)[0]
+
+    @staticmethod
+    def hat(arr):
+        return np.sum(G * arr[:,:,None,None], axis=1)
+
+    @staticmethod
+    def vee(X):
+        return np.column_stack([X[:,0,2], X[:,1,2], X[:,1,0]])
@@ -1,21 +1,134 @@
+import math
+import weakref
 import numpy as np
-from quaternion import Quaternion, skew # move skew to a different file
+import validation
+from jacobians import so3_coefficients, chain, sample_gaussian, _fill
+from quaternion import Quaternion, QuaternionBatch, skew, skew_batch, hamilton, rotate, rotation_matrix, CONJUGATE, _hamilton_floats, _rotate_floats, quaternion_from_matrix, quaternion_from_rpy # move skew to a different file
+from quaternion import _exp_floats as _quaternion_exp_floats, _log_floats as _quaternion_log_floats
+
+def _compose_floats(T1, T2):
+    # SE3 composition on python floats of two [t, q] lists, t = t1 + q1 t2 and q = q1 q2
+    tx, ty, tz, *p = T1
+    vx, vy, vz, *q = T2
+    ux, uy, uz = _rotate_floats(*p, vx, vy, vz)
+    return (tx + ux, ty + uy, tz + uz, *_hamilton_floats(*p, *q))
+
+def _inv_floats(T):
+    # SE3.inv on python floats of a [t, q] list, q^-1 = q* and t^-1 = -(q* t)
+    tx, ty, tz, qw, qx, qy, qz = T
+    ux, uy, uz = _rotate_floats(qw, -qx, -qy, -qz, tx, ty, tz)
+    return (-ux, -uy, -uz, qw, -qx, -qy, -qz)
+
+def _exp_floats(vx, vy, vz, wx, wy, wz):
+    # SE3.Exp on python floats, t = V v with V = I + (1 - cos)/theta^2 wx + (theta - sin)/theta^3 wx^2
+    q = _quaternion_exp_floats(wx, wy, wz)
+    theta = math.sqrt(wx*wx + wy*wy + wz*wz)
+    if theta > 1e-8:
+        a, b = (1 - math.cos(theta))/theta**2, (theta - math.sin(theta))/theta**3
+        cx, cy, cz = wy*vz - wz*vy, wz*vx - wx*vz, wx*vy - wy*vx # w x v
+        dx, dy, dz = wy*cz - wz*cy, wz*cx - wx*cz, wx*cy - wy*cx # w x (w x v)
+        vx, vy, vz = vx + a*cx + b*dx, vy + a*cy + b*dy, vz + a*cz + b*dz
+    return (vx, vy, vz, *q)
+
+def _log_floats(T):
+    # SE3.Log on python floats of a [t, q] list, v = V^-1 t
+    tx, ty, tz, *q = T
+    wx, wy, wz = _quaternion_log_floats(*q)
+    theta = math.sqrt(wx*wx + wy*wy + wz*wz)
+    if theta > 1e-3:
+        A, B = math.sin(theta) / theta, (1.0 - math.cos(theta)) / (theta**2)
+        k = 1/(theta**2) * (1 - A/(2*B))
+        cx, cy, cz = wy*tz - wz*ty, wz*tx - wx*tz, wx*ty - wy*tx # w x t
+        dx, dy, dz = wy*cz - wz*cy, wz*cx - wx*cz, wx*cy - wy*cx # w x (w x t)
+        tx, ty, tz = tx - 0.5*cx + k*dx, ty - 0.5*cy + k*dy, tz - 0.5*cz + k*dz
+    return tx, ty, tz, wx, wy, wz
+
+class _QuaternionView(Quaternion):
+    # SE3.q, a Quaternion over arr[3:] of a pose. It is never flipped into a new buffer, and
+    # writing through it (e.g. normalize) also drops the memoized values of the pose, which
+    # is held by a weak reference since the pose memoizes its view
+    __slots__ = ('_pose',)
+
+    def __init__(self, pose):
+        self.arr = pose.arr[3:]
+        self._pose = weakref.ref(pose)
+
+    def _invalidate(self):
+        Quaternion._invalidate(self)
+        pose = self._pose()
+        if pose is not None:
+            pose._invalidate()
 
 class SE3:
+    __slots__ = ('arr', '_cache', '__weakref__') # arr is [t, q] in one (7,) array, the layout of an SE3Batch row
+
     def __init__(self, q, t):
-        assert isinstance(q, Quaternion)
-        self.q_ = q
-        self.t_ = t
+        # q and t are packed into a new (7,) array, so the pose never aliases them. See view to wrap an array
+        if validation.enabled:
+            assert isinstance(q, Quaternion)
+        self.arr = np.empty(7)
+        self.arr[:3] = t
+        self.arr[3:] = q.arr
+        self._cache = {} # Memoized q, Adj and inverse, cleared by normalize
+
+    @classmethod
+    def _unchecked(cls, arr): # Wraps a canonical (7,) [t, q] array and skips the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = arr
+        obj._cache = {}
+        return obj
+
+    @classmethod
+    def _fromParts(cls, q, t):
+        arr = np.empty(7)
+        arr[:3] = t
+        arr[3:] = q.arr
+        return cls._unchecked(arr)
+
+    @classmethod
+    def view(cls, arr):
+        """Wraps a (7,) [t, q] float array without copying or checking it.
+
+        The pose aliases arr, so arr must not be modified while the pose is in use.
+        The quaternion must be canonical (qw >= 0).
+        """
+        return cls._unchecked(arr)
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def _invalidate(self): # Drops the memoized values after arr is written in place
+        q = self._cache.get('q')
+        self._cache = {}
+        if q is not None: # The view of arr[3:] stays valid, only its memos are stale
+            Quaternion._invalidate(q)
+            self._cache['q'] = q
+
+    def _assign(self, T): # Overwrites [t, q] in place, for out= targets
+        self.arr[:] = T
+        self._invalidate()
+        return self
 
     def isValidTransform(self):
-        q_norm = self.q_.norm()
+        q_norm = self.q.norm()
         return (np.abs(q_norm - 1.0) <= 1e-8)
 
     @classmethod
-    def random(cls):
-        q = Quaternion.random()
-        t = np.random.uniform(-10.0, 10.0, size=3)
-        return cls(q,t)
+    def random(cls, n=None, rng=None):
+        # n samples come back as an SE3Batch. rng is an np.random.Generator for reproducible draws
+        if n is not None:
+            return SE3Batch.random(n, rng)
+        q = Quaternion.random(rng=rng)
+        rng = np.random if rng is None else rng
+        t = rng.uniform(-10.0, 10.0, size=3)
+        return cls(q, t)
+
+    @classmethod
+    def sample_gaussian(cls, mean, cov, n, side='right', rng=None):
+        # n draws of mean (+) xi with xi ~ N(0, cov) as an SE3Batch, see jacobians.sample_gaussian
+        return sample_gaussian(cls, mean, cov, n, side, rng)
 
     @classmethod
     def fromRAndt(cls, R, t):
@@ -35,40 +148,43 @@ class SE3:
     @classmethod
     def from7vec(cls, arr):
         t = arr[:3]
-        q = Quaternion(arr[3:])
+        q = Quaternion(arr[3:], copy=False)
         return cls(q,t)
 
     @property
     def qw(self):
-        return self.q_.qw
+        return self.q.qw
 
     @property
     def qv(self):
-        return self.q_.qv
+        return self.q.qv
 
     @property
     def qx(self):
-        return self.q_.qx
+        return self.q.qx
 
     @property
     def qy(self):
-        return self.q_.qy
+        return self.q.qy
 
     @property
     def qz(self):
-        return self.q_.qz
+        return self.q.qz
 
     @property
-    def q(self):
-        return self.q_
+    def q(self): # A Quaternion view of arr[3:], built on first use
+        q = self._cache.get('q')
+        if q is None:
+            q = self._cache['q'] = _QuaternionView(self)
+        return q
 
     @property
     def q_arr(self):
-        return self.q.q
+        return self.arr[3:]
 
     @property
     def t(self):
-        return self.t_
+        return self.arr[:3]
 
     @property
     def R(self):
@@ -76,19 +192,24 @@ class SE3:
 
     @property
     def T(self):
-        arr = np.array([*self.t,*self.q_arr])
-        return arr
+        return self.arr.copy()
 
     @property
     def Adj(self):
+        return self._cached('Adj', self._adjoint).copy() # Callers may write into their copy
+
+    def _adjoint(self):
         R = self.R
-        tx = skew(self.t)
-        return np.block([[R, tx @ R], [np.zeros((3,3)), R]])
+        Adj = np.zeros((6,6))
+        Adj[:3,:3] = Adj[3:,3:] = R
+        Adj[:3,3:] = skew(self.t) @ R
+        Adj.flags.writeable = False # Private to the cache, Adj hands out copies
+        return Adj
 
     def __mul__(self, T):
-        q = self.q * T.q
-        t = self.t + self.q.rota(T.t)
-        return SE3(q,t)
+        if isinstance(T, SE3Batch):
+            return SE3Batch(np.concatenate([self.t + rotate(self.q_arr, T.t), hamilton(self.q_arr, T.q_arr)], axis=1))
+        return SE3._unchecked(np.array(_compose_floats(self.arr.tolist(), T.arr.tolist())))
 
     def __str__(self):
         return str(self.T)
@@ -98,28 +219,54 @@ class SE3:
         t_str = str(self.t)
         return t_str + " " + q_str
 
-    def inv(self, Jr=None, Jl=None):
-        q_inv = self.q.inv()
-        t_inv = -q_inv.rota(self.t)
+    def inv(self, Jr=None, Jl=None, out=None):
+        # out is an SE3 that is overwritten with the inverse and returned
         if Jr is not None:
-            return SE3(q_inv, t_inv), -self.Adj @ Jr
+            J = chain(-self.Adj, Jr) # Before out (possibly self) is overwritten
+        if out is None:
+            T_inv = self._cached('inv', self._inverse)
+        else:
+            T_inv = out._assign(_inv_floats(self.arr.tolist()))
+        if Jr is not None:
+            return T_inv, J
         elif Jl is not None:
-            T_inv = SE3(q_inv, t_inv)
-            return T_inv, -T_inv.Adj @ Jl
+            return T_inv, chain(-T_inv.Adj, Jl)
         else:
-            return SE3(q_inv, t_inv)
+            return T_inv
+
+    def _inverse(self):
+        return SE3._unchecked(np.array(_inv_floats(self.arr.tolist())))
 
-    def transa(self, v, Jr=None, Jl=None):
-        vp = self.t + self.q.rota(v)
+    def transa(self, v, Jr=None, Jl=None): # v is (3,) or an (N,3) point cloud
+        if v.ndim == 2:
+            return self._transa_cloud(v, Jr, Jl)
+        R = self.R
+        vp = self.t + R @ v
         if Jr is not None:
-            J = np.block([self.R, -self.R @ skew(v)])
-            return vp, J @ Jr
+            J = np.block([R, -R @ skew(v)])
+            return vp, chain(J, Jr)
         elif Jl is not None:
-            J = np.block([np.eye(3), -skew(self.t) - self.R @ skew(v) @ self.R.T])
-            return vp, J @ Jl
+            J = np.block([np.eye(3), -skew(self.t) - skew(R @ v)])
+            return vp, chain(J, Jl)
         else:
             return vp
 
+    def _transa_cloud(self, v, Jr, Jl):
+        # R is converted once and the cloud is transformed with one matrix product.
+        # The Jacobians are (N,3,6) stacks of the single point ones
+        R = self.R
+        vp = v @ R.T + self.t
+        if Jr is None and Jl is None:
+            return vp
+        J = np.empty((v.shape[0], 3, 6))
+        if Jr is not None:
+            J[:,:,:3] = R
+            J[:,:,3:] = -R @ skew_batch(v)
+            return vp, chain(J, Jr)
+        J[:,:,:3] = np.eye(3)
+        J[:,:,3:] = -skew_batch(vp)
+        return vp, chain(J, Jl)
+
     def transp(self, v, Jr=None, Jl=None):
         if Jr is not None:
             T_inv, J = self.inv(Jr=Jr)
@@ -132,7 +279,8 @@ class SE3:
             return T_inv.transa(v)
 
     def normalize(self):
-        self.q.normalize()
+        self.arr[3:] /= np.linalg.norm(self.arr[3:])
+        self._invalidate()
 
     def boxplusr(self, v, Jr=None, Jl=None):
         if Jr is not None:
@@ -190,30 +338,75 @@ class SE3:
         else:
             return SE3.Log(self * T.inv())
 
-    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None):
-        res = self * T
+    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None, out=None):
+        # out is an SE3 that is overwritten with the result and returned. The
+        # Jacobians are formed first since out may be one of the operands
         if Jr is not None:
-            return res, T.inv().Adj @ Jr
+            J = chain(T.inv().Adj, Jr)
         elif Jl is not None:
-            return res, np.eye(6) @ Jl
+            J = chain(None, Jl, 6)
         elif Jr2 is not None:
-            return res, np.eye(6) @ Jr2
+            J = chain(None, Jr2, 6)
         elif Jl2 is not None:
-            return res, self.Adj @ Jl2
+            J = chain(self.Adj, Jl2)
+        else:
+            J = None
+        if out is None:
+            res = self * T
         else:
-            return res
+            res = out._assign(_compose_floats(self.arr.tolist(), T.arr.tolist()))
+        return res if J is None else (res, J)
+
+    def compose_jac(self, T, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * T
+        if which == 'Jr':
+            return res, T.inv().Adj, np.eye(6)
+        elif which == 'Jl':
+            return res, np.eye(6), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        T_inv = T.inv()
+        dT = T_inv * self
+        if which == 'Jr':
+            tau, J = SE3.Log(dT, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dT.inv().Adj
+        elif which == 'Jl':
+            tau, J = SE3.Log(dT, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ T_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * T.inv()
+        if which == 'Jr':
+            tau, J = SE3.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ T.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SE3.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
 
     @staticmethod
     def Identity():
-        q = Quaternion.Identity()
-        return SE3(q, np.zeros(3))
+        return SE3._unchecked(np.array([0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0]))
 
     @staticmethod
     def log(T, Jr=None, Jl=None):
         if Jr is not None:
-            logq, Jq_inv = Quaternion.log(T.q, Jr=np.eye(3))
+            logq, Jq_inv = Quaternion.log(T.q, Jr=True)
+            Jq_inv = np.asarray(Jq_inv)
         elif Jl is not None:
-            logq, Jq_inv = Quaternion.log(T.q, Jl=np.eye(3))
+            logq, Jq_inv = Quaternion.log(T.q, Jl=True)
+            Jq_inv = np.asarray(Jq_inv)
         else:
             logq = Quaternion.log(T.q)
 
@@ -241,18 +434,21 @@ class SE3:
             Q = 0.5 * vx +  (theta - st)/theta**3 * (wx @ vx + vx @ wx + wx @ vx @ wx) - (1 - theta**2/2 - ct)/theta**4 * (wx2 @ vx + vx @ wx2 - 3 * wx @ vx @ wx) - 0.5 * ((1 - theta**2/2 - ct)/theta**4 - 3 * (theta - st - theta**3/6)/theta**5) * (wx @ vx @ wx2 + wx2 @ vx @ wx)
             J = np.block([[Jq_inv, -Jq_inv @ Q @ Jq_inv],
                           [np.zeros((3,3)), Jq_inv]])
-            return logT, J @ Jl
+            return logT, chain(J, Jl)
         else:
             return logT
 
     @staticmethod
-    def Log(T, Jr=None, Jl=None):
+    def Log(T, Jr=None, Jl=None, out=None):
+        # out is a (6,) array that is overwritten with the result and returned
         if Jr is not None:
             logT, J = SE3.log(T, Jr=Jr)
-            return SE3.vee(logT), J
+            return _fill(out, SE3.vee(logT)), J
         elif Jl is not None:
             logT, J = SE3.log(T, Jl=Jl)
-            return SE3.vee(logT), J
+            return _fill(out, SE3.vee(logT)), J
+        elif out is not None:
+            return _fill(out, _log_floats(T.arr.tolist()))
         else:
             logT = SE3.log(T)
             return SE3.vee(logT)
@@ -264,15 +460,18 @@ class SE3:
         theta = np.linalg.norm(w)
 
         if Jr is not None:
-            q, Jq = Quaternion.Exp(w, Jr=np.eye(3))
+            q, Jq = Quaternion.Exp(w, Jr=True)
+            Jq = np.asarray(Jq)
         elif Jl is not None:
-            q, Jq = Quaternion.Exp(w, Jl=np.eye(3))
+            q, Jq = Quaternion.Exp(w, Jl=True)
+            Jq = np.asarray(Jq)
         else:
             q = Quaternion.Exp(w)
 
         wx = skew(w)
+        ct, st = np.cos(theta), np.sin(theta)
         if theta > 1e-8:
-            V = np.eye(3) + (1 - np.cos(theta))/theta**2 * wx + (theta - np.sin(theta)) / theta**3 * (wx @ wx)
+            V = np.eye(3) + (1 - ct)/theta**2 * wx + (theta - st) / theta**3 * (wx @ wx)
             t = V @ v
         else:
             t = v
@@ -283,23 +482,28 @@ class SE3:
             wx = -wx
             Jl = Jr
         if Jl is not None or Jr is not None: # Consider doing a taylor series on Q (should simplify quite a bit)
-            ct, st = np.cos(theta), np.sin(theta)
             wx2 = wx @ wx
             Q = 0.5 * vx +  (theta - st)/theta**3 * (wx @ vx + vx @ wx + wx @ vx @ wx) - (1 - theta**2/2 - ct)/theta**4 * (wx2 @ vx + vx @ wx2 - 3 * wx @ vx @ wx) - 0.5 * ((1 - theta**2/2 - ct)/theta**4 - 3 * (theta - st - theta**3/6)/theta**5) * (wx @ vx @ wx2 + wx2 @ vx @ wx)
             J = np.block([[Jq, Q], [np.zeros((3,3)), Jq]])
-            return cls(q,t), J @ Jl
+            return cls._fromParts(q, t), chain(J, Jl)
         else:
-            return cls(q,t)
+            return cls._fromParts(q, t)
 
     @staticmethod
-    def Exp(vec, Jr=None, Jl=None):
+    def Exp(vec, Jr=None, Jl=None, out=None):
+        # out is an SE3 that is overwritten with the result and returned
+        if out is not None and Jr is None and Jl is None:
+            return out._assign(_exp_floats(*vec.tolist()))
         logT = SE3.hat(vec)
         if Jr is not None:
-            return SE3.exp(logT, Jr=Jr)
+            T, J = SE3.exp(logT, Jr=Jr)
         elif Jl is not None:
-            return SE3.exp(logT, Jl=Jl)
+            T, J = SE3.exp(logT, Jl=Jl)
         else:
             return SE3.exp(logT)
+        if out is not None:
+            T = out._assign(T.arr)
+        return T, J
 
     @staticmethod
     def hat(vec):
@@ -308,3 +512,353 @@ class SE3:
     @staticmethod
     def vee(vec):
         return np.array([*vec[:3], *vec[4:]])
+
+
+class SE3Batch:
+    """N poses stored as one (N,7) array laid out like SE3.T: [tx, ty, tz, qw, qx, qy, qz].
+
+    Mirrors the SE3 API with every operation vectorized over the first axis.
+    Operations broadcast against a single SE3 and Jacobians are returned as
+    (N,6,6) stacks (or (N,3,6) for transa/transp).
+    """
+    def __init__(self, arr):
+        arr = np.asarray(arr, dtype=float)
+        assert arr.ndim == 2 and arr.shape[1] == 7
+        neg = arr[:,3] < 0
+        if np.any(neg):
+            arr = np.concatenate([arr[:,:3], np.where(neg[:,None], -arr[:,3:], arr[:,3:])], axis=1)
+        self.arr = np.ascontiguousarray(arr)
+
+    @classmethod
+    def _unchecked(cls, arr): # Wraps a canonical (N,7) array without copying it
+        obj = cls.__new__(cls)
+        obj.arr = arr
+        return obj
+
+    @classmethod
+    def fromBuffer(cls, buf):
+        """Wraps an (N,7) array of poses in place, without copying.
+
+        buf is an (N,7) float64 array (including np.memmap) or any buffer
+        protocol object (bytearray, mmap, multiprocessing.shared_memory.buf)
+        holding N*7 doubles. The quaternions are used as stored and should be
+        canonical (qw >= 0). Slicing the batch and the out= results of its
+        operations write through to the buffer.
+        """
+        arr = buf if isinstance(buf, np.ndarray) else np.frombuffer(buf, dtype=float).reshape(-1, 7)
+        assert arr.ndim == 2 and arr.shape[1] == 7 and arr.dtype == np.float64
+        return cls._unchecked(arr)
+
+    @classmethod
+    def _fromParts(cls, t, q, out=None): # Writes [t, q] into out when given, flipping q to qw >= 0 in place
+        if out is None:
+            return cls(np.concatenate([t, q], axis=-1))
+        out[:,:3] = t
+        out[:,3:] = q
+        np.negative(out[:,3:], out=out[:,3:], where=out[:,3:4] < 0)
+        return cls._unchecked(out)
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i): # Elements and slices are views into arr
+        if isinstance(i, (int, np.integer)):
+            return SE3._unchecked(self.arr[i])
+        return SE3Batch._unchecked(self.arr[i])
+
+    def __mul__(self, T):
+        return self._compose(T)
+
+    def _compose(self, T, out=None):
+        assert isinstance(T, (SE3, SE3Batch))
+        t = self.t + rotate(self.q_arr, T.t)
+        q = hamilton(self.q_arr, T.q_arr)
+        return SE3Batch._fromParts(t, q, out)
+
+    def __str__(self):
+        return str(self.T)
+
+    def __repr__(self):
+        return f'SE3Batch({len(self)})'
+
+    @property
+    def t(self):
+        return self.arr[:,:3]
+
+    @property
+    def q_arr(self):
+        return self.arr[:,3:]
+
+    @property
+    def q(self):
+        return QuaternionBatch(self.q_arr)
+
+    @property
+    def R(self):
+        return rotation_matrix(self.q_arr)
+
+    @property
+    def T(self):
+        return self.arr
+
+    @property
+    def Adj(self):
+        R = self.R
+        adj = np.zeros((len(self), 6, 6))
+        adj[:,:3,:3] = R
+        adj[:,:3,3:] = skew_batch(self.t) @ R
+        adj[:,3:,3:] = R
+        return adj
+
+    def isValidTransform(self):
+        return np.abs(np.linalg.norm(self.q_arr, axis=1) - 1.0) <= 1e-8
+
+    def inv(self, Jr=None, Jl=None, out=None):
+        q_inv = self.q_arr * CONJUGATE
+        T_inv = SE3Batch._fromParts(-rotate(q_inv, self.t), q_inv, out)
+        if Jr is not None:
+            return T_inv, chain(-self.Adj, Jr)
+        elif Jl is not None:
+            return T_inv, chain(-T_inv.Adj, Jl)
+        else:
+            return T_inv
+
+    def transa(self, v, Jr=None, Jl=None, out=None): # v is (3,) or (N,3)
+        assert v.shape[-1] == 3
+        vp = np.add(self.t, rotate(self.q_arr, v), out=out)
+        if Jr is not None:
+            R = self.R
+            J = np.concatenate([R, -R @ skew_batch(v)], axis=2)
+            return vp, chain(J, Jr)
+        elif Jl is not None:
+            J = np.concatenate([np.broadcast_to(np.eye(3), (len(self), 3, 3)), -skew_batch(vp)], axis=2)
+            return vp, chain(J, Jl)
+        else:
+            return vp
+
+    def transp(self, v, Jr=None, Jl=None, out=None):
+        if Jr is not None:
+            T_inv, J = self.inv(Jr=Jr)
+            return T_inv.transa(v, Jr=J, out=out)
+        elif Jl is not None:
+            T_inv, J = self.inv(Jl=Jl)
+            return T_inv.transa(v, Jl=J, out=out)
+        else:
+            return self.inv().transa(v, out=out)
+
+    def normalize(self):
+        self.arr[:,3:] /= np.linalg.norm(self.q_arr, axis=1)[:,None]
+
+    def boxplusr(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            T, J = SE3Batch.Exp(v, Jr=Jr)
+            return self.compose(T, Jr2=J)
+        elif Jl is not None:
+            T, J = SE3Batch.Exp(v, Jl=Jl)
+            return self.compose(T, Jl2=J)
+        else:
+            return self * SE3Batch.Exp(v)
+
+    def boxminusr(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        if Jr1 is not None:
+            dT, J = T.inv().compose(self, Jr2=Jr1)
+            return SE3Batch.Log(dT, Jr=J)
+        elif Jl1 is not None:
+            dT, J = T.inv().compose(self, Jl2=Jl1)
+            return SE3Batch.Log(dT, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            dT, J = T_inv.compose(self, Jr=J)
+            return SE3Batch.Log(dT, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            dT, J = T_inv.compose(self, Jl=J)
+            return SE3Batch.Log(dT, Jl=J)
+        else:
+            return SE3Batch.Log(T.inv() * self)
+
+    def boxplusl(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            T, J = SE3Batch.Exp(v, Jr=Jr)
+            return T.compose(self, Jr=J)
+        elif Jl is not None:
+            T, J = SE3Batch.Exp(v, Jl=Jl)
+            return T.compose(self, Jl=J)
+        else:
+            return SE3Batch.Exp(v) * self
+
+    def boxminusl(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        if Jr1 is not None:
+            diff, J = self.compose(T.inv(), Jr=Jr1)
+            return SE3Batch.Log(diff, Jr=J)
+        elif Jl1 is not None:
+            diff, J = self.compose(T.inv(), Jl=Jl1)
+            return SE3Batch.Log(diff, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            diff, J = self.compose(T_inv, Jr2=J)
+            return SE3Batch.Log(diff, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            diff, J = self.compose(T_inv, Jl2=J)
+            return SE3Batch.Log(diff, Jl=J)
+        else:
+            return SE3Batch.Log(self * T.inv())
+
+    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None, out=None):
+        # The Jacobian is formed before the product since out may alias either operand
+        if Jr is not None:
+            J = chain(T.inv().Adj, Jr)
+        elif Jl is not None:
+            J = chain(None, Jl, 6)
+        elif Jr2 is not None:
+            J = chain(None, Jr2, 6)
+        elif Jl2 is not None:
+            J = chain(self.Adj, Jl2)
+        else:
+            return self._compose(T, out)
+        return self._compose(T, out), J
+
+    def compose_jac(self, T, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * T
+        if which == 'Jr':
+            return res, T.inv().Adj, np.eye(6)
+        elif which == 'Jl':
+            return res, np.eye(6), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        T_inv = T.inv()
+        dT = T_inv * self
+        if which == 'Jr':
+            tau, J = SE3Batch.Log(dT, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dT.inv().Adj
+        elif which == 'Jl':
+            tau, J = SE3Batch.Log(dT, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ T_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, T, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * T.inv()
+        if which == 'Jr':
+            tau, J = SE3Batch.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ T.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SE3Batch.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    @classmethod
+    def fromList(cls, Ts):
+        return cls(np.array([T.T for T in Ts]))
+
+    @classmethod
+    def fromRAndt(cls, R, t): # R is (N,3,3) and t is (N,3)
+        return cls(np.concatenate([t, quaternion_from_matrix(R)], axis=1))
+
+    @classmethod
+    def fromRPYandt(cls, rpy, t): # rpy and t are (N,3)
+        return cls(np.concatenate([t, quaternion_from_rpy(rpy)], axis=1))
+
+    @classmethod
+    def fromAxisAngleAndt(cls, v, t): # v and t are (N,3)
+        return cls(np.concatenate([t, QuaternionBatch.Exp(np.asarray(v, dtype=float)).q], axis=1))
+
+    @staticmethod
+    def Identity(n):
+        return SE3Batch(np.tile(np.array([0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0]), (n,1)))
+
+    @classmethod
+    def random(cls, n, rng=None):
+        q = QuaternionBatch.random(n, rng)
+        rng = np.random if rng is None else rng
+        t = rng.uniform(-10.0, 10.0, size=(n,3))
+        return cls(np.concatenate([t, q.q], axis=1))
+
+    @staticmethod
+    def _Q(v, w, C, c2, c3):
+        # Off diagonal block of the SE3 left Jacobian for (N,3) v and w. The
+        # right Jacobian's block Q(-v,-w) is its transpose.
+        vx, wx = skew_batch(v), skew_batch(w)
+        wx2 = wx @ wx
+        wvw = wx @ vx @ wx
+        C, c2, c3 = C[:,None,None], c2[:,None,None], c3[:,None,None]
+        return 0.5 * vx + C * (wx @ vx + vx @ wx + wvw) - c2 * (wx2 @ vx + vx @ wx2 - 3 * wvw) - 0.5 * c3 * (wvw @ wx + wx @ wvw)
+
+    @staticmethod
+    def _blocks(Jq, Q, which):
+        # Assembles [[Jq, Q], [0, Jq]] and its blockwise transpose
+        jacs = {}
+        for name in which:
+            J = np.zeros((Jq.shape[0], 6, 6))
+            if name == 'Jl':
+                J[:,:3,:3], J[:,:3,3:], J[:,3:,3:] = Jq, Q, Jq
+            else:
+                Jq_T = Jq.transpose(0,2,1)
+                J[:,:3,:3], J[:,:3,3:], J[:,3:,3:] = Jq_T, Q.transpose(0,2,1), Jq_T
+            jacs[name] = J
+        return jacs
+
+    @classmethod
+    def _exp_jacobians(cls, vec, which=()):
+        # Exp plus the requested Jacobians sharing the trig terms, V and Q
+        v, w = vec[:,:3], vec[:,3:]
+        theta = np.linalg.norm(w, axis=1)
+        _, B, C, _, *q_coeffs = so3_coefficients(theta, se3=bool(which))
+        wx = skew_batch(w)
+        V = np.eye(3) + B[:,None,None] * wx + C[:,None,None] * (wx @ wx) # Left Jacobian of SO3
+        t = (V @ v[:,:,None])[:,:,0]
+        q = QuaternionBatch.Exp(w)
+        T = cls(np.concatenate([t, q.q], axis=1))
+        if not which:
+            return T, {}
+
+        return T, SE3Batch._blocks(V, SE3Batch._Q(v, w, C, *q_coeffs), which)
+
+    @classmethod
+    def Exp(cls, vec, Jr=None, Jl=None): # vec is (N,6) ordered [v, w]
+        assert vec.ndim == 2 and vec.shape[1] == 6
+        if Jr is not None:
+            T, J = cls._exp_jacobians(vec, ('Jr',))
+            return T, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            T, J = cls._exp_jacobians(vec, ('Jl',))
+            return T, chain(J['Jl'], Jl)
+        else:
+            return cls._exp_jacobians(vec)[0]
+
+    @staticmethod
+    def _log_jacobians(T, which=()):
+        w = QuaternionBatch.Log(T.q)
+        theta = np.linalg.norm(w, axis=1)
+        _, _, C, D, *q_coeffs = so3_coefficients(theta, se3=bool(which))
+        wx = skew_batch(w)
+        V_inv = np.eye(3) - 0.5 * wx + D[:,None,None] * (wx @ wx) # Inverse left Jacobian of SO3
+        v = (V_inv @ T.t[:,:,None])[:,:,0]
+        logT = np.concatenate([v, w], axis=1)
+        if not which:
+            return logT, {}
+
+        Q = SE3Batch._Q(v, w, C, *q_coeffs)
+        return logT, SE3Batch._blocks(V_inv, -V_inv @ Q @ V_inv, which)
+
+    @staticmethod
+    def Log(T, Jr=None, Jl=None): # Returns an (N,6) array ordered [v, w]
+        assert isinstance(T, SE3Batch)
+        if Jr is not None:
+            logT, J = SE3Batch._log_jacobians(T, ('Jr',))
+            return logT, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            logT, J = SE3Batch._log_jacobians(T, ('Jl',))
+            return logT, chain(J['Jl'], Jl)
+        else:
+            return SE3Batch._log_jacobians(T)[0]
@@ -0,0 +1,302 @@
+"""SE3 stored as a 4x4 homogeneous matrix, analogous to how SE2 stores a 3x3.
+
+SE3Matrix shares the API of the quaternion SE3 (Exp, Log, Adj, inv, compose,
+transa/transp and the boxplus/boxminus operators with their Jacobians) and
+converts to and from it with fromSE3/toSE3. Composition is a single 4x4
+matrix product, which makes long chains cheap to evaluate: compose_chain
+multiplies a whole chain (or many chains at once) with np.linalg.multi_dot
+or stacked matmuls. Exp is evaluated on the matrix directly, Log and the
+Jacobians of Exp go through the quaternion (which is more stable near pi).
+"""
+import numpy as np
+import validation
+from jacobians import chain
+from quaternion import skew, skew_batch, quaternion_from_matrix, rotation_matrix
+from so3 import _exp_floats as _so3_exp_floats
+from se3 import SE3, _exp_floats as _se3_exp_floats, _log_floats as _se3_log_floats
+
+_MULTI_DOT_MAX = 3 # multi_dot orders longer chains by dynamic programming, see compose_chain
+
+def _exp_floats(vx, vy, vz, wx, wy, wz):
+    # SE3Matrix.Exp on python floats, R by Rodrigues' formula and t = V v as in SE3.Exp
+    (r00, r01, r02), (r10, r11, r12), (r20, r21, r22) = _so3_exp_floats(wx, wy, wz)
+    tx, ty, tz, *_ = _se3_exp_floats(vx, vy, vz, wx, wy, wz)
+    return ((r00, r01, r02, tx),
+            (r10, r11, r12, ty),
+            (r20, r21, r22, tz),
+            (0.0, 0.0, 0.0, 1.0))
+
+def _reduce(Ts): # (B,4,4) products of a (B,N,4,4) stack of chains, neighbouring pairs at a time
+    while Ts.shape[1] > 1:
+        n = Ts.shape[1] // 2 * 2
+        prod = Ts[:,0:n:2] @ Ts[:,1:n:2] # Keeps the order of the chain
+        Ts = prod if n == Ts.shape[1] else np.concatenate([prod, Ts[:,n:]], axis=1)
+    return Ts[:,0]
+
+def compose_chain(Ts):
+    """The product T1 T2 ... Tn of a chain of transforms.
+
+    Ts is a sequence of SE3Matrix or an (N,4,4) array and the product is
+    returned as an SE3Matrix. A (B,N,4,4) array holds B chains of length N and
+    comes back as the (B,4,4) array of their products. Short chains are
+    multiplied with np.linalg.multi_dot, longer ones are reduced pairwise with
+    stacked matmuls in log2(N) steps (multi_dot searches for the best order in
+    O(N^3) beyond three factors, which buys nothing when every factor is 4x4).
+    """
+    if isinstance(Ts, np.ndarray) and Ts.ndim == 4:
+        assert Ts.shape[2:] == (4,4) and Ts.shape[1] > 0
+        return _reduce(Ts)
+    mats = [T.arr if isinstance(T, SE3Matrix) else T for T in Ts]
+    assert len(mats) > 0
+    if len(mats) == 1:
+        return SE3Matrix(mats[0])
+    elif len(mats) <= _MULTI_DOT_MAX:
+        return SE3Matrix._unchecked(np.linalg.multi_dot(mats))
+    return SE3Matrix._unchecked(_reduce(np.array(mats)[None])[0])
+
+class SE3Matrix:
+    __slots__ = ('arr',)
+
+    def __init__(self, T, copy=True):
+        # T is copied unless copy=False, in which case the group aliases it (see view)
+        if validation.enabled:
+            assert T.shape == (4,4)
+        self.arr = np.array(T, dtype=float) if copy else T
+
+    @classmethod
+    def _unchecked(cls, T): # Internal results are well formed and skip the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = T
+        return obj
+
+    @classmethod
+    def view(cls, T):
+        """Wraps a (4,4) homogeneous transform without copying or checking it.
+
+        The group aliases T, so T must not be modified while the group is in use.
+        """
+        return cls._unchecked(T)
+
+    @classmethod
+    def fromRandt(cls, R, t):
+        if validation.enabled:
+            assert R.shape == (3,3)
+            assert t.size == 3
+        return cls._fromRandt(R, t)
+
+    @classmethod
+    def _fromRandt(cls, R, t): # fromRandt without the checks, for R and t of a well formed element
+        T = np.eye(4)
+        T[:3,:3] = R
+        T[:3,3] = t
+        return cls._unchecked(T)
+
+    @classmethod
+    def fromSE3(cls, T):
+        return cls._fromRandt(T.R, T.t)
+
+    def toSE3(self):
+        # The rotation is converted by Shepperd's method, so toSE3(fromSE3(T)) recovers T
+        q = quaternion_from_matrix(self.R)
+        return SE3._unchecked(np.concatenate([self.t, q]))
+
+    @classmethod
+    def from7vec(cls, arr):
+        return cls.fromSE3(SE3.from7vec(arr))
+
+    @property
+    def R(self):
+        return self.arr[:3,:3]
+
+    @property
+    def t(self):
+        return self.arr[:3,3]
+
+    @property
+    def T(self):
+        return self.arr
+
+    @property
+    def Adj(self):
+        R = self.R
+        Adj = np.zeros((6,6))
+        Adj[:3,:3] = Adj[3:,3:] = R
+        Adj[:3,3:] = skew(self.t) @ R
+        return Adj
+
+    def __mul__(self, T):
+        if validation.enabled:
+            assert isinstance(T, SE3Matrix)
+        return SE3Matrix._unchecked(self.arr @ T.arr)
+
+    def __str__(self):
+        return str(self.arr)
+
+    def __repr__(self):
+        return f'SE3Matrix({self.arr})'
+
+    def isValidTransform(self):
+        R = self.R
+        return (np.allclose(R.T @ R, np.eye(3), atol=1e-8) and np.linalg.det(R) > 0
+                and np.array_equal(self.arr[3], [0.0, 0.0, 0.0, 1.0]))
+
+    def normalize(self):
+        # Projects R back onto SO(3) through a unit quaternion, e.g. after a long chain of products
+        q = quaternion_from_matrix(self.R)
+        self.arr = self.arr.copy()
+        self.arr[:3,:3] = rotation_matrix(q / np.linalg.norm(q))
+
+    def inv(self, Jr=None, Jl=None):
+        R_T = self.R.T
+        T_inv = np.eye(4)
+        T_inv[:3,:3] = R_T
+        T_inv[:3,3] = -R_T @ self.t
+        T_inv = SE3Matrix._unchecked(T_inv)
+        if Jr is not None:
+            return T_inv, chain(-self.Adj, Jr)
+        elif Jl is not None:
+            return T_inv, chain(-T_inv.Adj, Jl)
+        else:
+            return T_inv
+
+    def transa(self, v, Jr=None, Jl=None): # v is (3,) or an (N,3) point cloud
+        R = self.R
+        if v.ndim == 2:
+            vp = v @ R.T + self.t
+            if Jr is None and Jl is None:
+                return vp
+            J = np.empty((v.shape[0], 3, 6))
+            if Jr is not None:
+                J[:,:,:3] = R
+                J[:,:,3:] = -R @ skew_batch(v)
+                return vp, chain(J, Jr)
+            J[:,:,:3] = np.eye(3)
+            J[:,:,3:] = -skew_batch(vp)
+            return vp, chain(J, Jl)
+        vp = self.t + R @ v
+        if Jr is not None:
+            J = np.block([R, -R @ skew(v)])
+            return vp, chain(J, Jr)
+        elif Jl is not None:
+            J = np.block([np.eye(3), -skew(vp)])
+            return vp, chain(J, Jl)
+        else:
+            return vp
+
+    def transp(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            T_inv, J = self.inv(Jr=Jr)
+            return T_inv.transa(v, Jr=J)
+        elif Jl is not None:
+            T_inv, J = self.inv(Jl=Jl)
+            return T_inv.transa(v, Jl=J)
+        else:
+            return self.inv().transa(v)
+
+    def compose(self, T, Jr=None, Jl=None, Jr2=None, Jl2=None):
+        res = self * T
+        if Jr is not None:
+            return res, chain(T.inv().Adj, Jr)
+        elif Jl is not None:
+            return res, chain(None, Jl, 6)
+        elif Jr2 is not None:
+            return res, chain(None, Jr2, 6)
+        elif Jl2 is not None:
+            return res, chain(self.Adj, Jl2)
+        else:
+            return res
+
+    def boxplusr(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            T, J = SE3Matrix.Exp(v, Jr=Jr)
+            return self.compose(T, Jr2=J)
+        elif Jl is not None:
+            T, J = SE3Matrix.Exp(v, Jl=Jl)
+            return self.compose(T, Jl2=J)
+        else:
+            return self * SE3Matrix.Exp(v)
+
+    def boxminusr(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        if Jr1 is not None:
+            dT, J = T.inv().compose(self, Jr2=Jr1)
+            return SE3Matrix.Log(dT, Jr=J)
+        elif Jl1 is not None:
+            dT, J = T.inv().compose(self, Jl2=Jl1)
+            return SE3Matrix.Log(dT, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            dT, J = T_inv.compose(self, Jr=J)
+            return SE3Matrix.Log(dT, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            dT, J = T_inv.compose(self, Jl=J)
+            return SE3Matrix.Log(dT, Jl=J)
+        else:
+            return SE3Matrix.Log(T.inv() * self)
+
+    def boxplusl(self, v, Jr=None, Jl=None):
+        if Jr is not None:
+            T, J = SE3Matrix.Exp(v, Jr=Jr)
+            return T.compose(self, Jr=J)
+        elif Jl is not None:
+            T, J = SE3Matrix.Exp(v, Jl=Jl)
+            return T.compose(self, Jl=J)
+        else:
+            return SE3Matrix.Exp(v) * self
+
+    def boxminusl(self, T, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        if Jr1 is not None:
+            diff, J = self.compose(T.inv(), Jr=Jr1)
+            return SE3Matrix.Log(diff, Jr=J)
+        elif Jl1 is not None:
+            diff, J = self.compose(T.inv(), Jl=Jl1)
+            return SE3Matrix.Log(diff, Jl=J)
+        elif Jr2 is not None:
+            T_inv, J = T.inv(Jr=Jr2)
+            diff, J = self.compose(T_inv, Jr2=J)
+            return SE3Matrix.Log(diff, Jr=J)
+        elif Jl2 is not None:
+            T_inv, J = T.inv(Jl=Jl2)
+            diff, J = self.compose(T_inv, Jl2=J)
+            return SE3Matrix.Log(diff, Jl=J)
+        else:
+            return SE3Matrix.Log(self * T.inv())
+
+    @staticmethod
+    def Identity():
+        return SE3Matrix._unchecked(np.eye(4))
+
+    @classmethod
+    def random(cls, rng=None):
+        return cls.fromSE3(SE3.random(rng=rng))
+
+    @staticmethod
+    def Log(T, Jr=None, Jl=None): # Returns a (6,) array ordered [v, w] as SE3.Log
+        if Jr is not None:
+            return SE3.Log(T.toSE3(), Jr=Jr)
+        elif Jl is not None:
+            return SE3.Log(T.toSE3(), Jl=Jl)
+        else:
+            return np.array(_se3_log_floats(T.toSE3().arr.tolist()))
+
+    @staticmethod
+    def Exp(vec, Jr=None, Jl=None): # vec is (6,) ordered [v, w]
+        if Jr is not None:
+            T, J = SE3.Exp(vec, Jr=Jr)
+            return SE3Matrix.fromSE3(T), J
+        elif Jl is not None:
+            T, J = SE3.Exp(vec, Jl=Jl)
+            return SE3Matrix.fromSE3(T), J
+        else:
+            return SE3Matrix._unchecked(np.array(_exp_floats(*vec.tolist())))
+
+    @staticmethod
+    def hat(vec): # The 4x4 matrix in se(3) of a (6,) [v, w] vector
+        logT = np.zeros((4,4))
+        logT[:3,:3] = skew(vec[3:])
+        logT[:3,3] = vec[:3]
+        return logT
+
+    @staticmethod
+    def vee(logT):
+        return np.array([*logT[:3,3], logT[2,1], logT[0,2], logT[1,0]])
@@ -1,15 +1,41 @@
 import numpy as np
+import validation
+from jacobians import sample_gaussian
 
 G = np.array([[0, -1], [1, 0]])
 
+def wrap(theta): # Wraps angles to [-pi, pi)
+    return (theta + np.pi) % (2 * np.pi) - np.pi
+
 class SO2:
-    def __init__(self, R):
-        assert R.shape == (2,2)
-        self.arr = R
+    __slots__ = ('arr',)
+
+    def __init__(self, R, copy=True):
+        # R is copied unless copy=False, in which case the group aliases it (see view)
+        if validation.enabled:
+            assert R.shape == (2,2)
+        self.arr = np.array(R, dtype=float) if copy else R
+
+    @classmethod
+    def _unchecked(cls, R): # Internal results are well formed and skip the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = R
+        return obj
+
+    @classmethod
+    def view(cls, R):
+        """Wraps a (2,2) rotation matrix without copying or checking it.
+
+        The group aliases R, so R must not be modified while the group is in use.
+        """
+        return cls._unchecked(R)
 
     def __mul__(self, R2):
-        assert isinstance(R2, SO2)
-        return SO2(self.arr @ R2.arr)
+        if isinstance(R2, SO2Batch):
+            return SO2Batch(SO2.Log(self) + R2.arr)
+        if validation.enabled:
+            assert isinstance(R2, SO2)
+        return SO2._unchecked(self.arr @ R2.arr)
 
     def __str__(self):
         return str(self.R)
@@ -20,15 +46,16 @@ class SO2:
     def inv(self, Jr=None, Jl=None):
         if Jr:
             J = -1
-            return SO2(self.arr.T), J * Jr
+            return SO2._unchecked(self.arr.T), J * Jr
         elif Jl:
             J = -1
-            return SO2(self.arr.T), J * Jl
+            return SO2._unchecked(self.arr.T), J * Jl
         else:
-            return SO2(self.arr.T)
+            return SO2._unchecked(self.arr.T)
 
     def rota(self, v, Jr=None, Jl=None):
-        assert v.size == 2
+        if validation.enabled:
+            assert v.size == 2
         if Jr:
             J = self.R @ G @ v
             return self.R @ v, J * Jr
@@ -39,7 +66,8 @@ class SO2:
             return self.R @ v
 
     def rotp(self, v, Jr=None, Jl=None):
-        assert v.size == 2
+        if validation.enabled:
+            assert v.size == 2
         if Jr:
             R_inv, J = self.inv(Jr=Jr)
             vp, J = R_inv.rota(v, Jr=J)
@@ -63,7 +91,8 @@ class SO2:
             return self * SO2.Exp(w)
 
     def boxminusr(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(R2, SO2)
+        if validation.enabled:
+            assert isinstance(R2, SO2)
         if Jr1 is not None:
             dR, J = R2.inv().compose(self, Jr2=Jr1)
             return SO2.Log(dR, Jr=J)
@@ -92,7 +121,8 @@ class SO2:
             return SO2.Exp(w) * self
 
     def boxminusl(self, R, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(R, SO2)
+        if validation.enabled:
+            assert isinstance(R, SO2)
         if Jr1 is not None:
             temp, J = self.compose(R.inv(), Jr=Jr1)
             return SO2.Log(temp, Jr=J)
@@ -123,6 +153,22 @@ class SO2:
         else:
             return res
 
+    def compose_jac(self, R, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        if which not in ('Jr', 'Jl'):
+            raise ValueError("which must be 'Jr' or 'Jl'")
+        return self * R, 1.0, 1.0
+
+    def boxminusr_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands in one call (SO2 Jacobians are all +-1)
+        if which not in ('Jr', 'Jl'):
+            raise ValueError("which must be 'Jr' or 'Jl'")
+        return SO2.Log(R2.inv() * self), 1.0, -1.0
+
+    def boxminusl_jac(self, R2, which='Jr'):
+        # SO2 is abelian so the left and right differences coincide
+        return self.boxminusr_jac(R2, which)
+
     @property
     def R(self):
         return self.arr
@@ -132,12 +178,16 @@ class SO2:
         ct = np.cos(theta)
         st = np.sin(theta)
         R = np.array([[ct, -st], [st, ct]])
-        return cls(R)
+        return cls._unchecked(R)
 
     @classmethod
     def exp(cls, theta_x, Jr=None, Jl=None):
-        assert theta_x.shape == (2,2)
-        theta = theta_x[1,0]
+        if validation.enabled:
+            assert theta_x.shape == (2,2)
+        return cls._exp(theta_x[1,0], Jr, Jl)
+
+    @classmethod
+    def _exp(cls, theta, Jr=None, Jl=None): # exp of the angle, without the checks of exp
         if Jr:
             return cls.fromAngle(theta), 1.0 * Jr
         if Jl:
@@ -146,23 +196,16 @@ class SO2:
 
     @classmethod
     def Exp(cls, theta, Jr=None, Jl=None):
-        logR = cls.hat(theta)
-        if Jr:
-            R, J = cls.exp(logR, Jr=Jr)
-            return R, J
-        elif Jl:
-            R, J = cls.exp(logR, Jl=Jl)
-            return R, J
-        else:
-            return cls.exp(logR)
+        return cls._exp(theta, Jr, Jl)
 
     @staticmethod
     def Identity():
-        return SO2(np.eye(2))
+        return SO2(np.eye(2), copy=False)
 
     @staticmethod
     def log(R, Jr=None, Jl=None):
-        assert isinstance(R, SO2)
+        if validation.enabled:
+            assert isinstance(R, SO2)
         theta = np.arctan2(R.arr[1,0], R.arr[0,0])
         if Jr:
             return G * theta, 1.0 * Jr
@@ -185,7 +228,8 @@ class SO2:
 
     @staticmethod
     def vee(theta_x):
-        assert theta_x.shape == (2,2)
+        if validation.enabled:
+            assert theta_x.shape == (2,2)
         return theta_x[1,0]
 
     @staticmethod
@@ -197,6 +241,216 @@ class SO2:
         return 1.0
 
     @classmethod
-    def random(cls):
-        theta = np.random.uniform(-np.pi, np.pi)
+    def random(cls, n=None, rng=None):
+        # n samples come back as an SO2Batch. rng is an np.random.Generator for reproducible draws
+        if n is not None:
+            return SO2Batch.random(n, rng)
+        rng = np.random if rng is None else rng
+        theta = rng.uniform(-np.pi, np.pi)
         return cls.fromAngle(theta)
+
+    @classmethod
+    def sample_gaussian(cls, mean, cov, n, side='right', rng=None):
+        # n draws of mean (+) xi with xi ~ N(0, cov) as an SO2Batch, see jacobians.sample_gaussian
+        return sample_gaussian(cls, mean, cov, n, side, rng)
+
+
+class SO2Batch:
+    """N planar rotations stored as an (N,) array of angles wrapped to [-pi, pi).
+
+    Mirrors the SO2 API with every operation vectorized over the first axis.
+    Composition is an addition of angles and the Jacobians, which are scalars
+    for SO2, come back as (N,) arrays.
+    """
+    def __init__(self, theta):
+        theta = np.asarray(theta, dtype=float)
+        assert theta.ndim == 1
+        self.arr = wrap(theta)
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return SO2.fromAngle(self.arr[i])
+        return SO2Batch(self.arr[i])
+
+    def __mul__(self, R2):
+        assert isinstance(R2, (SO2, SO2Batch))
+        return SO2Batch(self.arr + SO2Batch._angle(R2))
+
+    def __str__(self):
+        return str(self.arr)
+
+    def __repr__(self):
+        return f'SO2Batch({len(self)})'
+
+    @staticmethod
+    def _angle(R):
+        return R.arr if isinstance(R, SO2Batch) else SO2.Log(R)
+
+    def inv(self, Jr=None, Jl=None):
+        R_inv = SO2Batch(-self.arr)
+        if Jr is not None:
+            return R_inv, -self.Adj * Jr
+        elif Jl is not None:
+            return R_inv, -self.Adj * Jl
+        else:
+            return R_inv
+
+    def rota(self, v, Jr=None, Jl=None): # v is (2,) or (N,2)
+        assert v.shape[-1] == 2
+        vp = np.einsum('...ij,...j->...i', self.R, v)
+        if Jr is not None:
+            J = np.einsum('...ij,...j->...i', self.R @ G, v)
+            return vp, J * np.reshape(Jr, (-1,1))
+        elif Jl is not None:
+            J = vp @ G.T
+            return vp, J * np.reshape(Jl, (-1,1))
+        else:
+            return vp
+
+    def rotp(self, v, Jr=None, Jl=None):
+        assert v.shape[-1] == 2
+        if Jr is not None:
+            R_inv, J = self.inv(Jr=Jr)
+            return R_inv.rota(v, Jr=J)
+        elif Jl is not None:
+            R_inv, J = self.inv(Jl=Jl)
+            return R_inv.rota(v, Jl=J)
+        else:
+            return self.inv().rota(v)
+
+    def boxplusr(self, w, Jr=None, Jl=None):
+        if Jr is not None:
+            R2, J = SO2Batch.Exp(w, Jr=Jr)
+            return self.compose(R2, Jr2=J)
+        elif Jl is not None:
+            R2, J = SO2Batch.Exp(w, Jl=Jl)
+            return self.compose(R2, Jl2=J)
+        else:
+            return self * SO2Batch.Exp(w)
+
+    def boxminusr(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(R2, (SO2, SO2Batch))
+        dR = SO2Batch(self.arr - SO2Batch._angle(R2))
+        if Jr1 is not None:
+            return SO2Batch.Log(dR, Jr=Jr1)
+        elif Jl1 is not None:
+            return SO2Batch.Log(dR, Jl=Jl1)
+        elif Jr2 is not None:
+            return SO2Batch.Log(dR, Jr=-Jr2)
+        elif Jl2 is not None:
+            return SO2Batch.Log(dR, Jl=-Jl2)
+        else:
+            return SO2Batch.Log(dR)
+
+    def boxplusl(self, w, Jr=None, Jl=None):
+        if Jr is not None:
+            R, J = SO2Batch.Exp(w, Jr=Jr)
+            return R.compose(self, Jr=J)
+        elif Jl is not None:
+            R, J = SO2Batch.Exp(w, Jl=Jl)
+            return R.compose(self, Jl=J)
+        else:
+            return SO2Batch.Exp(w) * self
+
+    def boxminusl(self, R, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        # SO2 is abelian so the left and right differences coincide
+        return self.boxminusr(R, Jr1=Jr1, Jl1=Jl1, Jr2=Jr2, Jl2=Jl2)
+
+    def compose(self, R, Jr=None, Jl=None, Jr2=None, Jl2=None):
+        res = self * R
+        if Jr is not None:
+            return res, self.Adj * Jr
+        elif Jr2 is not None:
+            return res, self.Adj * Jr2
+        elif Jl is not None:
+            return res, self.Adj * Jl
+        elif Jl2 is not None:
+            return res, self.Adj * Jl2
+        else:
+            return res
+
+    def compose_jac(self, R, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        if which not in ('Jr', 'Jl'):
+            raise ValueError("which must be 'Jr' or 'Jl'")
+        return self * R, self.Adj, self.Adj
+
+    def boxminusr_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands in one call (SO2 Jacobians are all +-1)
+        if which not in ('Jr', 'Jl'):
+            raise ValueError("which must be 'Jr' or 'Jl'")
+        return SO2Batch.Log(R2.inv() * self), self.Adj, -self.Adj
+
+    def boxminusl_jac(self, R2, which='Jr'):
+        # SO2 is abelian so the left and right differences coincide
+        return self.boxminusr_jac(R2, which)
+
+    @property
+    def theta(self):
+        return self.arr
+
+    @property
+    def R(self): # (N,2,2) stack of rotation matrices
+        ct, st = np.cos(self.arr), np.sin(self.arr)
+        return np.stack([np.stack([ct, -st], axis=-1), np.stack([st, ct], axis=-1)], axis=-2)
+
+    @property
+    def Adj(self):
+        return np.ones(len(self))
+
+    @classmethod
+    def fromAngle(cls, theta):
+        return cls(theta)
+
+    @classmethod
+    def fromList(cls, Rs):
+        return cls(np.array([SO2.Log(R) for R in Rs]))
+
+    @staticmethod
+    def Identity(n):
+        return SO2Batch(np.zeros(n))
+
+    @classmethod
+    def random(cls, n, rng=None):
+        rng = np.random if rng is None else rng
+        return cls(rng.uniform(-np.pi, np.pi, size=n))
+
+    @classmethod
+    def _exp_jacobians(cls, theta, which=()):
+        R = cls(theta)
+        return R, {name: R.Adj for name in which}
+
+    @staticmethod
+    def _log_jacobians(R, which=()):
+        return R.arr.copy(), {name: R.Adj for name in which}
+
+    @classmethod
+    def Exp(cls, theta, Jr=None, Jl=None):
+        R = cls(theta)
+        if Jr is not None:
+            return R, R.Adj * Jr
+        elif Jl is not None:
+            return R, R.Adj * Jl
+        else:
+            return R
+
+    @staticmethod
+    def Log(R, Jr=None, Jl=None):
+        assert isinstance(R, SO2Batch)
+        if Jr is not None:
+            return R.arr.copy(), R.Adj * Jr
+        elif Jl is not None:
+            return R.arr.copy(), R.Adj * Jl
+        else:
+            return R.arr.copy()
+
+    @staticmethod
+    def hat(theta):
+        return theta[:,None,None] * G
+
+    @staticmethod
+    def vee(theta_x):
+        return theta_x[:,1,0]
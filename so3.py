@@ -1,4 +1,7 @@
+import math
 import numpy as np
+import validation
+from jacobians import so3_coefficients, chain, sample_gaussian, _fill
 
 G = np.array([[[0, 0, 0],
                 [0, 0, -1],
@@ -13,17 +16,94 @@ G = np.array([[[0, 0, 0],
 def skew(qv):
     return np.array([[0, -qv[2], qv[1]], [qv[2], 0, -qv[0]], [-qv[1], qv[0], 0]])
 
+def matrix_from_rpy(rpy): # (..., 3, 3) matrices Rz(psi) Ry(theta) Rx(phi) from (..., 3) [phi, theta, psi]
+    rpy = np.asarray(rpy, dtype=float)
+    cp, sp = np.cos(rpy[...,0]), np.sin(rpy[...,0])
+    ct, st = np.cos(rpy[...,1]), np.sin(rpy[...,1])
+    cs, ss = np.cos(rpy[...,2]), np.sin(rpy[...,2])
+    R = np.empty(rpy.shape[:-1] + (3,3))
+    R[...,0,0], R[...,0,1], R[...,0,2] = cs * ct, cs * st * sp - ss * cp, cs * st * cp + ss * sp
+    R[...,1,0], R[...,1,1], R[...,1,2] = ss * ct, ss * st * sp + cs * cp, ss * st * cp - cs * sp
+    R[...,2,0], R[...,2,1], R[...,2,2] = -st, ct * sp, ct * cp
+    return R
+
+def matrix_to_rpy(R): # (..., 3) [phi, theta, psi] of (..., 3, 3) matrices, the inverse of matrix_from_rpy
+    phi = np.arctan2(R[...,2,1], R[...,2,2])
+    theta = np.arctan2(-R[...,2,0], np.hypot(R[...,2,1], R[...,2,2]))
+    psi = np.arctan2(R[...,1,0], R[...,0,0])
+    return np.stack([phi, theta, psi], axis=-1)
+
+def skew_batch(v): # Stack of skew matrices for an (..., 3) array of vectors
+    S = np.zeros(v.shape[:-1] + (3,3))
+    S[...,0,1] = -v[...,2]
+    S[...,0,2] = v[...,1]
+    S[...,1,0] = v[...,2]
+    S[...,1,2] = -v[...,0]
+    S[...,2,0] = -v[...,1]
+    S[...,2,1] = v[...,0]
+    return S
+
+def _log_scale(theta): # logR = _log_scale(theta) * (R - R^T)
+    if np.abs(theta) < 1e-8: # Do taylor series expansion
+        return 1/2.0 * (1 + theta**2 / 6.0 + 7 * theta**4 / 360)
+    elif np.abs(np.abs(theta) - np.pi) < 1e-3:
+        temp = - np.pi/(theta - np.pi) - 1 - np.pi/6 * (theta - np.pi) - (theta - np.pi)**2/6 - 7*np.pi/360 * (theta - np.pi)**3 - 7/360.0 * (theta - np.pi)**4
+        return temp/2.0
+    else:
+        return theta / (2.0 * np.sin(theta))
+
+def _exp_floats(x, y, z):
+    # SO3.exp on python floats, R = I + A wx + B wx^2 with wx^2 = w w^T - theta^2 I
+    theta2 = x*x + y*y + z*z
+    theta = math.sqrt(theta2)
+    if theta > 1e-8:
+        A, B = math.sin(theta) / theta, (1 - math.cos(theta)) / theta2
+    else:
+        A, B = 1.0 - theta2 / 6.0, 0.5 - theta2 / 24.0
+    return ((1 - B*(y*y + z*z), B*x*y - A*z, B*x*z + A*y),
+            (B*x*y + A*z, 1 - B*(x*x + z*z), B*y*z - A*x),
+            (B*x*z - A*y, B*y*z + A*x, 1 - B*(x*x + y*y)))
+
+def _log_floats(R):
+    # SO3.Log on python floats of the nested list R
+    (r00, r01, r02), (r10, r11, r12), (r20, r21, r22) = R
+    theta = math.acos(min(max((r00 + r11 + r22 - 1) / 2.0, -1.0), 1.0))
+    s = _log_scale(theta)
+    return s * (r21 - r12), s * (r02 - r20), s * (r10 - r01)
+
 class SO3:
-    def __init__(self, R):
-        assert (R.shape == (3,3))
-        self.arr = R
+    __slots__ = ('arr',)
+
+    def __init__(self, R, copy=True):
+        # R is copied unless copy=False, in which case the group aliases it (see view)
+        if validation.enabled:
+            assert (R.shape == (3,3))
+        self.arr = np.array(R, dtype=float) if copy else R
+
+    @classmethod
+    def _unchecked(cls, R): # Internal results are well formed and skip the checks of __init__
+        obj = cls.__new__(cls)
+        obj.arr = R
+        return obj
+
+    @classmethod
+    def view(cls, R):
+        """Wraps a (3,3) rotation matrix without copying or checking it.
+
+        The group aliases R, so R must not be modified while the group is in use.
+        """
+        return cls._unchecked(R)
 
     def __mul__(self, R2):
-        assert isinstance(R2, SO3)
-        return SO3(self.R @ R2.R)
+        if isinstance(R2, SO3Batch):
+            return SO3Batch(self.R @ R2.R)
+        if validation.enabled:
+            assert isinstance(R2, SO3)
+        return SO3._unchecked(self.R @ R2.R)
 
     def __sub__(self, R2):
-        assert isinstance(R2, SO3)
+        if validation.enabled:
+            assert isinstance(R2, SO3)
         return self.R - R2.R
 
     def __str__(self):
@@ -32,32 +112,41 @@ class SO3:
     def __repr__(self):
         return str(self.R)
 
-    def inv(self, Jr=None, Jl=None):
+    def _assign(self, R): # Overwrites the matrix in place, for out= targets
+        self.arr[...] = R
+        return self
+
+    def inv(self, Jr=None, Jl=None, out=None):
+        # out is an SO3 that is overwritten with the inverse and returned
         if not Jr is None:
-            return SO3(self.arr.T), -self.Adj @ Jr
+            J = chain(-self.Adj, Jr) # Before out (possibly self) is overwritten
+        R_inv = SO3._unchecked(self.arr.T) if out is None else out._assign(self.arr.T)
+        if not Jr is None:
+            return R_inv, J
         elif not Jl is None:
-            R_inv = SO3(self.arr.T)
-            return R_inv, -R_inv.Adj @ Jl
+            return R_inv, chain(-R_inv.Adj, Jl)
         else:
-            return SO3(self.arr.T)
+            return R_inv
 
     def transpose(self):
-        return SO3(self.arr.T)
+        return SO3._unchecked(self.arr.T)
 
     def rota(self, v, Jr=None, Jl=None):
-        assert v.size == 3
+        if validation.enabled:
+            assert v.size == 3
         vp = self.R @ v
         if not Jr is None:
             J = -self.R @ skew(v)
-            return vp, J @ Jr
+            return vp, chain(J, Jr)
         elif not Jl is None:
             J = -skew(vp)
-            return vp, J @ Jl
+            return vp, chain(J, Jl)
         else:
             return vp
 
     def rotp(self, v, Jr=None, Jl=None):
-        assert v.size == 3
+        if validation.enabled:
+            assert v.size == 3
         if not Jr is None:
             R_inv, J = self.inv(Jr=Jr)
             vp, J = R_inv.rota(v, Jr=J)
@@ -71,7 +160,8 @@ class SO3:
 
     # Assumes jacobian is with respect to v
     def boxplusr(self, v, Jr=None, Jl=None):
-        assert(v.size == 3)
+        if validation.enabled:
+            assert(v.size == 3)
         if not Jr is None:
             R, J = SO3.Exp(v, Jr=Jr)
             res, J = self.compose(R, Jr2=J)
@@ -84,7 +174,8 @@ class SO3:
             return self * SO3.Exp(v)
 
     def boxminusr(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(R2, SO3)
+        if validation.enabled:
+            assert isinstance(R2, SO3)
         if Jr1 is not None:
             dR, J = R2.inv().compose(self, Jr2=Jr1)
             return SO3.Log(dR, Jr=J)
@@ -103,7 +194,8 @@ class SO3:
             return SO3.Log(R2.inv() * self)
 
     def boxplusl(self, v, Jr=None, Jl=None):
-        assert(v.size == 3)
+        if validation.enabled:
+            assert(v.size == 3)
         if Jr is not None:
             R, J = SO3.Exp(v, Jr=Jr)
             return R.compose(self, Jr=J)
@@ -114,7 +206,8 @@ class SO3:
             return SO3.Exp(v) * self
 
     def boxminusl(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
-        assert isinstance(R2, SO3)
+        if validation.enabled:
+            assert isinstance(R2, SO3)
         if Jr1 is not None:
             diff, J = self.compose(R2.inv(), Jr=Jr1)
             return SO3.Log(diff, Jr=J)
@@ -144,19 +237,64 @@ class SO3:
     def det(self):
         return np.linalg.det(self.R)
 
-    def compose(self, R, Jr=None, Jl=None, Jr2=None, Jl2=None):
-        res = self * R
+    def compose(self, R, Jr=None, Jl=None, Jr2=None, Jl2=None, out=None):
+        # out is an SO3 that is overwritten with the result and returned. The Jacobians are
+        # formed first since out may be one of the operands, and as Adj is the matrix itself
+        # the factors are copied before out is written
         if not Jr is None:
-            J = R.inv().Adj
-            return res, J @ Jr
+            J = chain(R.inv().Adj if out is None else R.arr.T.copy(), Jr)
         elif not Jl is None:
-            return res, np.eye(3) @ Jl
+            J = chain(None, Jl, 3)
         elif not Jr2 is None:
-            return res, np.eye(3) @ Jr2
+            J = chain(None, Jr2, 3)
         elif not Jl2 is None:
-            return res, self.Adj @ Jl2
+            J = chain(self.Adj if out is None else self.arr.copy(), Jl2)
         else:
-            return res
+            J = None
+        if out is None:
+            res = self * R
+        else:
+            res = out
+            np.matmul(self.arr, R.arr, out=out.arr)
+        return res if J is None else (res, J)
+
+    def compose_jac(self, R2, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * R2
+        if which == 'Jr':
+            return res, R2.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        R2_inv = R2.inv()
+        dR = R2_inv * self
+        if which == 'Jr':
+            tau, J = SO3.Log(dR, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dR.inv().Adj
+        elif which == 'Jl':
+            tau, J = SO3.Log(dR, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ R2_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * R2.inv()
+        if which == 'Jr':
+            tau, J = SO3.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ R2.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SO3.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
 
     @property
     def R(self):
@@ -180,7 +318,7 @@ class SO3:
         sp = np.sin(phi)
         R3 = np.array([[1, 0, 0], [0, cp, -sp], [0, sp, cp]])
 
-        return cls(R1 @ R2 @ R3)
+        return cls(R1 @ R2 @ R3, copy=False)
 
     @classmethod
     def fromAxisAngle(cls, w):
@@ -196,7 +334,7 @@ class SO3:
 
         arr = np.eye(3) + A * skew_w + B * (skew_w @ skew_w)
 
-        return cls(arr)
+        return cls(arr, copy=False)
 
     @classmethod
     def fromQuaternion(cls, q):
@@ -205,109 +343,436 @@ class SO3:
         qv_skew = np.array([[0, -qv[2], qv[1]], [qv[2], 0, -qv[0]], [-qv[1], qv[0], 0]])
 
         R = (2 * qw**2 - 1) * np.eye(3) + 2 * qw * qv_skew + 2 * np.outer(qv, qv)
-        return cls(R)
+        return cls(R, copy=False)
 
     @classmethod
-    def random(cls):
-        x = np.random.uniform(0, 1, size=3)
+    def random(cls, n=None, rng=None):
+        # n samples come back as an SO3Batch. rng is an np.random.Generator for reproducible draws
+        if n is not None:
+            return SO3Batch.random(n, rng)
+        rng = np.random if rng is None else rng
+        x = rng.uniform(0, 1, size=3)
         psi = 2 * np.pi * x[0]
         R = np.array([[np.cos(psi), np.sin(psi), 0], [-np.sin(psi), np.cos(psi), 0], [0, 0, 1]])
         v = np.array([np.cos(2 * np.pi * x[1]) * np.sqrt(x[2]),
                      np.sin(2 * np.pi * x[1]) * np.sqrt(x[2]),
                      np.sqrt(1 - x[2])])
         H = np.eye(3) - 2 * np.outer(v, v)
-        return cls(-H @ R)
+        return cls(-H @ R, copy=False)
+
+    @classmethod
+    def sample_gaussian(cls, mean, cov, n, side='right', rng=None):
+        # n draws of mean (+) xi with xi ~ N(0, cov) as an SO3Batch, see jacobians.sample_gaussian
+        return sample_gaussian(cls, mean, cov, n, side, rng)
+
+    def toRPY(self):
+        return matrix_to_rpy(self.R)
 
     @staticmethod
     def Identity():
-        return SO3(np.eye(3))
+        return SO3(np.eye(3), copy=False)
 
     @staticmethod
     def log(R, Jr=None, Jl=None): #This function isn't entirely stable but tests pass
-        assert isinstance(R, SO3)
+        if validation.enabled:
+            assert isinstance(R, SO3)
 
         theta = np.arccos((np.trace(R.arr) - 1)/2.0)
-        if np.abs(theta) < 1e-8: # Do taylor series expansion
-            temp = 1/2.0 * (1 + theta**2 / 6.0 + 7 * theta**4 / 360)
-            logR = temp * (R - R.transpose())
-        elif np.abs(np.abs(theta) - np.pi) < 1e-3:
-            temp = - np.pi/(theta - np.pi) - 1 - np.pi/6 * (theta - np.pi) - (theta - np.pi)**2/6 - 7*np.pi/360 * (theta - np.pi)**3 - 7/360.0 * (theta - np.pi)**4
-            logR = temp/2.0 * (R - R.transpose())
-        else:
-            logR = theta / (2.0 * np.sin(theta)) * (R - R.transpose())
+        logR = _log_scale(theta) * (R - R.transpose())
 
         if not Jr is None: # TODO: Add Taylor series expansion?
             thetax = skew(SO3.vee(logR))
             J = np.eye(3) + 0.5 * thetax + (1/theta**2 - (1 + np.cos(theta))/(2 * theta * np.sin(theta))) * (thetax @ thetax)
-            return logR, J @ Jr
+            return logR, chain(J, Jr)
         elif not Jl is None:
             thetax = skew(SO3.vee(logR))
             J = np.eye(3) - 0.5 * thetax + (1/theta**2 - (1 + np.cos(theta))/(2 * theta * np.sin(theta))) * (thetax @ thetax)
-            return logR, J @ Jl
+            return logR, chain(J, Jl)
         else:
             return logR
 
     @classmethod
-    def Log(cls, R, Jr=None, Jl=None): #easy call to go straight to a vector
+    def Log(cls, R, Jr=None, Jl=None, out=None): #easy call to go straight to a vector
+        # out is a (3,) array that is overwritten with the result and returned
         if not Jr is None:
             logR, J = cls.log(R, Jr=Jr)
-            return cls.vee(logR), J
+            return _fill(out, cls.vee(logR)), J
         elif not Jl is None:
             logR, J = cls.log(R, Jl=Jl)
-            return cls.vee(logR), J
+            return _fill(out, cls.vee(logR)), J
+        elif out is not None:
+            return _fill(out, _log_floats(R.arr.tolist()))
         else:
             logR = cls.log(R)
             return cls.vee(logR)
 
     @classmethod
     def exp(cls, logR, Jr=None, Jl=None):
-        assert logR.shape == (3,3)
+        if validation.enabled:
+            assert logR.shape == (3,3)
+        return cls._exp(logR, Jr, Jl)
 
-        w = cls.vee(logR)
+    @classmethod
+    def _exp(cls, logR, Jr=None, Jl=None): # exp without the checks, for logR built internally by hat
+        w = np.array([logR[2,1], logR[0,2], logR[1,0]])
         theta = np.sqrt(w @ w)
+        ct, st = np.cos(theta), np.sin(theta)
         if np.abs(theta) > 1e-8:
-            R = np.eye(3) + np.sin(theta)/theta * logR + (1 - np.cos(theta))/ (theta**2) * (logR @ logR)
+            R = np.eye(3) + st/theta * logR + (1 - ct)/ (theta**2) * (logR @ logR)
         else: # Do taylor series expansion for small thetas
             R = np.eye(3)
 
         if not Jr is None: # Possibly add taylor series logic
             wx = skew(w)
-            a = (1 - np.cos(theta)) / theta**2
-            b = (theta - np.sin(theta)) / theta**3
+            a = (1 - ct) / theta**2
+            b = (theta - st) / theta**3
             J = np.eye(3) - a * wx + b * (wx @ wx)
-            return cls(R), J @ Jr
+            return cls._unchecked(R), chain(J, Jr)
         elif not Jl is None:
             wx = skew(w)
-            a = (1 - np.cos(theta)) / theta**2
-            b = (theta - np.sin(theta)) / theta**3
+            a = (1 - ct) / theta**2
+            b = (theta - st) / theta**3
             J = np.eye(3) + a * wx + b * (wx @ wx)
-            return cls(R), J @ Jl
+            return cls._unchecked(R), chain(J, Jl)
         else:
-            return cls(R)
+            return cls._unchecked(R)
 
     @classmethod
-    def Exp(cls, w, Jr=None, Jl=None):
+    def Exp(cls, w, Jr=None, Jl=None, out=None):
+        # out is an SO3 that is overwritten with the result and returned
+        if out is not None and Jr is None and Jl is None:
+            return out._assign(_exp_floats(*w.tolist()))
         logR = cls.hat(w)
         if not Jr is None:
-            R, J = cls.exp(logR, Jr=Jr)
-            return R, J
+            R, J = cls._exp(logR, Jr=Jr)
         elif not Jl is None:
-            R, J = cls.exp(logR, Jl=Jl)
-            return R, J
+            R, J = cls._exp(logR, Jl=Jl)
         else:
-            return cls.exp(logR)
+            return cls._exp(logR)
+        if out is not None:
+            R = out._assign(R.arr)
+        return R, J
 
     @staticmethod
     def vee(logR):
-        assert logR.shape == (3,3)
+        if validation.enabled:
+            assert logR.shape == (3,3)
         omega = np.array([logR[2,1], logR[0,2], logR[1,0]])
         return omega
 
     @staticmethod
     def hat(omega):
-        assert omega.size == 3
+        if validation.enabled:
+            assert omega.size == 3
         return (G @ omega).squeeze()
 
     @property
     def Adj(self):
         return self.arr
+
+
+class SO3Batch:
+    """N rotations stored as one contiguous (N,3,3) array.
+
+    Mirrors the SO3 API with every operation vectorized over the first axis.
+    Operations broadcast against a single SO3 and Jacobians come back as
+    (N,3,3) stacks.
+    """
+    def __init__(self, R):
+        self.arr = np.ascontiguousarray(R, dtype=float)
+        assert self.arr.ndim == 3 and self.arr.shape[1:] == (3,3)
+
+    def __len__(self):
+        return self.arr.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return SO3(self.arr[i], copy=False)
+        return SO3Batch(self.arr[i])
+
+    def __mul__(self, R2):
+        assert isinstance(R2, (SO3, SO3Batch))
+        return SO3Batch(self.arr @ R2.R)
+
+    def __str__(self):
+        return str(self.arr)
+
+    def __repr__(self):
+        return f'SO3Batch({len(self)})'
+
+    def inv(self, Jr=None, Jl=None):
+        R_inv = SO3Batch(self.arr.transpose(0,2,1))
+        if Jr is not None:
+            return R_inv, chain(-self.Adj, Jr)
+        elif Jl is not None:
+            return R_inv, chain(-R_inv.Adj, Jl)
+        else:
+            return R_inv
+
+    def transpose(self):
+        return SO3Batch(self.arr.transpose(0,2,1))
+
+    def rota(self, v, Jr=None, Jl=None): # v is (3,) or (N,3)
+        assert v.shape[-1] == 3
+        vp = np.einsum('...ij,...j->...i', self.arr, v)
+        if Jr is not None:
+            J = -self.arr @ skew_batch(v)
+            return vp, chain(J, Jr)
+        elif Jl is not None:
+            J = -skew_batch(vp)
+            return vp, chain(J, Jl)
+        else:
+            return vp
+
+    def rotp(self, v, Jr=None, Jl=None):
+        assert v.shape[-1] == 3
+        if Jr is not None:
+            R_inv, J = self.inv(Jr=Jr)
+            return R_inv.rota(v, Jr=J)
+        elif Jl is not None:
+            R_inv, J = self.inv(Jl=Jl)
+            return R_inv.rota(v, Jl=J)
+        else:
+            return self.inv().rota(v)
+
+    def boxplusr(self, v, Jr=None, Jl=None):
+        assert v.shape[-1] == 3
+        if Jr is not None:
+            R, J = SO3Batch.Exp(v, Jr=Jr)
+            return self.compose(R, Jr2=J)
+        elif Jl is not None:
+            R, J = SO3Batch.Exp(v, Jl=Jl)
+            return self.compose(R, Jl2=J)
+        else:
+            return self * SO3Batch.Exp(v)
+
+    def boxminusr(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(R2, (SO3, SO3Batch))
+        if Jr1 is not None:
+            dR, J = R2.inv().compose(self, Jr2=Jr1)
+            return SO3Batch.Log(dR, Jr=J)
+        elif Jl1 is not None:
+            dR, J = R2.inv().compose(self, Jl2=Jl1)
+            return SO3Batch.Log(dR, Jl=J)
+        elif Jr2 is not None:
+            R2_inv, J = R2.inv(Jr=Jr2)
+            dR, J = R2_inv.compose(self, Jr=J)
+            return SO3Batch.Log(dR, Jr=J)
+        elif Jl2 is not None:
+            R2_inv, J = R2.inv(Jl=Jl2)
+            dR, J = R2_inv.compose(self, Jl=J)
+            return SO3Batch.Log(dR, Jl=J)
+        else:
+            return SO3Batch.Log(R2.inv() * self)
+
+    def boxplusl(self, v, Jr=None, Jl=None):
+        assert v.shape[-1] == 3
+        if Jr is not None:
+            R, J = SO3Batch.Exp(v, Jr=Jr)
+            return R.compose(self, Jr=J)
+        elif Jl is not None:
+            R, J = SO3Batch.Exp(v, Jl=Jl)
+            return R.compose(self, Jl=J)
+        else:
+            return SO3Batch.Exp(v) * self
+
+    def boxminusl(self, R2, Jr1=None, Jl1=None, Jr2=None, Jl2=None):
+        assert isinstance(R2, (SO3, SO3Batch))
+        if Jr1 is not None:
+            diff, J = self.compose(R2.inv(), Jr=Jr1)
+            return SO3Batch.Log(diff, Jr=J)
+        elif Jl1 is not None:
+            diff, J = self.compose(R2.inv(), Jl=Jl1)
+            return SO3Batch.Log(diff, Jl=J)
+        elif Jr2 is not None:
+            R_inv, J = R2.inv(Jr=Jr2)
+            diff, J = self.compose(R_inv, Jr2=J)
+            return SO3Batch.Log(diff, Jr=J)
+        elif Jl2 is not None:
+            R_inv, J = R2.inv(Jl=Jl2)
+            diff, J = self.compose(R_inv, Jl2=J)
+            return SO3Batch.Log(diff, Jl=J)
+        else:
+            return SO3Batch.Log(self * R2.inv())
+
+    def compose(self, R, Jr=None, Jl=None, Jr2=None, Jl2=None):
+        res = self * R
+        if Jr is not None:
+            return res, chain(R.inv().Adj, Jr)
+        elif Jl is not None:
+            return res, chain(None, Jl, 3)
+        elif Jr2 is not None:
+            return res, chain(None, Jr2, 3)
+        elif Jl2 is not None:
+            return res, chain(self.Adj, Jl2)
+        else:
+            return res
+
+    def compose_jac(self, R2, which='Jr'):
+        # Composition with the Jacobians w.r.t. both operands in one call
+        res = self * R2
+        if which == 'Jr':
+            return res, R2.inv().Adj, np.eye(3)
+        elif which == 'Jl':
+            return res, np.eye(3), self.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusr_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        R2_inv = R2.inv()
+        dR = R2_inv * self
+        if which == 'Jr':
+            tau, J = SO3Batch.Log(dR, Jr=True)
+            J = np.asarray(J)
+            return tau, J, -J @ dR.inv().Adj
+        elif which == 'Jl':
+            tau, J = SO3Batch.Log(dR, Jl=True)
+            J = np.asarray(J)
+            J1 = J @ R2_inv.Adj
+            return tau, J1, -J1
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def boxminusl_jac(self, R2, which='Jr'):
+        # Jacobians w.r.t. both operands sharing one inverse, product and Log
+        diff = self * R2.inv()
+        if which == 'Jr':
+            tau, J = SO3Batch.Log(diff, Jr=True)
+            J = np.asarray(J)
+            J1 = J @ R2.Adj
+            return tau, J1, -J1
+        elif which == 'Jl':
+            tau, J = SO3Batch.Log(diff, Jl=True)
+            J = np.asarray(J)
+            return tau, J, -J @ diff.Adj
+        raise ValueError("which must be 'Jr' or 'Jl'")
+
+    def normalize(self):
+        x = self.arr[:,:,0]
+        x = x / np.linalg.norm(x, axis=1)[:,None]
+        y = np.cross(self.arr[:,:,2], x)
+        y = y / np.linalg.norm(y, axis=1)[:,None]
+        z = np.cross(x, y)
+
+        self.arr = np.stack([x, y, z], axis=2)
+
+    def det(self):
+        return np.linalg.det(self.arr)
+
+    @property
+    def R(self):
+        return self.arr
+
+    @property
+    def Adj(self):
+        return self.arr
+
+    @classmethod
+    def fromList(cls, Rs):
+        return cls(np.array([R.arr for R in Rs]))
+
+    @classmethod
+    def fromRPY(cls, rpy): # rpy is (N,3)
+        return cls(matrix_from_rpy(rpy))
+
+    @classmethod
+    def fromAxisAngle(cls, w): # w is (N,3)
+        return cls.Exp(np.asarray(w, dtype=float))
+
+    @classmethod
+    def fromQuaternion(cls, q): # q is (N,4)
+        qw, qv = q[:,0,None,None], q[:,1:]
+        return cls((2 * qw**2 - 1) * np.eye(3) + 2 * qw * skew_batch(qv) + 2 * qv[:,:,None] * qv[:,None,:])
+
+    def toRPY(self): # Returns an (N,3) array
+        return matrix_to_rpy(self.arr)
+
+    @staticmethod
+    def Identity(n):
+        return SO3Batch(np.tile(np.eye(3), (n,1,1)))
+
+    @classmethod
+    def random(cls, n, rng=None):
+        # Vectorized form of SO3.random, -H R = 2 v (v^T R) - R with the Householder matrix H = I - 2 v v^T
+        rng = np.random if rng is None else rng
+        x = rng.uniform(0, 1, size=(n,3))
+        psi = 2 * np.pi * x[:,0]
+        cp, sp = np.cos(psi), np.sin(psi)
+        R = np.zeros((n,3,3))
+        R[:,0,0], R[:,0,1], R[:,1,0], R[:,1,1], R[:,2,2] = cp, sp, -sp, cp, 1.0
+        r = np.sqrt(x[:,2])
+        v = np.column_stack([np.cos(2 * np.pi * x[:,1]) * r, np.sin(2 * np.pi * x[:,1]) * r, np.sqrt(1 - x[:,2])])
+        vR = np.einsum('ni,nij->nj', v, R)
+        return cls(2 * v[:,:,None] * vR[:,None,:] - R)
+
+    @staticmethod
+    def hat(omega):
+        return skew_batch(omega)
+
+    @staticmethod
+    def vee(logR):
+        return np.stack([logR[...,2,1], logR[...,0,2], logR[...,1,0]], axis=-1)
+
+    @classmethod
+    def _exp_jacobians(cls, w, which=()):
+        # Exp plus the requested Jacobians in one pass (Jr = Jl^T on SO3)
+        theta = np.linalg.norm(w, axis=1)
+        A, B, C, _ = so3_coefficients(theta)
+        wx = skew_batch(w)
+        wx2 = wx @ wx
+        R = cls(np.eye(3) + A[:,None,None] * wx + B[:,None,None] * wx2)
+        if not which:
+            return R, {}
+
+        Jl = np.eye(3) + B[:,None,None] * wx + C[:,None,None] * wx2
+        return R, {'Jl': Jl, 'Jr': Jl.transpose(0,2,1)}
+
+    @classmethod
+    def Exp(cls, w, Jr=None, Jl=None): # w is (N,3)
+        assert w.ndim == 2 and w.shape[1] == 3
+        if Jr is not None:
+            R, J = cls._exp_jacobians(w, ('Jr',))
+            return R, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            R, J = cls._exp_jacobians(w, ('Jl',))
+            return R, chain(J['Jl'], Jl)
+        else:
+            return cls._exp_jacobians(w)[0]
+
+    @staticmethod
+    def _log_jacobians(R, which=()):
+        arr = R.arr
+        ct = np.clip((np.trace(arr, axis1=1, axis2=2) - 1) / 2.0, -1.0, 1.0)
+        u = 0.5 * SO3Batch.vee(arr - arr.transpose(0,2,1)) # sin(theta) * axis
+        st = np.linalg.norm(u, axis=1)
+        theta = np.arctan2(st, ct)
+        A, _, _, D = so3_coefficients(theta)
+        w = u / A[:,None]
+
+        near_pi = theta > np.pi - 1e-3
+        if np.any(near_pi): # sin(theta) is unreliable here so use the symmetric part
+            Rp, cp = arr[near_pi], ct[near_pi]
+            aaT = (0.5 * (Rp + Rp.transpose(0,2,1)) - cp[:,None,None] * np.eye(3)) / (1 - cp)[:,None,None]
+            idx = np.argmax(np.diagonal(aaT, axis1=1, axis2=2), axis=1)
+            a = aaT[np.arange(idx.size), :, idx]
+            a = a / np.linalg.norm(a, axis=1)[:,None]
+            sign = np.where(np.sum(a * u[near_pi], axis=1) < 0, -1.0, 1.0)
+            w[near_pi] = (sign * theta[near_pi])[:,None] * a
+
+        if not which:
+            return w, {}
+
+        wx = skew_batch(w)
+        Jr_inv = np.eye(3) + 0.5 * wx + D[:,None,None] * (wx @ wx)
+        return w, {'Jr': Jr_inv, 'Jl': Jr_inv.transpose(0,2,1)}
+
+    @staticmethod
+    def Log(R, Jr=None, Jl=None): # Returns an (N,3) array
+        assert isinstance(R, SO3Batch)
+        if Jr is not None:
+            w, J = SO3Batch._log_jacobians(R, ('Jr',))
+            return w, chain(J['Jr'], Jr)
+        elif Jl is not None:
+            w, J = SO3Batch._log_jacobians(R, ('Jl',))
+            return w, chain(J['Jl'], Jl)
+        else:
+            return SO3Batch._log_jacobians(R)[0]
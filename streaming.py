@@ -0,0 +1,101 @@
+"""Chunked transformation of point clouds that do not fit in memory.
+
+The clouds are read and written in fixed size chunks, so peak memory is
+bounded by chunk_size (times the number of workers) rather than by the size
+of the cloud. Each chunk is transformed with a single call to the (N,d) point
+cloud path of SE3/SE2 transa/transp. NumPy releases the GIL in those matrix
+products, so a thread pool overlaps the disk reads of one chunk with the
+arithmetic of another.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import numpy as np
+
+def _poses(T, n_chunks=None):
+    # A single pose (anything with transa) is used for every chunk
+    if hasattr(T, 'transa'):
+        return itertools.repeat(T)
+    T = list(T)
+    if n_chunks is not None and len(T) != n_chunks:
+        raise ValueError(f"Expected one pose per chunk ({n_chunks}) but got {len(T)}")
+    return iter(T)
+
+def _pairs(chunks, poses):
+    missing = object()
+    for chunk, pose in itertools.zip_longest(chunks, poses, fillvalue=missing):
+        if chunk is missing:
+            return # A repeated single pose outlives the chunks
+        if pose is missing:
+            raise ValueError("Fewer poses than chunks")
+        yield chunk, pose
+
+def _open(points):
+    if isinstance(points, str):
+        return np.load(points, mmap_mode='r')
+    return points
+
+def transform_chunks(chunks, T, method='transa', workers=None):
+    """Transforms an iterable of (n,d) chunks and yields the results in order.
+
+    T is a single pose or a sequence with one pose per chunk. With workers set
+    the chunks are transformed on a thread pool that holds at most 2 * workers
+    chunks in flight.
+    """
+    pairs = _pairs(chunks, _poses(T))
+    if not workers:
+        for chunk, pose in pairs:
+            yield getattr(pose, method)(np.asarray(chunk))
+        return
+
+    with ThreadPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk, pose in pairs:
+            if len(pending) == 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(getattr(pose, method), np.asarray(chunk)))
+        while pending:
+            yield pending.popleft().result()
+
+def transform_points(points, T, out, chunk_size=1 << 16, method='transa', workers=None, dtype=None):
+    """Transforms an (N,d) point cloud chunk by chunk into out.
+
+    points is an (N,d) array, usually a np.memmap, or the path of a .npy file
+    that is opened memory mapped. T is a single SE3/SE2 or a sequence with one
+    pose per chunk of chunk_size points. out is an (N,d) array (or np.memmap)
+    or the path of a .npy file that is created with the given dtype (that of
+    points by default). Chunks are written to disjoint slices of out, so with
+    workers set they are transformed on a thread pool. Returns out.
+    """
+    points = _open(points)
+    if points.ndim != 2:
+        raise ValueError("Points must be an (N,d) array")
+    n = points.shape[0]
+    starts = range(0, n, chunk_size)
+    poses = _poses(T, len(starts))
+
+    if isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=dtype or points.dtype, shape=points.shape)
+    elif out.shape != points.shape:
+        raise ValueError("out must have the same shape as points")
+
+    def work(start, pose):
+        stop = min(start + chunk_size, n)
+        out[start:stop] = getattr(pose, method)(np.asarray(points[start:stop]))
+
+    if not workers:
+        for start, pose in zip(starts, poses):
+            work(start, pose)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            pending = deque()
+            for start, pose in zip(starts, poses):
+                if len(pending) == 2 * workers: # Bounds the chunks in flight
+                    pending.popleft().result()
+                pending.append(pool.submit(work, start, pose))
+            for future in pending:
+                future.result()
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import numpy as np
+sys.path.append('..')
+import bench
+
+class Bench_Test(unittest.TestCase):
+    def test_every_case_runs(self):
+        results = bench.run(batch_size=10, min_time=1e-4, repeat=1)
+        for name in bench.GROUPS:
+            for path in ('scalar', 'batch'):
+                for op in ('Exp', 'Log', 'compose', 'inv', 'boxplusr', 'boxminusl'):
+                    self.assertIn(f'{name}/{path}/{op}/none', results)
+        self.assertIn('SE3/batch/compose/Jl2', results)
+        self.assertIn('SO2/scalar/boxminusr/Jr1', results)
+        self.assertEqual(10, results['SE3/batch/Exp/Jr']['n'])
+        for res in results.values():
+            self.assertGreater(res['ns_per_op'], 0)
+            self.assertGreaterEqual(res['peak_bytes_per_op'], 0)
+
+    def test_cases_keep_their_operands(self):
+        # Every case is collected before any runs, so none may see a later iteration's operands
+        for name in bench.GROUPS:
+            collected = list(bench.cases(name, 10, np.random.default_rng(0)))
+            for path, op, jac, n, fn in collected:
+                fn()
+
+    def test_memory(self):
+        sizes = bench.memory(n=100)
+        self.assertEqual(set(bench.GROUPS), set(sizes))
+        for size in sizes.values():
+            self.assertGreater(size, 0)
+            self.assertLess(size, 1000)
+
+    def test_chains(self):
+        results = bench.chains(lengths=(1, 5), batch_size=10, min_time=1e-4, repeat=1)
+        for backend in ('SE3', 'SE3Matrix', 'compose_chain', 'SE3Batch', 'compose_chain_batch'):
+            for n in (1, 5):
+                self.assertGreater(results[f'{backend}/{n}'], 0)
+
+    def test_compare(self):
+        baseline = {'a': {'ns_per_op': 100.0}, 'b': {'ns_per_op': 100.0}}
+        results = {'a': {'ns_per_op': 150.0}, 'b': {'ns_per_op': 105.0}, 'c': {'ns_per_op': 1.0}}
+        self.assertEqual([('a', 1.5)], bench.compare(results, baseline, 1.2))
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+from complex_se2 import ComplexSO2, ComplexSE2
+from so2 import SO2, SO2Batch
+from se2 import SE2, SE2Batch
+
+class ComplexSO2_Test(unittest.TestCase):
+    def test_matches_so2(self):
+        for i in range(100):
+            R1, R2 = SO2.random(), SO2.random()
+            a, b = ComplexSO2.fromSO2(R1), ComplexSO2.fromSO2(R2)
+            v = np.random.uniform(-10.0, 10.0, size=2)
+
+            np.testing.assert_allclose(R1.arr, a.toSO2().arr, atol=1e-12)
+            np.testing.assert_allclose(R1.arr, a.R, atol=1e-12)
+            np.testing.assert_allclose((R1 * R2).arr, (a * b).toSO2().arr, atol=1e-12)
+            np.testing.assert_allclose(R1.inv().arr, a.inv().toSO2().arr, atol=1e-12)
+            np.testing.assert_allclose(R1.rota(v), a.rota(v), atol=1e-12)
+            np.testing.assert_allclose(R1.rotp(v), a.rotp(v), atol=1e-12)
+            np.testing.assert_allclose(SO2.Log(R1), ComplexSO2.Log(a), atol=1e-12)
+
+    def test_batch(self):
+        R1, R2 = SO2Batch.random(100), SO2Batch.random(100)
+        a, b = ComplexSO2.fromSO2(R1), ComplexSO2.fromSO2(R2)
+        v = np.random.uniform(-10.0, 10.0, size=(100,2))
+        self.assertEqual(100, len(a))
+        np.testing.assert_allclose(R1.R, a.R, atol=1e-12)
+        np.testing.assert_allclose((R1 * R2).R, (a * b).toSO2().R, atol=1e-12)
+        np.testing.assert_allclose(R1.rota(v), a.rota(v), atol=1e-12)
+        np.testing.assert_allclose(R1.rotp(v), a.rotp(v), atol=1e-12)
+        np.testing.assert_allclose(R1[3].arr, a[3].toSO2().arr, atol=1e-12)
+        self.assertTrue(np.all(a.isValidRotation()))
+
+    def test_normalize(self):
+        a = ComplexSO2(1.1 * ComplexSO2.random(10).z)
+        self.assertFalse(np.any(a.isValidRotation()))
+        a.normalize()
+        self.assertTrue(np.all(a.isValidRotation()))
+
+
+class ComplexSE2_Test(unittest.TestCase):
+    def test_matches_se2(self):
+        for i in range(100):
+            T1, T2 = SE2.random(), SE2.random()
+            a, b = ComplexSE2.fromSE2(T1), ComplexSE2.fromSE2(T2)
+            v = np.random.uniform(-10.0, 10.0, size=2)
+
+            np.testing.assert_allclose(T1.arr, a.toSE2().arr, atol=1e-12)
+            np.testing.assert_allclose(T1.t, a.translation, atol=1e-12)
+            np.testing.assert_allclose((T1 * T2).arr, (a * b).toSE2().arr, atol=1e-12)
+            np.testing.assert_allclose(T1.inv().arr, a.inv().toSE2().arr, atol=1e-12)
+            np.testing.assert_allclose(T1.transa(v), a.transa(v), atol=1e-12)
+            np.testing.assert_allclose(T1.transp(v), a.transp(v), atol=1e-12)
+            np.testing.assert_allclose(SE2.Log(T1), ComplexSE2.Log(a), atol=1e-10)
+
+    def test_batch(self):
+        T1, T2 = SE2Batch.random(100), SE2Batch.random(100)
+        a, b = ComplexSE2.fromSE2(T1), ComplexSE2.fromSE2(T2)
+        v = np.random.uniform(-10.0, 10.0, size=(100,2))
+        self.assertEqual(100, len(a))
+        np.testing.assert_allclose(T1.arr, a.toSE2().arr, atol=1e-12)
+        np.testing.assert_allclose((T1 * T2).arr, (a * b).toSE2().arr, atol=1e-12)
+        np.testing.assert_allclose(T1.inv().arr, a.inv().toSE2().arr, atol=1e-12)
+        np.testing.assert_allclose(T1.transa(v), a.transa(v), atol=1e-12)
+        np.testing.assert_allclose(T1.transp(v), a.transp(v), atol=1e-12)
+        np.testing.assert_allclose(SE2Batch.Log(T1), ComplexSE2.Log(a), atol=1e-10)
+        np.testing.assert_allclose(T1[3].arr, a[3].toSE2().arr, atol=1e-12)
+
+    def test_exp(self):
+        xi = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        xi[:10,2] = np.random.uniform(-1e-9, 1e-9, size=10) # Taylor series
+        np.testing.assert_allclose(SE2Batch.Exp(xi).arr, ComplexSE2.Exp(xi).toSE2().arr, atol=1e-12)
+        np.testing.assert_allclose(xi, ComplexSE2.Log(ComplexSE2.Exp(xi)), atol=1e-10)
+        np.testing.assert_allclose(SE2Batch.Exp(xi)[0].arr, ComplexSE2.Exp(xi[0]).toSE2().arr, atol=1e-12)
+
+    def test_identity(self):
+        T = ComplexSE2.random(10)
+        np.testing.assert_allclose(T.toSE2().arr, (ComplexSE2.Identity(10) * T).toSE2().arr)
+        np.testing.assert_allclose(np.eye(3), ComplexSE2.Identity().toSE2().arr)
+        np.testing.assert_allclose(ComplexSE2.Identity(10).toSE2().arr, (T * T.inv()).toSE2().arr, atol=1e-12)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+from dual_quaternion import DualQuaternionSE3, DualQuaternionSE3Batch
+from se3 import SE3, SE3Batch
+
+class DualQuaternionSE3_Test(unittest.TestCase):
+    def setUp(self):
+        self.transforms = [SE3.random() for i in range(100)]
+
+    def test_conversions(self):
+        for T in self.transforms:
+            dq = DualQuaternionSE3.fromSE3(T)
+            self.assertTrue(dq.isValidTransform())
+            np.testing.assert_allclose(T.T, dq.T, atol=1e-12)
+            np.testing.assert_allclose(T.T, DualQuaternionSE3.from7vec(T.T).toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(T.t, dq.t, atol=1e-12)
+            np.testing.assert_allclose(T.R, dq.R, atol=1e-12)
+
+    def test_group_operations(self):
+        for T1, T2 in zip(self.transforms, self.transforms[1:]):
+            a, b = DualQuaternionSE3.fromSE3(T1), DualQuaternionSE3.fromSE3(T2)
+            v = np.random.uniform(-10.0, 10.0, size=3)
+            cloud = np.random.uniform(-10.0, 10.0, size=(10,3))
+
+            np.testing.assert_allclose((T1 * T2).T, (a * b).T, atol=1e-12)
+            np.testing.assert_allclose(T1.inv().T, a.inv().T, atol=1e-12)
+            np.testing.assert_allclose(T1.transa(v), a.transa(v), atol=1e-12)
+            np.testing.assert_allclose(T1.transp(v), a.transp(v), atol=1e-12)
+            np.testing.assert_allclose(T1.transa(cloud), a.transa(cloud), atol=1e-12)
+            self.assertGreaterEqual((a * b).arr[0], 0.0)
+
+    def test_sclerp(self):
+        for T1, T2 in zip(self.transforms, self.transforms[1:]):
+            a, b = DualQuaternionSE3.fromSE3(T1), DualQuaternionSE3.fromSE3(T2)
+            np.testing.assert_allclose(T1.T, a.sclerp(b, 0.0).T, atol=1e-12)
+            np.testing.assert_allclose(T2.T, a.sclerp(b, 1.0).T, atol=1e-10)
+            tau = np.random.uniform(-0.5, 1.5)
+            T_true = T1 * SE3.Exp(tau * SE3.Log(T1.inv() * T2)) # The screw motion is the SE3 geodesic
+            np.testing.assert_allclose(T_true.T, a.sclerp(b, tau).T, atol=1e-10)
+
+        # Pure translations and tiny rotations
+        T1 = self.transforms[0]
+        for xi in (np.array([1.0, 2.0, 3.0, 0.0, 0.0, 0.0]), np.array([1.0, 2.0, 3.0, 1e-5, -2e-5, 1e-5])):
+            T2 = T1 * SE3.Exp(xi)
+            a, b = DualQuaternionSE3.fromSE3(T1), DualQuaternionSE3.fromSE3(T2)
+            np.testing.assert_allclose((T1 * SE3.Exp(0.3 * xi)).T, a.sclerp(b, 0.3).T, atol=1e-10)
+
+    def test_normalize(self):
+        dq = DualQuaternionSE3.fromSE3(self.transforms[0])
+        dq.arr = dq.arr * 1.1 + 1e-3
+        self.assertFalse(dq.isValidTransform())
+        dq.normalize()
+        self.assertTrue(dq.isValidTransform())
+
+
+class DualQuaternionSE3Batch_Test(unittest.TestCase):
+    def setUp(self):
+        self.T1, self.T2 = SE3Batch.random(100), SE3Batch.random(100)
+        self.a, self.b = DualQuaternionSE3Batch.fromSE3(self.T1), DualQuaternionSE3Batch.fromSE3(self.T2)
+
+    def test_group_operations(self):
+        T1, T2, a, b = self.T1, self.T2, self.a, self.b
+        v = np.random.uniform(-10.0, 10.0, size=(100,3))
+        np.testing.assert_allclose(T1.arr, a.T, atol=1e-12)
+        np.testing.assert_allclose(T1.arr, DualQuaternionSE3Batch.from7vec(T1.arr).toSE3().arr, atol=1e-12)
+        np.testing.assert_allclose((T1 * T2).arr, (a * b).T, atol=1e-12)
+        np.testing.assert_allclose(T1.inv().arr, a.inv().T, atol=1e-12)
+        np.testing.assert_allclose(T1.transa(v), a.transa(v), atol=1e-12)
+        np.testing.assert_allclose(T1.transp(v), a.transp(v), atol=1e-12)
+        np.testing.assert_allclose((T1[3] * T2).arr, (a[3] * b).T, atol=1e-12)
+        self.assertTrue(np.all(a.isValidTransform()))
+
+    def test_sclerp(self):
+        a, b = self.a, self.b
+        tau = np.random.uniform(0.0, 1.0, size=100)
+        res = a.sclerp(b, tau)
+        for i in range(100):
+            np.testing.assert_allclose(a[i].sclerp(b[i], tau[i]).arr, res.arr[i], atol=1e-12)
+        np.testing.assert_allclose(b.arr, a.sclerp(b, 1.0).arr, atol=1e-10)
+        np.testing.assert_allclose(a.arr, a.sclerp(a, 0.7).arr, atol=1e-12)
+
+    def test_from_array_like(self):
+        a = DualQuaternionSE3Batch(self.a.arr.tolist())
+        np.testing.assert_allclose(self.a.arr, a.arr)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+from jacobians import exp_with_jacobians, log_with_jacobians, JacobianChain, sample_gaussian
+from so2 import SO2, SO2Batch
+from se2 import SE2, SE2Batch
+from so3 import SO3, SO3Batch
+from quaternion import Quaternion, QuaternionBatch
+from se3 import SE3, SE3Batch
+
+class Jacobians_Test(unittest.TestCase):
+    def setUp(self):
+        # Rotation vectors are kept inside the ball of radius pi so that Log(Exp(xi)) = xi
+        self.groups = [(SO2Batch, np.random.uniform(-np.pi, np.pi, size=100), 1.0),
+                       (SE2Batch, np.random.uniform(-np.pi, np.pi, size=(100,3)), np.eye(3)),
+                       (SO3Batch, np.random.uniform(-1.5, 1.5, size=(100,3)), np.eye(3)),
+                       (QuaternionBatch, np.random.uniform(-1.5, 1.5, size=(100,3)), np.eye(3)),
+                       (SE3Batch, np.random.uniform(-1.5, 1.5, size=(100,6)), np.eye(6))]
+
+    def test_exp_with_jacobians(self):
+        for group, xi, I in self.groups:
+            X, Jr, Jl = exp_with_jacobians(group, xi)
+            X_true, Jr_true = group.Exp(xi, Jr=I)
+            _, Jl_true = group.Exp(xi, Jl=I)
+
+            np.testing.assert_allclose(X_true.arr, X.arr)
+            np.testing.assert_allclose(Jr_true, Jr)
+            np.testing.assert_allclose(Jl_true, Jl)
+
+            _, Jl2 = exp_with_jacobians(group, xi, which=('Jl',))
+            np.testing.assert_allclose(Jl_true, Jl2)
+
+    def test_log_with_jacobians(self):
+        for group, xi, I in self.groups:
+            X = group.Exp(xi)
+            xi2, Jl, Jr = log_with_jacobians(group, X, which=('Jl', 'Jr'))
+            xi_true, Jr_true = group.Log(X, Jr=I)
+            _, Jl_true = group.Log(X, Jl=I)
+
+            np.testing.assert_allclose(xi_true, xi2)
+            np.testing.assert_allclose(Jr_true, Jr)
+            np.testing.assert_allclose(Jl_true, Jl)
+
+    def test_jacobians_are_inverses(self):
+        for group, xi, I in self.groups[1:]:
+            X, Jr = exp_with_jacobians(group, xi, which=('Jr',))
+            xi2, Jr_inv = log_with_jacobians(group, X, which=('Jr',))
+            np.testing.assert_allclose(xi, xi2, atol=1e-10)
+            np.testing.assert_allclose(np.tile(I, (100,1,1)), Jr @ Jr_inv, atol=1e-8)
+
+    def test_small_angles(self):
+        xi = np.random.uniform(-1.0, 1.0, size=(100,6))
+        xi[:,3:] *= np.logspace(-12, -1, 100)[:,None]
+        T, Jr, Jl = exp_with_jacobians(SE3Batch, xi)
+        for i in range(100):
+            self.assertFalse(np.any(np.isnan(Jr[i])))
+            np.testing.assert_allclose(T[i].Adj @ Jr[i], Jl[i], atol=1e-10)
+
+        xi2, Jr_inv = log_with_jacobians(SE3Batch, T, which=('Jr',))
+        np.testing.assert_allclose(xi, xi2, atol=1e-10)
+        np.testing.assert_allclose(np.tile(np.eye(6), (100,1,1)), Jr @ Jr_inv, atol=1e-10)
+
+    def test_single_elements(self):
+        w = np.random.uniform(-np.pi, np.pi, size=3)
+        R, Jr, Jl = exp_with_jacobians(SO3, w)
+        R_true, Jr_true = SO3.Exp(w, Jr=np.eye(3))
+        _, Jl_true = SO3.Exp(w, Jl=np.eye(3))
+        np.testing.assert_allclose(R_true.R, R.R)
+        np.testing.assert_allclose(Jr_true, Jr)
+        np.testing.assert_allclose(Jl_true, Jl)
+
+        T = SE3.random()
+        logT, Jr = log_with_jacobians(SE3, T, which=('Jr',))
+        logT_true, Jr_true = SE3.Log(T, Jr=np.eye(6))
+        np.testing.assert_allclose(logT_true, logT)
+        np.testing.assert_allclose(Jr_true, Jr, atol=1e-10)
+
+    def test_unknown_jacobian(self):
+        with self.assertRaises(ValueError):
+            exp_with_jacobians(SO3Batch, np.zeros((1,3)), which=('J',))
+
+    def test_sample_gaussian(self):
+        for G, batch, dof in [(SO2, SO2Batch, 1), (SE2, SE2Batch, 3), (SO3, SO3Batch, 3),
+                              (Quaternion, QuaternionBatch, 3), (SE3, SE3Batch, 6)]:
+            mean = G.random()
+            A = np.random.uniform(-0.3, 0.3, size=(dof,dof))
+            cov = A @ A.T + 0.01 * np.eye(dof)
+            xi = np.random.default_rng(7).standard_normal((500, dof)) @ np.linalg.cholesky(cov).T
+            xi = xi[:,0] if dof == 1 else xi
+
+            X = G.sample_gaussian(mean, cov, 500, rng=np.random.default_rng(7))
+            self.assertIsInstance(X, batch)
+            np.testing.assert_allclose(xi, batch.Log(mean.inv() * X), atol=1e-8)
+
+            X = sample_gaussian(G, mean, cov, 500, side='left', rng=np.random.default_rng(7))
+            np.testing.assert_allclose(xi, batch.Log(X * mean.inv()), atol=1e-8)
+
+        mean, cov = SE3.random(), np.diag([0.1, 0.2, 0.3, 0.01, 0.02, 0.03])
+        X = SE3.sample_gaussian(mean, cov, 20000, rng=np.random.default_rng(0))
+        np.testing.assert_allclose(cov, np.cov(SE3Batch.Log(mean.inv() * X).T), atol=0.01)
+
+        with self.assertRaises(ValueError):
+            SO3.sample_gaussian(SO3.random(), np.eye(3), 10, side='up')
+
+    def test_lazy_chain(self):
+        for G, dim in [(SO3, 3), (Quaternion, 3), (SE3, 6), (SE2, 3)]:
+            X1, X2 = G.random(), G.random()
+            for kw in ['Jr1', 'Jl1', 'Jr2', 'Jl2']:
+                for op in ['boxminusr', 'boxminusl']:
+                    tau, J = getattr(X1, op)(X2, **{kw: True})
+                    tau_true, J_true = getattr(X1, op)(X2, **{kw: np.eye(dim)})
+                    self.assertIsInstance(J, JacobianChain)
+                    np.testing.assert_allclose(tau_true, tau)
+                    np.testing.assert_allclose(J_true, np.asarray(J), atol=1e-10)
+
+        # Identity factors are not recorded
+        _, J = SO3.random().compose(SO3.random(), Jl=True)
+        self.assertEqual(0, len(J))
+        np.testing.assert_allclose(np.eye(3), J.J)
+
+        # A deep chain materializes to the eagerly propagated product
+        T = SE3.random()
+        J, J_true = True, np.eye(6)
+        for i in range(10):
+            T2 = SE3.random()
+            T, J = T.compose(T2, Jr=J)
+            J_true = T2.inv().Adj @ J_true
+        self.assertEqual(10, len(J))
+        np.testing.assert_allclose(J_true, J.J, atol=1e-10)
+
+        # Identity factors copy an incoming array rather than returning it
+        for G, dim in [(SO3, 3), (Quaternion, 3), (SE3, 6), (SE2, 3)]:
+            Jin = np.eye(dim)
+            for kw in ['Jl', 'Jr2']:
+                _, J = G.random().compose(G.random(), **{kw: Jin})
+                self.assertFalse(np.shares_memory(Jin, J))
+                np.testing.assert_allclose(np.eye(dim), J)
+
+        R1 = SO3Batch.Exp(np.random.uniform(-1.5, 1.5, size=(10,3)))
+        R2 = SO3Batch.Exp(np.random.uniform(-1.5, 1.5, size=(10,3)))
+        _, J = R1.boxminusr(R2, Jl2=True)
+        _, J_true = R1.boxminusr(R2, Jl2=np.eye(3))
+        np.testing.assert_allclose(J_true, np.asarray(J), atol=1e-10)
+
+
+if __name__=="__main__":
+    unittest.main()
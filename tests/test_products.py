@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+import functools
+from products import cumulative_compose, product
+from so2 import SO2Batch
+from se2 import SE2Batch
+from so3 import SO3Batch
+from quaternion import QuaternionBatch
+from se3 import SE3Batch
+
+BATCHES = (SO2Batch, SE2Batch, SO3Batch, QuaternionBatch, SE3Batch)
+
+def sequential(X, start=None): # T_k = T_k-1 dT_k one step at a time
+    T = X[0] if start is None else start * X[0]
+    Ts = [T]
+    for k in range(1, len(X)):
+        T = T * X[k]
+        Ts.append(T)
+    return Ts
+
+class CumulativeCompose_Test(unittest.TestCase):
+    def test_matches_sequential(self):
+        for B in BATCHES:
+            for n in (1, 2, 3, 8, 37):
+                X = B.random(n)
+                res = cumulative_compose(X)
+                self.assertIsInstance(res, B)
+                self.assertEqual(n, len(res))
+                for k, T in enumerate(sequential(X)):
+                    np.testing.assert_allclose(T.arr, res[k].arr, atol=1e-10, err_msg=B.__name__)
+
+    def test_start(self):
+        for B in BATCHES:
+            X = B.random(10)
+            start = B.random(1)[0]
+            res = cumulative_compose(X, start=start)
+            for k, T in enumerate(sequential(X, start)):
+                np.testing.assert_allclose(T.arr, res[k].arr, atol=1e-10, err_msg=B.__name__)
+
+    def test_process_pool(self):
+        for B in (SE2Batch, SE3Batch):
+            X = B.random(101)
+            np.testing.assert_allclose(cumulative_compose(X).arr, cumulative_compose(X, processes=3).arr, atol=1e-10)
+
+
+class Product_Test(unittest.TestCase):
+    def test_matches_sequential(self):
+        for B in BATCHES:
+            for n in (1, 2, 5, 16, 37):
+                X = B.random(n)
+                T_true = functools.reduce(lambda a, b: a * b, [X[k] for k in range(n)])
+                for normalize in (False, True):
+                    T, error = product(X, normalize=normalize)
+                    np.testing.assert_allclose(T_true.arr, T.arr, atol=1e-10, err_msg=B.__name__)
+                    self.assertLess(error, 1e-12)
+                T, _ = product([X[k] for k in range(n)]) # Lists of scalar elements
+                np.testing.assert_allclose(T_true.arr, T.arr, atol=1e-10, err_msg=B.__name__)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            product([])
+        with self.assertRaises(ValueError):
+            product(SE3Batch.random(3)[:0])
+
+    def test_renormalization(self):
+        # Elements slightly off the group, the error grows through the products unless renormalized
+        q = QuaternionBatch.random(64)
+        q.arr = q.arr * (1 + 1e-6)
+        T, error = product(q)
+        self.assertGreater(error, 1e-6)
+        self.assertGreater(abs(T.norm() - 1.0), 1e-5)
+        T, error = product(q, normalize=True)
+        self.assertLess(abs(T.norm() - 1.0), 1e-12)
+
+        R = SO3Batch.random(64)
+        R.arr = R.arr * (1 + 1e-6)
+        _, error = product(R)
+        self.assertGreater(error, 1e-6)
+        T, _ = product(R, normalize=True)
+        np.testing.assert_allclose(np.eye(3), T.R @ T.R.T, atol=1e-12)
+
+
+if __name__=="__main__":
+    unittest.main()
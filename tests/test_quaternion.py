@@ -1,11 +1,13 @@
+import gc
 import numpy as np
 import scipy as sp
 import scipy.linalg as spl
 import unittest
+import warnings
 import sys
 sys.path.append('..')
-from quaternion import Quaternion
-from so3 import SO3
+from quaternion import Quaternion, QuaternionBatch
+from so3 import SO3, SO3Batch
 
 class Quaternion_Testing(unittest.TestCase):
     def testRandomGeneration(self):
@@ -49,6 +51,38 @@ class Quaternion_Testing(unittest.TestCase):
 
             np.testing.assert_allclose(I_true, I.q)
 
+    def testCopySemantics(self):
+        arr = np.array([-0.5, 0.5, 0.5, 0.5])
+        q = Quaternion(arr)
+        np.testing.assert_allclose(np.array([-0.5, 0.5, 0.5, 0.5]), arr) # The caller's array is untouched
+        np.testing.assert_allclose(np.array([0.5, -0.5, -0.5, -0.5]), q.q)
+
+        q = Quaternion(arr, copy=False) # Flipped into a fresh buffer
+        self.assertFalse(np.shares_memory(arr, q.q))
+        np.testing.assert_allclose(np.array([-0.5, 0.5, 0.5, 0.5]), arr)
+
+        arr = np.array([0.5, 0.5, 0.5, 0.5])
+        self.assertFalse(np.shares_memory(arr, Quaternion(arr).q))
+        self.assertTrue(np.shares_memory(arr, Quaternion(arr, copy=False).q))
+        self.assertIs(arr, Quaternion.view(arr).q)
+        np.testing.assert_allclose(arr, Quaternion.view(-arr).q)
+
+    def testOutBuffers(self):
+        q_out, v_out = np.empty(4), np.empty(3)
+        for i in range(100):
+            p, q = Quaternion.random(), Quaternion.random()
+            v = np.random.uniform(-10.0, 10.0, size=3)
+
+            pq = p.otimes(q, out=q_out)
+            self.assertIs(q_out, pq.q)
+            np.testing.assert_allclose((p * q).q, q_out)
+            self.assertGreaterEqual(q_out[0], 0)
+
+            vp = p.rota(v, out=v_out)
+            self.assertIs(v_out, vp)
+            np.testing.assert_allclose(p.R @ v, v_out)
+            np.testing.assert_allclose(p.R.T @ v, p.rotp(v, out=v_out))
+
     def testRotationMatrixFromQuaternion(self):
         for i in range(100):
             q = Quaternion.random()
@@ -163,6 +197,15 @@ class Quaternion_Testing(unittest.TestCase):
 
             np.testing.assert_allclose(q_true.q, q.q)
 
+    def testExpAtZero(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error') # No 0/0 in the unused branch
+            q, Jr = Quaternion.Exp(np.zeros(3), Jr=True)
+            _, Jl = Quaternion.Exp(np.zeros(3), Jl=True)
+        np.testing.assert_allclose(np.array([1.0, 0, 0, 0]), q.q)
+        np.testing.assert_allclose(np.eye(3), Jr)
+        np.testing.assert_allclose(np.eye(3), Jl)
+
     def testAdj(self):
         for i in range(100):
             q = Quaternion.random()
@@ -182,6 +225,33 @@ class Quaternion_Testing(unittest.TestCase):
 
             np.testing.assert_allclose(1, q.norm())
 
+    def testCachedQuantities(self):
+        q = Quaternion(np.array([2.0, 0.4, -0.2, 1.0]))
+        R, q_inv = q.R, q.inv()
+        self.assertIs(q_inv, q.inv())
+
+        # R and Adj are copies of the memoized matrix that callers may write into
+        R_true = R.copy()
+        R[:] = 0.0
+        q.Adj[:] = 0.0
+        np.testing.assert_allclose(R_true, q.R)
+        np.testing.assert_allclose(R_true, q.Adj)
+
+        q.normalize()
+        q_true = Quaternion(q.q.copy())
+        np.testing.assert_allclose(q_true.R, q.R)
+        np.testing.assert_allclose(q_true.inv().q, q.inv().q)
+
+    def testNoReferenceCycles(self):
+        # Memoized inverses do not link back, so elements are freed without the cycle collector
+        gc.collect()
+        q1, q2 = Quaternion.random(), Quaternion.random()
+        (q1 * q2).inv().R
+        q1.inv().inv().Adj
+        q1.boxminusr(q2, Jr1=np.eye(3))
+        del q1, q2
+        self.assertEqual(0, gc.collect())
+
     def testBoxPlusR(self):
         for i in range(100):
             q = Quaternion.random()
@@ -433,6 +503,144 @@ class Quaternion_Testing(unittest.TestCase):
             Jl_true = np.eye(3) @ Jr2 @ q2.Adj.T
             np.testing.assert_allclose(Jl_true, Jl2)
 
+    def test_jacobians_of_both_operands(self):
+        for i in range(100):
+            X1, X2 = Quaternion.random(), Quaternion.random()
+            for which in ('Jr', 'Jl'):
+                res, J1, J2 = X1.compose_jac(X2, which=which)
+                res_true, J1_true = X1.compose(X2, **{which: np.eye(3)})
+                _, J2_true = X1.compose(X2, **{which + '2': np.eye(3)})
+                np.testing.assert_allclose(res_true.q, res.q)
+                np.testing.assert_allclose(J1_true, J1, atol=1e-10)
+                np.testing.assert_allclose(J2_true, J2, atol=1e-10)
+
+                for method in ('boxminusr', 'boxminusl'):
+                    tau, J1, J2 = getattr(X1, method + '_jac')(X2, which=which)
+                    tau_true, J1_true = getattr(X1, method)(X2, **{which + '1': np.eye(3)})
+                    _, J2_true = getattr(X1, method)(X2, **{which + '2': np.eye(3)})
+                    np.testing.assert_allclose(tau_true, tau, atol=1e-10)
+                    np.testing.assert_allclose(J1_true, J1, atol=1e-8)
+                    np.testing.assert_allclose(J2_true, J2, atol=1e-8)
+
+
+class QuaternionBatch_Testing(unittest.TestCase):
+    def setUp(self):
+        self.qs = [Quaternion.random() for i in range(100)]
+        self.qb = QuaternionBatch.fromList(self.qs)
+
+    def testConversions(self):
+        # Rotations by pi/2 to pi about each axis exercise every branch of Shepperd's method
+        w = np.random.uniform(-1.0, 1.0, size=(100,3))
+        w[:3] = np.diag(np.random.uniform(2.0, np.pi, size=3))
+        Rs = SO3Batch.Exp(w).R
+        qb = QuaternionBatch.fromRotationMatrix(Rs)
+        for i in range(100):
+            np.testing.assert_allclose(Quaternion.fromRotationMatrix(Rs[i]).q, qb[i].q, atol=1e-12)
+        np.testing.assert_allclose(Rs, qb.R, atol=1e-12)
+
+        rpy = np.random.uniform(-1.5, 1.5, size=(100,3))
+        qb = QuaternionBatch.fromRPY(rpy)
+        for i in range(100):
+            np.testing.assert_allclose(Quaternion.fromRPY(rpy[i]).q, qb[i].q, atol=1e-12)
+            np.testing.assert_allclose(rpy[i], qb[i].toRPY(), atol=1e-12)
+        np.testing.assert_allclose(rpy, qb.toRPY(), atol=1e-12)
+
+        np.testing.assert_allclose(QuaternionBatch.Exp(w).q, QuaternionBatch.fromAxisAngle(w).q)
+
+    def testRandom(self):
+        qb = Quaternion.random(50, rng=np.random.default_rng(3))
+        self.assertIsInstance(qb, QuaternionBatch)
+        np.testing.assert_allclose(np.ones(50), qb.norm())
+
+        # Draws the same samples as the scalar method
+        rng = np.random.default_rng(3)
+        for i in range(50):
+            np.testing.assert_allclose(Quaternion.random(rng=rng).q, qb[i].q)
+
+    def testCanonicalSign(self):
+        arr = -self.qb.q.copy()
+        arr_copy = arr.copy()
+        qb = QuaternionBatch(arr)
+
+        np.testing.assert_allclose(self.qb.q, qb.q)
+        np.testing.assert_allclose(arr_copy, arr)
+
+    def testSlicesAreViews(self):
+        qb = QuaternionBatch(self.qb.q.tolist())
+        np.testing.assert_allclose(self.qb.q, qb.q)
+        for i in (slice(10, 20), slice(None, None, 3)):
+            self.assertTrue(np.shares_memory(qb.q, qb[i].q))
+            np.testing.assert_allclose(self.qb.q[i], qb[i].q)
+
+    def testQuaternionMultiply(self):
+        q2s = [Quaternion.random() for i in range(100)]
+        q3 = self.qb * QuaternionBatch.fromList(q2s)
+        q4 = self.qb * q2s[0]
+        q5 = q2s[0] * self.qb
+        for i in range(100):
+            np.testing.assert_allclose((self.qs[i] * q2s[i]).q, q3[i].q)
+            np.testing.assert_allclose((self.qs[i] * q2s[0]).q, q4[i].q)
+            np.testing.assert_allclose((q2s[0] * self.qs[i]).q, q5[i].q)
+
+    def testInverseAndR(self):
+        q_inv, Jr = self.qb.inv(Jr=np.eye(3))
+        R = self.qb.R
+        for i in range(100):
+            q_inv_true, Jr_true = self.qs[i].inv(Jr=np.eye(3))
+            np.testing.assert_allclose(q_inv_true.q, q_inv[i].q)
+            np.testing.assert_allclose(Jr_true, Jr[i])
+            np.testing.assert_allclose(self.qs[i].R, R[i])
+
+    def testRotatingVectors(self):
+        v = np.random.uniform(-10, 10, size=(100,3))
+        vp, Jr = self.qb.rota(v, Jr=np.eye(3))
+        vp2, Jl = self.qb.rotp(v, Jl=np.eye(3))
+        for i in range(100):
+            vp_true, Jr_true = self.qs[i].rota(v[i], Jr=np.eye(3))
+            vp2_true, Jl_true = self.qs[i].rotp(v[i], Jl=np.eye(3))
+            np.testing.assert_allclose(vp_true, vp[i])
+            np.testing.assert_allclose(Jr_true, Jr[i])
+            np.testing.assert_allclose(vp2_true, vp2[i])
+            np.testing.assert_allclose(Jl_true, Jl[i])
+
+    def testExpLog(self):
+        w = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        w[:10] *= 1e-9
+        q, Jr = QuaternionBatch.Exp(w, Jr=np.eye(3))
+        w2, Jl = QuaternionBatch.Log(q, Jl=np.eye(3))
+        for i in range(100):
+            q_true = Quaternion.Exp(w[i])
+            np.testing.assert_allclose(q_true.q, q[i].q, atol=1e-12)
+            np.testing.assert_allclose(q_true.R, spl.expm(SO3.hat(w[i])), atol=1e-10)
+            if i >= 10:
+                _, Jr_true = Quaternion.Exp(w[i], Jr=np.eye(3))
+                _, Jl_true = Quaternion.Log(q_true, Jl=np.eye(3))
+                np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+                np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-8)
+        w = np.where(np.linalg.norm(w, axis=1)[:,None] > np.pi, w - 2*np.pi * w/np.linalg.norm(w, axis=1)[:,None], w)
+        np.testing.assert_allclose(w, w2, atol=1e-10)
+
+    def testBoxPlusMinus(self):
+        q2s = QuaternionBatch.fromList([Quaternion.random() for i in range(100)])
+        v = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        q3, Jr = self.qb.boxplusr(v, Jr=np.eye(3))
+        q4, Jl = self.qb.boxplusl(v, Jl=np.eye(3))
+        dr, Jr2 = self.qb.boxminusr(q2s, Jr2=np.eye(3))
+        dl, Jl1 = self.qb.boxminusl(q2s, Jl1=np.eye(3))
+        for i in range(100):
+            q3_true, Jr_true = self.qs[i].boxplusr(v[i], Jr=np.eye(3))
+            q4_true, Jl_true = self.qs[i].boxplusl(v[i], Jl=np.eye(3))
+            dr_true, Jr2_true = self.qs[i].boxminusr(q2s[i], Jr2=np.eye(3))
+            dl_true, Jl1_true = self.qs[i].boxminusl(q2s[i], Jl1=np.eye(3))
+            np.testing.assert_allclose(q3_true.q, q3[i].q)
+            np.testing.assert_allclose(q4_true.q, q4[i].q)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            np.testing.assert_allclose(dr_true, dr[i], atol=1e-10)
+            np.testing.assert_allclose(dl_true, dl[i], atol=1e-10)
+            np.testing.assert_allclose(Jr2_true, Jr2[i], atol=1e-8)
+            np.testing.assert_allclose(Jl1_true, Jl1[i], atol=1e-8)
+
 
 if __name__=="__main__":
     unittest.main()
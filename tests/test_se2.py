@@ -3,11 +3,17 @@ import scipy.linalg as spl
 import sys
 sys.path.append("..")
 import numpy as np
-from se2 import SE2
+from se2 import SE2, SE2Batch
 
 from IPython.core.debugger import Pdb
 
 class SE2_Test(unittest.TestCase):
+    def testCopySemantics(self):
+        T = SE2.random().T.copy()
+        self.assertFalse(np.shares_memory(T, SE2(T).T))
+        self.assertIs(T, SE2(T, copy=False).T)
+        self.assertIs(T, SE2.view(T).T)
+
     def testInv(self):
         for i in range(100):
             t = np.random.uniform(-10, 10, size=2)
@@ -342,7 +348,23 @@ class SE2_Test(unittest.TestCase):
 
             vp, Jr = T.transp(v, Jr=np.eye(3))
             one_x = np.array([[0, -1], [1, 0]])
-            Jr_true = np.block([np.eye(2), (one_x @ T.R.T @ (T.t - v))[:,None]])
+            Jr_true = np.block([-np.eye(2), (one_x @ T.R.T @ (T.t - v))[:,None]])
+
+            np.testing.assert_allclose(Jr_true, Jr, atol=1e-10)
+
+    def test_transforming_point_clouds(self):
+        T = SE2.random()
+        v = np.random.uniform(-10, 10, size=(50,2))
+        for method in ('transa', 'transp'):
+            vp = getattr(T, method)(v)
+            for kw in ('Jr', 'Jl'):
+                vp2, J = getattr(T, method)(v, **{kw: np.eye(3)})
+                self.assertEqual((50,2,3), J.shape)
+                for i in range(50):
+                    vp_true, J_true = getattr(T, method)(v[i], **{kw: np.eye(3)})
+                    np.testing.assert_allclose(vp_true, vp[i])
+                    np.testing.assert_allclose(vp_true, vp2[i])
+                    np.testing.assert_allclose(J_true, J[i], atol=1e-10)
 
     def test_left_jacobian_of_transp(self):
         for i in range(100):
@@ -431,6 +453,128 @@ class SE2_Test(unittest.TestCase):
             Jl_true = np.eye(3) @ Jr2 @ np.linalg.inv(T2.Adj)
             np.testing.assert_allclose(Jl_true, Jl2)
 
+    def test_jacobians_of_both_operands(self):
+        for i in range(100):
+            X1, X2 = SE2.random(), SE2.random()
+            for which in ('Jr', 'Jl'):
+                res, J1, J2 = X1.compose_jac(X2, which=which)
+                res_true, J1_true = X1.compose(X2, **{which: np.eye(3)})
+                _, J2_true = X1.compose(X2, **{which + '2': np.eye(3)})
+                np.testing.assert_allclose(res_true.T, res.T)
+                np.testing.assert_allclose(J1_true, J1, atol=1e-10)
+                np.testing.assert_allclose(J2_true, J2, atol=1e-10)
+
+                for method in ('boxminusr', 'boxminusl'):
+                    tau, J1, J2 = getattr(X1, method + '_jac')(X2, which=which)
+                    tau_true, J1_true = getattr(X1, method)(X2, **{which + '1': np.eye(3)})
+                    _, J2_true = getattr(X1, method)(X2, **{which + '2': np.eye(3)})
+                    np.testing.assert_allclose(tau_true, tau, atol=1e-10)
+                    np.testing.assert_allclose(J1_true, J1, atol=1e-8)
+                    np.testing.assert_allclose(J2_true, J2, atol=1e-8)
+
+
+class SE2Batch_Test(unittest.TestCase):
+    def setUp(self):
+        self.transforms = [SE2.random() for i in range(100)]
+        self.Tb = SE2Batch.fromList(self.transforms)
+
+    def testFromArrayLike(self):
+        Tb = SE2Batch(self.Tb.arr.tolist())
+        np.testing.assert_allclose(self.Tb.arr, Tb.arr)
+
+    def testRandom(self):
+        Tb = SE2.random(50, rng=np.random.default_rng(3))
+        self.assertIsInstance(Tb, SE2Batch)
+        self.assertEqual((50,3), Tb.arr.shape)
+        np.testing.assert_allclose(Tb.arr, SE2Batch.random(50, np.random.default_rng(3)).arr)
+        self.assertTrue(np.all(np.abs(Tb.t) <= 5))
+        np.testing.assert_allclose(SE2.random(rng=np.random.default_rng(1)).arr,
+                                   SE2.random(rng=np.random.default_rng(1)).arr)
+
+    def testGroupOperator(self):
+        T2s = [SE2.random() for i in range(100)]
+        T3 = self.Tb * SE2Batch.fromList(T2s)
+        T4 = self.Tb * T2s[0]
+        T5 = T2s[0] * self.Tb
+        T_inv = self.Tb.inv()
+        for i in range(100):
+            np.testing.assert_allclose((self.transforms[i] * T2s[i]).arr, T3[i].arr, atol=1e-12)
+            np.testing.assert_allclose((self.transforms[i] * T2s[0]).arr, T4[i].arr, atol=1e-12)
+            np.testing.assert_allclose((T2s[0] * self.transforms[i]).arr, T5[i].arr, atol=1e-12)
+            np.testing.assert_allclose(self.transforms[i].inv().arr, T_inv[i].arr, atol=1e-12)
+            np.testing.assert_allclose(self.transforms[i].Adj, self.Tb.Adj[i], atol=1e-12)
+            np.testing.assert_allclose(self.transforms[i].arr, self.Tb.T[i], atol=1e-12)
+
+    def testActionOnVectors(self):
+        v = np.random.uniform(-5, 5, size=(100,2))
+        vp, Jr = self.Tb.transa(v, Jr=np.eye(3))
+        _, Jl = self.Tb.transa(v, Jl=np.eye(3))
+        vp2, Jl2 = self.Tb.transp(v, Jl=np.eye(3))
+        for i in range(100):
+            vp_true, Jr_true = self.transforms[i].transa(v[i], Jr=np.eye(3))
+            _, Jl_true = self.transforms[i].transa(v[i], Jl=np.eye(3))
+            vp2_true, Jl2_true = self.transforms[i].transp(v[i], Jl=np.eye(3))
+            np.testing.assert_allclose(vp_true, vp[i])
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-12)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-12)
+            np.testing.assert_allclose(vp2_true, vp2[i], atol=1e-12)
+            np.testing.assert_allclose(Jl2_true, Jl2[i], atol=1e-12)
+
+    def testExp(self):
+        vec = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        vec[:10,2] *= 1e-9
+        T, Jr = SE2Batch.Exp(vec, Jr=np.eye(3))
+        _, Jl = SE2Batch.Exp(vec, Jl=np.eye(3))
+        for i in range(100):
+            T_true = spl.expm(SE2.hat(vec[i]))
+            np.testing.assert_allclose(T_true, T[i].arr, atol=1e-12)
+            if i >= 10:
+                _, Jr_true = SE2.Exp(vec[i], Jr=np.eye(3))
+                _, Jl_true = SE2.Exp(vec[i], Jl=np.eye(3))
+                np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+                np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            else:
+                np.testing.assert_allclose(T[i].Adj @ Jr[i], Jl[i], atol=1e-10)
+
+    def testLog(self):
+        logT, Jr = SE2Batch.Log(self.Tb, Jr=np.eye(3))
+        _, Jl = SE2Batch.Log(self.Tb, Jl=np.eye(3))
+        for i in range(100):
+            logT_true, Jr_true = SE2.Log(self.transforms[i], Jr=np.eye(3))
+            _, Jl_true = SE2.Log(self.transforms[i], Jl=np.eye(3))
+            np.testing.assert_allclose(logT_true, logT[i], atol=1e-10)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-8)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-8)
+
+        vec = np.random.uniform(-5, 5, size=(100,3))
+        vec[:,2] = np.random.uniform(-1e-3, 1e-3, size=100)
+        vec2, Jr = SE2Batch.Log(SE2Batch.Exp(vec), Jr=np.eye(3))
+        _, Jr_exp = SE2Batch.Exp(vec, Jr=np.eye(3))
+        np.testing.assert_allclose(vec, vec2, atol=1e-10)
+        np.testing.assert_allclose(np.tile(np.eye(3), (100,1,1)), Jr @ Jr_exp, atol=1e-10)
+
+    def testBoxPlusMinus(self):
+        T2s = SE2Batch.fromList([SE2.random() for i in range(100)])
+        vec = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        T3, Jr = self.Tb.boxplusr(vec, Jr=np.eye(3))
+        T4, Jl = self.Tb.boxplusl(vec, Jl=np.eye(3))
+        dr, Jr2 = self.Tb.boxminusr(T2s, Jr2=np.eye(3))
+        dl, Jl1 = self.Tb.boxminusl(T2s, Jl1=np.eye(3))
+        for i in range(100):
+            T = self.transforms[i]
+            T3_true, Jr_true = T.boxplusr(vec[i], Jr=np.eye(3))
+            T4_true, Jl_true = T.boxplusl(vec[i], Jl=np.eye(3))
+            dr_true, Jr2_true = T.boxminusr(T2s[i], Jr2=np.eye(3))
+            dl_true, Jl1_true = T.boxminusl(T2s[i], Jl1=np.eye(3))
+            np.testing.assert_allclose(T3_true.arr, T3[i].arr, atol=1e-10)
+            np.testing.assert_allclose(T4_true.arr, T4[i].arr, atol=1e-10)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            np.testing.assert_allclose(dr_true, dr[i], atol=1e-8)
+            np.testing.assert_allclose(dl_true, dl[i], atol=1e-8)
+            np.testing.assert_allclose(Jr2_true, Jr2[i], atol=1e-6)
+            np.testing.assert_allclose(Jl1_true, Jl1[i], atol=1e-6)
+
 
 if __name__=="__main__":
     unittest.main()
@@ -1,10 +1,11 @@
 import unittest
+import gc
 import numpy as np
 import scipy as sp
 from scipy.spatial.transform import Rotation
 import sys
 sys.path.append('..')
-from se3 import SE3
+from se3 import SE3, SE3Batch
 from so3 import SO3
 from quaternion import Quaternion, skew
 
@@ -14,6 +15,23 @@ class SE3_Test(unittest.TestCase):
     def setUp(self):
         self.transforms = [SE3.random() for i in range(100)]
 
+    def test_copy_semantics(self):
+        q, t = Quaternion.random(), np.random.uniform(-10.0, 10.0, size=3)
+        T = SE3(q, t)
+        self.assertFalse(np.shares_memory(q.q, T.q_arr) or np.shares_memory(t, T.t))
+        q_arr = q.q
+        T.normalize() # Does not reach into the caller's quaternion
+        self.assertIs(q_arr, q.q)
+
+        # q and t are packed into one contiguous array, view wraps such an array
+        self.assertTrue(T.arr.flags.c_contiguous)
+        np.testing.assert_allclose(np.concatenate([t, q.q]), T.arr)
+        arr = T.T
+        T = SE3.view(arr)
+        self.assertIs(arr, T.arr)
+        self.assertTrue(np.shares_memory(arr, T.q.q))
+        self.assertTrue(np.shares_memory(arr, T.t))
+
     def test_random_generator(self):
         for T in self.transforms:
             is_valid = T.isValidTransform()
@@ -236,6 +254,58 @@ class SE3_Test(unittest.TestCase):
         T.normalize()
         self.assertTrue(T.isValidTransform())
 
+    def test_cached_quantities(self):
+        T = SE3(Quaternion(np.array([2.0, 0.4, -0.2, 1.0])), np.array([1.0, 2.0, 3.0]))
+        Adj, T_inv = T.Adj, T.inv()
+        self.assertIs(T_inv, T.inv())
+
+        # Adj is a copy of the memoized matrix that callers may write into
+        Adj_true = Adj.copy()
+        Adj[:] = 0.0
+        np.testing.assert_allclose(Adj_true, T.Adj)
+
+        T.normalize()
+        T_true = SE3(Quaternion(T.q_arr.copy()), T.t)
+        np.testing.assert_allclose(T_true.Adj, T.Adj)
+        np.testing.assert_allclose(T_true.inv().T, T.inv().T)
+        np.testing.assert_allclose(T_true.inv().Adj, T.inv().Adj)
+
+    def test_quaternion_view(self):
+        # T.q writes through to T and drops the values T has memoized
+        T = SE3(Quaternion(np.array([2.0, 0.4, -0.2, 1.0])), np.array([1.0, 2.0, 3.0]))
+        q, Adj, T_inv = T.q, T.Adj, T.inv()
+        T.q.normalize()
+        self.assertTrue(T.isValidTransform())
+        self.assertIs(q, T.q)
+        self.assertTrue(np.shares_memory(T.arr, T.q.q))
+        T_true = SE3(Quaternion(T.q_arr.copy()), T.t)
+        np.testing.assert_allclose(T_true.R, T.R)
+        np.testing.assert_allclose(T_true.Adj, T.Adj)
+        np.testing.assert_allclose(T_true.inv().T, T.inv().T)
+
+        T.normalize() # And the other way around
+        self.assertIs(q, T.q)
+        np.testing.assert_allclose(T_true.R, q.R)
+
+        # A q with qw < 0 is not flipped into a new buffer
+        arr = np.array([1.0, 2.0, 3.0, -1.0, 0.5, 0.5, 0.5])
+        T = SE3.view(arr)
+        T.q.normalize()
+        self.assertTrue(np.shares_memory(arr, T.q.q))
+        np.testing.assert_allclose(1.0, np.linalg.norm(arr[3:]))
+
+    def test_no_reference_cycles(self):
+        # Memoized inverses do not link back, so poses are freed without the cycle collector
+        gc.collect()
+        T1, T2 = SE3.random(), SE3.random()
+        (T1 * T2).inv().Adj
+        T1.inv().inv().Adj
+        T1.compose(T2, Jr=np.eye(6))
+        T1.boxminusr(T2, Jr2=np.eye(6))
+        T1.q.normalize()
+        del T1, T2
+        self.assertEqual(0, gc.collect())
+
     def test_boxplusr(self):
         v_list = [np.random.uniform(-10.0, 10.0, size=3) for i in range(100)]
         w_list = [np.random.uniform(-np.pi, np.pi, size=3) for i in range(100)]
@@ -354,6 +424,20 @@ class SE3_Test(unittest.TestCase):
 
             np.testing.assert_allclose(Jr_true, Jr)
 
+    def test_transforming_point_clouds(self):
+        T = SE3.random()
+        v = np.random.uniform(-10, 10, size=(50,3))
+        for method in ('transa', 'transp'):
+            vp = getattr(T, method)(v)
+            for kw in ('Jr', 'Jl'):
+                vp2, J = getattr(T, method)(v, **{kw: np.eye(6)})
+                self.assertEqual((50,3,6), J.shape)
+                for i in range(50):
+                    vp_true, J_true = getattr(T, method)(v[i], **{kw: np.eye(6)})
+                    np.testing.assert_allclose(vp_true, vp[i])
+                    np.testing.assert_allclose(vp_true, vp2[i])
+                    np.testing.assert_allclose(J_true, J[i], atol=1e-10)
+
     def test_left_jacobian_or_transformation(self):
         for i in range(100):
             T = SE3.random()
@@ -482,5 +566,207 @@ class SE3_Test(unittest.TestCase):
             Jl_true = np.eye(6) @ Jr2 @ np.linalg.inv(T2.Adj)
             np.testing.assert_allclose(Jl_true, Jl2)
 
+    def test_jacobians_of_both_operands(self):
+        for i in range(100):
+            X1, X2 = SE3.random(), SE3.random()
+            for which in ('Jr', 'Jl'):
+                res, J1, J2 = X1.compose_jac(X2, which=which)
+                res_true, J1_true = X1.compose(X2, **{which: np.eye(6)})
+                _, J2_true = X1.compose(X2, **{which + '2': np.eye(6)})
+                np.testing.assert_allclose(res_true.T, res.T)
+                np.testing.assert_allclose(J1_true, J1, atol=1e-10)
+                np.testing.assert_allclose(J2_true, J2, atol=1e-10)
+
+                for method in ('boxminusr', 'boxminusl'):
+                    tau, J1, J2 = getattr(X1, method + '_jac')(X2, which=which)
+                    tau_true, J1_true = getattr(X1, method)(X2, **{which + '1': np.eye(6)})
+                    _, J2_true = getattr(X1, method)(X2, **{which + '2': np.eye(6)})
+                    np.testing.assert_allclose(tau_true, tau, atol=1e-10)
+                    np.testing.assert_allclose(J1_true, J1, atol=1e-8)
+                    np.testing.assert_allclose(J2_true, J2, atol=1e-8)
+
+
+class SE3Batch_Test(unittest.TestCase):
+    def setUp(self):
+        self.transforms = [SE3.random() for i in range(100)]
+        self.Tb = SE3Batch.fromList(self.transforms)
+
+    def test_from_array_like(self):
+        Tb = SE3Batch(self.Tb.T.tolist())
+        np.testing.assert_allclose(self.Tb.T, Tb.T)
+
+    def test_from_buffer(self):
+        buf = bytearray(self.Tb.arr.tobytes())
+        Tb = SE3Batch.fromBuffer(buf)
+        np.testing.assert_allclose(self.Tb.arr, Tb.arr)
+        self.assertTrue(np.shares_memory(Tb.arr, np.frombuffer(buf)))
+
+        # Slices and elements are views into the buffer
+        self.assertTrue(np.shares_memory(Tb[10:20].arr, Tb.arr))
+        self.assertTrue(np.shares_memory(Tb[5].t, Tb.arr))
+        np.testing.assert_allclose(self.transforms[5].T, Tb[5].T)
+        Tb[10:20].arr[:,:3] = 0.0
+        np.testing.assert_allclose(np.zeros((10,3)), np.frombuffer(buf).reshape(-1, 7)[10:20,:3])
+
+        arr = self.Tb.arr.copy()
+        self.assertIs(arr, SE3Batch.fromBuffer(arr).arr)
+
+    def test_preallocated_outputs(self):
+        T2 = SE3Batch.fromList([SE3.random() for i in range(100)])
+        v = np.random.uniform(-10.0, 10.0, size=(100,3))
+        out, vp = np.empty((100,7)), np.empty((100,3))
+
+        res = self.Tb.compose(T2, out=out)
+        self.assertIs(out, res.arr)
+        np.testing.assert_allclose((self.Tb * T2).arr, out)
+        self.assertTrue(np.all(out[:,3] >= 0))
+
+        res, J = self.Tb.compose(T2, Jl2=np.eye(6), out=out)
+        _, J_true = self.Tb.compose(T2, Jl2=np.eye(6))
+        np.testing.assert_allclose(J_true, J)
+
+        self.assertIs(out, self.Tb.inv(out=out).arr)
+        np.testing.assert_allclose(self.Tb.inv().arr, out)
+        self.assertIs(vp, self.Tb.transa(v, out=vp))
+        np.testing.assert_allclose(self.Tb.transa(v), vp)
+        np.testing.assert_allclose(self.Tb.transp(v), self.Tb.transp(v, out=vp))
+
+        # Composing in place into the first operand
+        T_true = self.Tb * T2
+        Tb = SE3Batch.fromBuffer(self.Tb.arr.copy())
+        Tb, J = Tb.compose(T2, Jl2=np.eye(6), out=Tb.arr)
+        np.testing.assert_allclose(T_true.arr, Tb.arr)
+        np.testing.assert_allclose(J_true, J)
+
+    def test_conversions(self):
+        rpy = np.random.uniform(-1.5, 1.5, size=(100,3))
+        t = np.random.uniform(-10.0, 10.0, size=(100,3))
+        Tb = SE3Batch.fromRPYandt(rpy, t)
+        Tb2 = SE3Batch.fromRAndt(Tb.R, t)
+        Tb3 = SE3Batch.fromAxisAngleAndt(rpy, t)
+        for i in range(100):
+            np.testing.assert_allclose(SE3.fromRPYandt(rpy[i], t[i]).T, Tb[i].T, atol=1e-12)
+            np.testing.assert_allclose(Tb[i].T, Tb2[i].T, atol=1e-12)
+            np.testing.assert_allclose(SE3.fromAxisAngleAndt(rpy[i], t[i]).T, Tb3[i].T, atol=1e-12)
+
+    def test_random(self):
+        Tb = SE3.random(50, rng=np.random.default_rng(3))
+        self.assertIsInstance(Tb, SE3Batch)
+        self.assertEqual((50,7), Tb.arr.shape)
+        self.assertTrue(Tb.isValidTransform().all())
+        np.testing.assert_allclose(Tb.arr, SE3Batch.random(50, np.random.default_rng(3)).arr)
+        np.testing.assert_allclose(SE3.random(rng=np.random.default_rng(1)).T,
+                                   SE3.random(rng=np.random.default_rng(1)).T)
+
+    def test_composition(self):
+        T2s = [SE3.random() for i in range(100)]
+        T3 = self.Tb * SE3Batch.fromList(T2s)
+        T4 = self.Tb * T2s[0]
+        T5 = T2s[0] * self.Tb
+        for i in range(100):
+            np.testing.assert_allclose((self.transforms[i] * T2s[i]).T, T3[i].T)
+            np.testing.assert_allclose((self.transforms[i] * T2s[0]).T, T4[i].T)
+            np.testing.assert_allclose((T2s[0] * self.transforms[i]).T, T5[i].T)
+
+    def test_inverse_and_adjoint(self):
+        T_inv, Jl = self.Tb.inv(Jl=np.eye(6))
+        Adj = self.Tb.Adj
+        for i in range(100):
+            T_inv_true, Jl_true = self.transforms[i].inv(Jl=np.eye(6))
+            np.testing.assert_allclose(T_inv_true.T, T_inv[i].T, atol=1e-12)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-12)
+            np.testing.assert_allclose(self.transforms[i].Adj, Adj[i], atol=1e-12)
+
+    def test_transforming_points(self):
+        v = np.random.uniform(-10, 10, size=(100,3))
+        vp, Jr = self.Tb.transa(v, Jr=np.eye(6))
+        vp2, Jl = self.Tb.transp(v, Jl=np.eye(6))
+        for i in range(100):
+            vp_true, Jr_true = self.transforms[i].transa(v[i], Jr=np.eye(6))
+            vp2_true, Jl_true = self.transforms[i].transp(v[i], Jl=np.eye(6))
+            np.testing.assert_allclose(vp_true, vp[i])
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-12)
+            np.testing.assert_allclose(vp2_true, vp2[i])
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+
+    def test_exponential_map(self):
+        vec = np.random.uniform(-np.pi, np.pi, size=(100,6))
+        vec[:10,3:] *= 1e-9
+        T, Jr = SE3Batch.Exp(vec, Jr=np.eye(6))
+        _, Jl = SE3Batch.Exp(vec, Jl=np.eye(6))
+        for i in range(100):
+            v, w = vec[i,:3], vec[i,3:]
+            logT = np.block([[skew(w), v[:,None]], [np.zeros((1,4))]])
+            T_true = sp.linalg.expm(logT)
+            np.testing.assert_allclose(T_true[:3,:3], T[i].R, atol=1e-10)
+            np.testing.assert_allclose(T_true[:3,3], T[i].t, atol=1e-10)
+            if i >= 10:
+                _, Jr_true = SE3.Exp(vec[i], Jr=np.eye(6))
+                _, Jl_true = SE3.Exp(vec[i], Jl=np.eye(6))
+                np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+                np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            else:
+                np.testing.assert_allclose(T[i].Adj @ Jr[i], Jl[i], atol=1e-10)
+
+    def test_jacobian_taylor_series(self):
+        # Below theta = 0.1 the coefficients of the Q block come from their Taylor series
+        w = np.random.uniform(-1.0, 1.0, size=(100,3))
+        w *= np.exp(np.random.uniform(np.log(1e-3), np.log(1e-1), size=(100,1))) / np.linalg.norm(w, axis=1)[:,None]
+        vec = np.concatenate([np.random.uniform(-1.0, 1.0, size=(100,3)), w], axis=1)
+        _, Jr = SE3Batch.Exp(vec, Jr=np.eye(6))
+        _, Jl = SE3Batch.Exp(vec, Jl=np.eye(6))
+        for i in range(100):
+            _, Jr_true = SE3.Exp(vec[i], Jr=np.eye(6))
+            _, Jl_true = SE3.Exp(vec[i], Jl=np.eye(6))
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-9)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-9)
+
+    def test_logarithmic_map(self):
+        logT, Jr = SE3Batch.Log(self.Tb, Jr=np.eye(6))
+        _, Jl = SE3Batch.Log(self.Tb, Jl=np.eye(6))
+        for i in range(100):
+            logT_true, Jr_true = SE3.Log(self.transforms[i], Jr=np.eye(6))
+            _, Jl_true = SE3.Log(self.transforms[i], Jl=np.eye(6))
+            np.testing.assert_allclose(logT_true, logT[i], atol=1e-10)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-8)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-8)
+
+        vec = np.random.uniform(-10.0, 10.0, size=(100,6))
+        vec[:,3:] *= np.random.uniform(0, 1e-3, size=(100,1))
+        np.testing.assert_allclose(vec, SE3Batch.Log(SE3Batch.Exp(vec)), atol=1e-10)
+
+    def test_boxplus_and_boxminus(self):
+        T2s = SE3Batch.fromList([SE3.random() for i in range(100)])
+        vec = np.random.uniform(-np.pi, np.pi, size=(100,6))
+        T3, Jr = self.Tb.boxplusr(vec, Jr=np.eye(6))
+        T4, Jl = self.Tb.boxplusl(vec, Jl=np.eye(6))
+        dr, Jr2 = self.Tb.boxminusr(T2s, Jr2=np.eye(6))
+        dl, Jl1 = self.Tb.boxminusl(T2s, Jl1=np.eye(6))
+        for i in range(100):
+            T = self.transforms[i]
+            T3_true, Jr_true = T.boxplusr(vec[i], Jr=np.eye(6))
+            T4_true, Jl_true = T.boxplusl(vec[i], Jl=np.eye(6))
+            dr_true, Jr2_true = T.boxminusr(T2s[i], Jr2=np.eye(6))
+            dl_true, Jl1_true = T.boxminusl(T2s[i], Jl1=np.eye(6))
+            np.testing.assert_allclose(T3_true.T, T3[i].T, atol=1e-10)
+            np.testing.assert_allclose(T4_true.T, T4[i].T, atol=1e-10)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            np.testing.assert_allclose(dr_true, dr[i], atol=1e-8)
+            np.testing.assert_allclose(dl_true, dl[i], atol=1e-8)
+            np.testing.assert_allclose(Jr2_true, Jr2[i], atol=1e-6)
+            np.testing.assert_allclose(Jl1_true, Jl1[i], atol=1e-6)
+
+    def test_jacobians_of_both_operands(self):
+        T2s = SE3Batch.fromList([SE3.random() for i in range(100)])
+        for which in ('Jr', 'Jl'):
+            tau, J1, J2 = self.Tb.boxminusr_jac(T2s, which=which)
+            _, J1_true = self.Tb.boxminusr(T2s, **{which + '1': np.eye(6)})
+            _, J2_true = self.Tb.boxminusr(T2s, **{which + '2': np.eye(6)})
+            np.testing.assert_allclose(self.Tb.boxminusr(T2s), tau)
+            np.testing.assert_allclose(J1_true, J1, atol=1e-10)
+            np.testing.assert_allclose(J2_true, J2, atol=1e-10)
+
+
 if __name__=="__main__":
     unittest.main()
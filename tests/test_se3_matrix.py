@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+from se3_matrix import SE3Matrix, compose_chain
+from se3 import SE3
+
+class SE3Matrix_Test(unittest.TestCase):
+    def setUp(self):
+        self.transforms = [SE3.random() for i in range(100)]
+
+    def test_conversions(self):
+        for T in self.transforms:
+            M = SE3Matrix.fromSE3(T)
+            self.assertTrue(M.isValidTransform())
+            np.testing.assert_allclose(T.T, M.toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(T.R, M.R, atol=1e-12)
+            np.testing.assert_allclose(T.t, M.t)
+            np.testing.assert_allclose(T.T, SE3Matrix.from7vec(T.T).toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(T.Adj, M.Adj, atol=1e-12)
+
+    def test_group_operations(self):
+        for T1, T2 in zip(self.transforms, self.transforms[1:]):
+            M1, M2 = SE3Matrix.fromSE3(T1), SE3Matrix.fromSE3(T2)
+            v = np.random.uniform(-10.0, 10.0, size=3)
+            cloud = np.random.uniform(-10.0, 10.0, size=(10,3))
+            xi = np.random.uniform(-1.0, 1.0, size=6)
+
+            np.testing.assert_allclose((T1 * T2).T, (M1 * M2).toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(T1.inv().T, M1.inv().toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(T1.transa(v), M1.transa(v), atol=1e-12)
+            np.testing.assert_allclose(T1.transp(v), M1.transp(v), atol=1e-12)
+            np.testing.assert_allclose(T1.transa(cloud), M1.transa(cloud), atol=1e-12)
+            np.testing.assert_allclose(SE3.Exp(xi).T, SE3Matrix.Exp(xi).toSE3().T, atol=1e-12)
+            np.testing.assert_allclose(SE3.Log(T1), SE3Matrix.Log(M1), atol=1e-10)
+            np.testing.assert_allclose(xi, SE3Matrix.vee(SE3Matrix.hat(xi)))
+            np.testing.assert_allclose(T1.boxminusr(T2), M1.boxminusr(M2), atol=1e-10)
+            np.testing.assert_allclose(T1.boxplusl(xi).T, M1.boxplusl(xi).toSE3().T, atol=1e-10)
+
+    def test_jacobians_match_se3(self):
+        I = np.eye(6)
+        for T1, T2 in zip(self.transforms, self.transforms[1:]):
+            M1, M2 = SE3Matrix.fromSE3(T1), SE3Matrix.fromSE3(T2)
+            v = np.random.uniform(-10.0, 10.0, size=3)
+            cloud = np.random.uniform(-10.0, 10.0, size=(10,3))
+            xi = np.random.uniform(-1.0, 1.0, size=6)
+            for jac in ('Jr', 'Jl'):
+                calls = ((T1.inv, M1.inv, ()), (T1.transa, M1.transa, (v,)), (T1.transp, M1.transp, (v,)),
+                         (T1.transa, M1.transa, (cloud,)), (T1.boxplusr, M1.boxplusr, (xi,)),
+                         (T1.boxplusl, M1.boxplusl, (xi,)), (SE3.Exp, SE3Matrix.Exp, (xi,)))
+                for f, g, args in calls:
+                    np.testing.assert_allclose(f(*args, **{jac: I})[1], g(*args, **{jac: I})[1], atol=1e-8)
+                np.testing.assert_allclose(SE3.Log(T1, **{jac: I})[1], SE3Matrix.Log(M1, **{jac: I})[1], atol=1e-8)
+            for jac in ('Jr', 'Jl', 'Jr2', 'Jl2'):
+                np.testing.assert_allclose(T1.compose(T2, **{jac: I})[1], M1.compose(M2, **{jac: I})[1], atol=1e-10)
+            for jac in ('Jr1', 'Jl1', 'Jr2', 'Jl2'):
+                np.testing.assert_allclose(T1.boxminusr(T2, **{jac: I})[1], M1.boxminusr(M2, **{jac: I})[1], atol=1e-8)
+                np.testing.assert_allclose(T1.boxminusl(T2, **{jac: I})[1], M1.boxminusl(M2, **{jac: I})[1], atol=1e-8)
+
+    def test_compose_chain(self):
+        Ms = [SE3Matrix.fromSE3(T) for T in self.transforms[:10]]
+        T_true = self.transforms[0]
+        for T in self.transforms[1:10]:
+            T_true = T_true * T
+        np.testing.assert_allclose(T_true.T, compose_chain(Ms).toSE3().T, atol=1e-10)
+        np.testing.assert_allclose(T_true.T, compose_chain(np.array([M.T for M in Ms])).toSE3().T, atol=1e-10)
+        np.testing.assert_allclose(Ms[3].T, compose_chain(Ms[3:4]).T)
+
+        # Stacks of chains of every length up to 9, including odd ones
+        for n in range(1, 10):
+            chains = np.array([[SE3Matrix.random().T for i in range(n)] for b in range(5)])
+            products = compose_chain(chains)
+            self.assertEqual((5,4,4), products.shape)
+            for b in range(5):
+                np.testing.assert_allclose(compose_chain(list(chains[b])).T, products[b], atol=1e-10)
+
+    def test_normalize(self):
+        M = SE3Matrix.fromSE3(self.transforms[0])
+        R = M.R.copy()
+        M.arr[:3,:3] += 1e-4
+        self.assertFalse(M.isValidTransform())
+        M.normalize()
+        self.assertTrue(M.isValidTransform())
+        np.testing.assert_allclose(R, M.R, atol=1e-3)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -1,13 +1,19 @@
 import unittest
 import sys
 sys.path.append('..')
-from so2 import SO2
+from so2 import SO2, SO2Batch
 import numpy as np
 
 from IPython.core.debugger import Pdb
 
 class SO2Test(unittest.TestCase):
 
+    def testCopySemantics(self):
+        R = SO2.random().R.copy()
+        self.assertFalse(np.shares_memory(R, SO2(R).R))
+        self.assertIs(R, SO2(R, copy=False).R)
+        self.assertIs(R, SO2.view(R).R)
+
     def testExp(self):
         for i in range(100):
             theta = np.random.uniform(-np.pi, np.pi)
@@ -371,5 +377,84 @@ class SO2Test(unittest.TestCase):
             Jl_true = 1 * Jr2 * R2.Adj
             np.testing.assert_allclose(Jl_true, Jl2)
 
+    def test_jacobians_of_both_operands(self):
+        for i in range(100):
+            R1, R2 = SO2.random(), SO2.random()
+            for which in ('Jr', 'Jl'):
+                res, J1, J2 = R1.compose_jac(R2, which=which)
+                np.testing.assert_allclose((R1 * R2).R, res.R)
+                self.assertEqual((1.0, 1.0), (J1, J2))
+
+                tau, J1, J2 = R1.boxminusr_jac(R2, which=which)
+                np.testing.assert_allclose(R1.boxminusr(R2), tau)
+                self.assertEqual((1.0, -1.0), (J1, J2))
+
+
+class SO2BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.Rs = [SO2.random() for i in range(100)]
+        self.Rb = SO2Batch.fromList(self.Rs)
+
+    def testFromArrayLike(self):
+        Rb = SO2Batch(self.Rb.theta.tolist())
+        np.testing.assert_allclose(self.Rb.theta, Rb.theta)
+
+    def testRandom(self):
+        Rb = SO2.random(50, rng=np.random.default_rng(3))
+        self.assertIsInstance(Rb, SO2Batch)
+        self.assertEqual(50, len(Rb))
+        np.testing.assert_allclose(Rb.arr, SO2Batch.random(50, np.random.default_rng(3)).arr)
+
+        rng = np.random.default_rng(3)
+        for i in range(50):
+            np.testing.assert_allclose(SO2.random(rng=rng).R, Rb[i].R, atol=1e-12)
+
+    def testGroupOperator(self):
+        R2s = [SO2.random() for i in range(100)]
+        R3 = self.Rb * SO2Batch.fromList(R2s)
+        R4 = R2s[0] * self.Rb
+        R_inv = self.Rb.inv()
+        for i in range(100):
+            np.testing.assert_allclose((self.Rs[i] * R2s[i]).R, R3[i].R, atol=1e-12)
+            np.testing.assert_allclose((R2s[0] * self.Rs[i]).R, R4[i].R, atol=1e-12)
+            np.testing.assert_allclose(self.Rs[i].inv().R, R_inv[i].R, atol=1e-12)
+            np.testing.assert_allclose(self.Rs[i].R, self.Rb.R[i], atol=1e-12)
+        self.assertTrue(np.all(np.abs(R3.theta) <= np.pi))
+
+    def testRotatingVectors(self):
+        v = np.random.uniform(-5, 5, size=(100,2))
+        vp, Jr = self.Rb.rota(v, Jr=1.0)
+        vp2, Jl = self.Rb.rotp(v, Jl=1.0)
+        for i in range(100):
+            vp_true, Jr_true = self.Rs[i].rota(v[i], Jr=1.0)
+            vp2_true, Jl_true = self.Rs[i].rotp(v[i], Jl=1.0)
+            np.testing.assert_allclose(vp_true, vp[i])
+            np.testing.assert_allclose(Jr_true, Jr[i])
+            np.testing.assert_allclose(vp2_true, vp2[i])
+            np.testing.assert_allclose(Jl_true, Jl[i])
+
+    def testExpLog(self):
+        theta = np.random.uniform(-10, 10, size=100)
+        R, Jr = SO2Batch.Exp(theta, Jr=1.0)
+        theta2, Jl = SO2Batch.Log(R, Jl=1.0)
+        for i in range(100):
+            np.testing.assert_allclose(SO2.Exp(theta[i]).R, R[i].R, atol=1e-12)
+            np.testing.assert_allclose(SO2.Log(R[i]), theta2[i], atol=1e-12)
+        np.testing.assert_allclose(np.ones(100), Jr)
+        np.testing.assert_allclose(np.ones(100), Jl)
+
+    def testBoxPlusMinus(self):
+        R2s = SO2Batch.fromList([SO2.random() for i in range(100)])
+        theta = np.random.uniform(-np.pi, np.pi, size=100)
+        R3 = self.Rb.boxplusr(theta)
+        dr, Jr2 = self.Rb.boxminusr(R2s, Jr2=1.0)
+        dl = self.Rb.boxminusl(R2s)
+        for i in range(100):
+            np.testing.assert_allclose(self.Rs[i].boxplusr(theta[i]).R, R3[i].R, atol=1e-12)
+            np.testing.assert_allclose(self.Rs[i].boxminusr(R2s[i]), dr[i], atol=1e-12)
+            np.testing.assert_allclose(self.Rs[i].boxminusl(R2s[i]), dl[i], atol=1e-12)
+        np.testing.assert_allclose(-np.ones(100), Jr2)
+
+
 if __name__=="__main__":
     unittest.main()
@@ -4,12 +4,18 @@ from scipy.spatial.transform import Rotation
 import unittest
 import sys
 sys.path.append("..")
-from so3 import SO3
-from quaternion import Quaternion
+from so3 import SO3, SO3Batch
+from quaternion import Quaternion, QuaternionBatch
 
 from IPython.core.debugger import Pdb
 
 class SO3_testing(unittest.TestCase):
+    def testCopySemantics(self):
+        R = SO3.random().R.copy()
+        self.assertFalse(np.shares_memory(R, SO3(R).R))
+        self.assertIs(R, SO3(R, copy=False).R)
+        self.assertIs(R, SO3.view(R).R)
+
     def testConstructor(self):
         for i in range(100):
             angles = np.random.uniform(-np.pi, np.pi, size=3)
@@ -478,6 +484,160 @@ class SO3_testing(unittest.TestCase):
             Jl_true = np.eye(3) @ Jr2 @ R2.Adj.T
             np.testing.assert_allclose(Jl_true, Jl2)
 
+    def test_jacobians_of_both_operands(self):
+        for i in range(100):
+            X1, X2 = SO3.random(), SO3.random()
+            for which in ('Jr', 'Jl'):
+                res, J1, J2 = X1.compose_jac(X2, which=which)
+                res_true, J1_true = X1.compose(X2, **{which: np.eye(3)})
+                _, J2_true = X1.compose(X2, **{which + '2': np.eye(3)})
+                np.testing.assert_allclose(res_true.R, res.R)
+                np.testing.assert_allclose(J1_true, J1, atol=1e-10)
+                np.testing.assert_allclose(J2_true, J2, atol=1e-10)
+
+                for method in ('boxminusr', 'boxminusl'):
+                    tau, J1, J2 = getattr(X1, method + '_jac')(X2, which=which)
+                    tau_true, J1_true = getattr(X1, method)(X2, **{which + '1': np.eye(3)})
+                    _, J2_true = getattr(X1, method)(X2, **{which + '2': np.eye(3)})
+                    np.testing.assert_allclose(tau_true, tau, atol=1e-10)
+                    np.testing.assert_allclose(J1_true, J1, atol=1e-8)
+                    np.testing.assert_allclose(J2_true, J2, atol=1e-8)
+
+
+class SO3Batch_testing(unittest.TestCase):
+    def setUp(self):
+        self.Rs = [SO3.random() for i in range(100)]
+        self.Rb = SO3Batch.fromList(self.Rs)
+
+    def testFromArrayLike(self):
+        Rb = SO3Batch([R.R.tolist() for R in self.Rs])
+        np.testing.assert_allclose(self.Rb.R, Rb.R)
+
+    def testConversions(self):
+        rpy = np.random.uniform(-1.5, 1.5, size=(100,3))
+        Rb = SO3Batch.fromRPY(rpy)
+        for i in range(100):
+            np.testing.assert_allclose(SO3.fromRPY(rpy[i]).R, Rb[i].R, atol=1e-12)
+            np.testing.assert_allclose(rpy[i], Rb[i].toRPY(), atol=1e-12)
+        np.testing.assert_allclose(rpy, Rb.toRPY(), atol=1e-12)
+
+        q = QuaternionBatch.fromList([Quaternion.random() for i in range(100)]).q
+        Rb = SO3Batch.fromQuaternion(q)
+        w = np.random.uniform(-1.0, 1.0, size=(100,3))
+        Rw = SO3Batch.fromAxisAngle(w)
+        for i in range(100):
+            np.testing.assert_allclose(SO3.fromQuaternion(q[i]).R, Rb[i].R, atol=1e-12)
+            np.testing.assert_allclose(SO3.fromAxisAngle(w[i]).R, Rw[i].R, atol=1e-12)
+
+    def testRandom(self):
+        Rb = SO3.random(50, rng=np.random.default_rng(3))
+        self.assertIsInstance(Rb, SO3Batch)
+        np.testing.assert_allclose(np.tile(np.eye(3), (50,1,1)), Rb.R @ Rb.R.transpose(0,2,1), atol=1e-12)
+        np.testing.assert_allclose(np.ones(50), Rb.det())
+
+        # Draws the same samples as the scalar method
+        rng = np.random.default_rng(3)
+        for i in range(50):
+            np.testing.assert_allclose(SO3.random(rng=rng).R, Rb[i].R, atol=1e-12)
+
+    def testGroupAction(self):
+        R2s = [SO3.random() for i in range(100)]
+        R3 = self.Rb * SO3Batch.fromList(R2s)
+        R4 = self.Rb * R2s[0]
+        R5 = R2s[0] * self.Rb
+
+        for i in range(100):
+            np.testing.assert_allclose((self.Rs[i] * R2s[i]).R, R3[i].R)
+            np.testing.assert_allclose((self.Rs[i] * R2s[0]).R, R4[i].R)
+            np.testing.assert_allclose((R2s[0] * self.Rs[i]).R, R5[i].R)
+
+    def testInv(self):
+        R_inv, Jr = self.Rb.inv(Jr=np.eye(3))
+        _, Jl = self.Rb.inv(Jl=np.eye(3))
+        for i in range(100):
+            R_inv_true, Jr_true = self.Rs[i].inv(Jr=np.eye(3))
+            _, Jl_true = self.Rs[i].inv(Jl=np.eye(3))
+            np.testing.assert_allclose(R_inv_true.R, R_inv[i].R)
+            np.testing.assert_allclose(Jr_true, Jr[i])
+            np.testing.assert_allclose(Jl_true, Jl[i])
+
+    def testRotatingVectors(self):
+        v = np.random.uniform(-10, 10, size=(100,3))
+        vp, Jr = self.Rb.rota(v, Jr=np.eye(3))
+        vp2, Jl = self.Rb.rotp(v, Jl=np.eye(3))
+        vp3 = self.Rb.rota(v[0])
+        for i in range(100):
+            vp_true, Jr_true = self.Rs[i].rota(v[i], Jr=np.eye(3))
+            vp2_true, Jl_true = self.Rs[i].rotp(v[i], Jl=np.eye(3))
+            np.testing.assert_allclose(vp_true, vp[i])
+            np.testing.assert_allclose(Jr_true, Jr[i])
+            np.testing.assert_allclose(vp2_true, vp2[i])
+            np.testing.assert_allclose(Jl_true, Jl[i])
+            np.testing.assert_allclose(self.Rs[i].rota(v[0]), vp3[i])
+
+    def testExp(self):
+        w = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        w[:10] *= 1e-9
+        R, Jr = SO3Batch.Exp(w, Jr=np.eye(3))
+        _, Jl = SO3Batch.Exp(w, Jl=np.eye(3))
+        for i in range(100):
+            R_true = sp.linalg.expm(SO3.hat(w[i]))
+            np.testing.assert_allclose(R_true, R[i].R, atol=1e-10)
+            if i >= 10:
+                _, Jr_true = SO3.Exp(w[i], Jr=np.eye(3))
+                _, Jl_true = SO3.Exp(w[i], Jl=np.eye(3))
+                np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+                np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            else:
+                np.testing.assert_allclose(np.eye(3), Jr[i], atol=1e-8)
+
+    def testLog(self):
+        w, Jr = SO3Batch.Log(self.Rb, Jr=np.eye(3))
+        _, Jl = SO3Batch.Log(self.Rb, Jl=np.eye(3))
+        for i in range(100):
+            w_true = SO3.vee(sp.linalg.logm(self.Rs[i].R).real)
+            _, Jr_true = SO3.Log(self.Rs[i], Jr=np.eye(3))
+            _, Jl_true = SO3.Log(self.Rs[i], Jl=np.eye(3))
+            np.testing.assert_allclose(w_true, w[i], atol=1e-10)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-8)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-8)
+
+    def testLogTaylor(self):
+        w = np.random.uniform(-1.0, 1.0, size=(100,3))
+        w = w / np.linalg.norm(w, axis=1)[:,None]
+        w[:50] *= np.random.uniform(0, 1e-3, size=50)[:,None]
+        w[50:] *= (np.pi - np.random.uniform(0, 1e-4, size=50))[:,None]
+
+        w2 = SO3Batch.Log(SO3Batch.Exp(w))
+        np.testing.assert_allclose(w, w2, atol=1e-10)
+
+    def testBoxPlusMinus(self):
+        R2s = SO3Batch.fromList([SO3.random() for i in range(100)])
+        v = np.random.uniform(-np.pi, np.pi, size=(100,3))
+        R3, Jr = self.Rb.boxplusr(v, Jr=np.eye(3))
+        R4, Jl = self.Rb.boxplusl(v, Jl=np.eye(3))
+        dr, Jr2 = self.Rb.boxminusr(R2s, Jr2=np.eye(3))
+        dl, Jl1 = self.Rb.boxminusl(R2s, Jl1=np.eye(3))
+        for i in range(100):
+            R3_true, Jr_true = self.Rs[i].boxplusr(v[i], Jr=np.eye(3))
+            R4_true, Jl_true = self.Rs[i].boxplusl(v[i], Jl=np.eye(3))
+            dr_true, Jr2_true = self.Rs[i].boxminusr(R2s[i], Jr2=np.eye(3))
+            dl_true, Jl1_true = self.Rs[i].boxminusl(R2s[i], Jl1=np.eye(3))
+            np.testing.assert_allclose(R3_true.R, R3[i].R)
+            np.testing.assert_allclose(R4_true.R, R4[i].R)
+            np.testing.assert_allclose(Jr_true, Jr[i], atol=1e-10)
+            np.testing.assert_allclose(Jl_true, Jl[i], atol=1e-10)
+            np.testing.assert_allclose(dr_true, dr[i], atol=1e-8)
+            np.testing.assert_allclose(dl_true, dl[i], atol=1e-8)
+            np.testing.assert_allclose(Jr2_true, Jr2[i], atol=1e-6)
+            np.testing.assert_allclose(Jl1_true, Jl1[i], atol=1e-6)
+
+    def testNormalize(self):
+        Rb = SO3Batch(self.Rb.R + np.random.uniform(-1e-4, 1e-4, size=(100,3,3)))
+        Rb.normalize()
+        np.testing.assert_allclose(np.ones(100), Rb.det())
+        np.testing.assert_allclose(np.tile(np.eye(3), (100,1,1)), Rb.R @ Rb.inv().R, atol=1e-12)
+
 
 if __name__=="__main__":
     unittest.main()
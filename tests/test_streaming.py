@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import sys
+sys.path.append('..')
+from streaming import transform_chunks, transform_points
+from se2 import SE2
+from se3 import SE3
+
+class Streaming_Test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.points = np.random.uniform(-100.0, 100.0, size=(1000,3))
+        self.path = os.path.join(self.dir.name, 'points.npy')
+        np.save(self.path, self.points)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_memory_mapped_files(self):
+        T = SE3.random()
+        out_path = os.path.join(self.dir.name, 'out.npy')
+        for workers in (None, 4):
+            out = transform_points(self.path, T, out_path, chunk_size=128, workers=workers)
+            self.assertIsInstance(out, np.memmap)
+            del out
+            np.testing.assert_allclose(T.transa(self.points), np.load(out_path))
+
+        out = transform_points(np.load(self.path, mmap_mode='r'), T, np.empty((1000,3)), chunk_size=100,
+                               method='transp')
+        np.testing.assert_allclose(T.transp(self.points), out)
+
+    def test_pose_per_chunk(self):
+        Ts = [SE3.random() for i in range(8)]
+        out = transform_points(self.points, Ts, np.empty((1000,3)), chunk_size=128, workers=2)
+        for i, T in enumerate(Ts):
+            np.testing.assert_allclose(T.transa(self.points[128*i:128*(i+1)]), out[128*i:128*(i+1)])
+
+        with self.assertRaises(ValueError):
+            transform_points(self.points, Ts[:3], np.empty((1000,3)), chunk_size=128)
+
+    def test_chunk_iterators(self):
+        T = SE2.random()
+        chunks = [np.random.uniform(-10.0, 10.0, size=(n,2)) for n in (10, 50, 1, 30)]
+        for workers in (None, 2):
+            res = list(transform_chunks(iter(chunks), T, workers=workers))
+            self.assertEqual(len(chunks), len(res))
+            for chunk, vp in zip(chunks, res):
+                np.testing.assert_allclose(T.transa(chunk), vp)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('..')
+from validation import set_validation, validation_enabled
+from so2 import SO2
+from se2 import SE2
+from so3 import SO3
+from quaternion import Quaternion
+from se3 import SE3
+from se3_matrix import SE3Matrix
+
+class Validation_Test(unittest.TestCase):
+    def tearDown(self):
+        set_validation(True)
+
+    def test_checks_can_be_turned_off(self):
+        self.assertTrue(validation_enabled())
+        with self.assertRaises(AssertionError):
+            SO3(np.eye(2))
+        with self.assertRaises(AssertionError):
+            SE2.hat(np.zeros(2))
+        with self.assertRaises(ValueError):
+            Quaternion(np.zeros(3))
+
+        self.assertTrue(set_validation(False))
+        self.assertFalse(validation_enabled())
+        SO3(np.eye(2))
+        Quaternion(np.zeros(3))
+
+    def test_results_are_not_revalidated(self):
+        # Validation stays on, only the checks of the arguments run
+        def fail(*args, **kwargs):
+            raise AssertionError("a checking constructor was called")
+
+        R1, R2 = SO3.random(), SO3.random()
+        T1, T2 = SE3.random(), SE3.random()
+        S1, S2 = SE2.random(), SE2.random()
+        P1, P2 = SO2.random(), SO2.random()
+        q1, q2 = Quaternion.random(), Quaternion.random()
+        M1, M2 = SE3Matrix.random(), SE3Matrix.random()
+        checking = [(G, '__init__') for G in (SO2, SE2, SO3, Quaternion, SE3, SE3Matrix)]
+        checking += [(SO2, 'exp'), (SE2, 'exp'), (SE2, 'fromRandt'), (SE2, 'fromAngleAndt'), (SO3, 'exp'),
+                     (SE3Matrix, 'fromRandt')]
+        originals = [(G, name, G.__dict__[name]) for G, name in checking]
+        try:
+            for G, name in checking:
+                setattr(G, name, fail)
+            for X1, X2, xi in ((R1, R2, np.ones(3)), (T1, T2, np.ones(6)), (S1, S2, np.ones(3)),
+                               (P1, P2, 0.5), (q1, q2, np.ones(3)), (M1, M2, np.ones(6))):
+                G = type(X1)
+                I = np.eye(np.size(xi)) if np.size(xi) > 1 else 1.0
+                X1 * X2, X1.inv(), G.Exp(xi)
+                X1.compose(X2, Jr=I), X1.compose(X2, Jl2=I)
+                X1.inv(Jr=I), X1.inv(Jl=I)
+                G.Exp(xi, Jr=I), G.Exp(xi, Jl=I)
+        finally:
+            for G, name, fn in originals:
+                setattr(G, name, fn)
+
+    def test_unchecked_results_match(self):
+        set_validation(False)
+        R1, R2 = SO3.random(), SO3.random()
+        np.testing.assert_allclose(R1.R @ R2.R, (R1 * R2).R)
+        q = Quaternion(np.array([-1.0, 0.0, 0.0, 0.0]))
+        np.testing.assert_allclose(np.array([1.0, 0.0, 0.0, 0.0]), (q * q.inv()).q)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import tracemalloc
+import numpy as np
+import sys
+sys.path.append('..')
+from workspace import Workspace
+from so3 import SO3
+from se2 import SE2
+from quaternion import Quaternion
+from se3 import SE3
+
+GROUPS = ((SO3, 3), (Quaternion, 3), (SE2, 3), (SE3, 6))
+
+class Workspace_Test(unittest.TestCase):
+    def test_outputs_match(self):
+        for G, dof in GROUPS:
+            ws = Workspace()
+            for i in range(20):
+                X, Y = G.random(), G.random()
+                xi = np.random.uniform(-1.0, 1.0, size=dof)
+                out = ws.element('out', G)
+
+                self.assertIs(out, X.compose(Y, out=out))
+                np.testing.assert_allclose((X * Y).arr, out.arr, atol=1e-12)
+                self.assertIs(out, X.inv(out=out))
+                np.testing.assert_allclose(X.inv().arr, out.arr, atol=1e-12)
+                self.assertIs(out, G.Exp(xi, out=out))
+                np.testing.assert_allclose(G.Exp(xi).arr, out.arr, atol=1e-12)
+                v = ws.vector('v', dof)
+                self.assertIs(v, G.Log(X, out=v))
+                np.testing.assert_allclose(G.Log(X), v, atol=1e-10)
+
+                # Jacobians are unchanged and out may be one of the operands
+                _, J_true = X.compose(Y, Jr=True)
+                Z = G.Identity()
+                Z.arr[...] = X.arr
+                Z, J = Z.compose(Y, Jr=True, out=Z)
+                np.testing.assert_allclose((X * Y).arr, Z.arr, atol=1e-12)
+                np.testing.assert_allclose(np.asarray(J_true), np.asarray(J), atol=1e-12)
+                Z, J = Z.inv(Jr=True, out=Z)
+                np.testing.assert_allclose((X * Y).inv().arr, Z.arr, atol=1e-12)
+                np.testing.assert_allclose(np.asarray((X * Y).inv(Jr=True)[1]), np.asarray(J), atol=1e-12)
+                Z, J = G.Exp(xi, Jl=True, out=Z)
+                np.testing.assert_allclose(np.asarray(G.Exp(xi, Jl=True)[1]), np.asarray(J), atol=1e-12)
+
+    def test_compose_into_an_operand(self):
+        # out is self or the second operand, the Jacobians are those of the operands before the write
+        for G, dof in GROUPS:
+            for i in range(20):
+                X, Y = G.random(), G.random()
+                for jac in ('Jr', 'Jl', 'Jr2', 'Jl2'):
+                    for Jin in (True, np.eye(dof)):
+                        res_true, J_true = X.compose(Y, **{jac: Jin})
+                        A, B = G.Identity(), G.Identity()
+                        A.arr[...], B.arr[...] = X.arr, Y.arr
+                        res, J = A.compose(B, out=A, **{jac: Jin})
+                        self.assertIs(A, res)
+                        np.testing.assert_allclose(res_true.arr, res.arr, atol=1e-12)
+                        np.testing.assert_allclose(np.asarray(J_true), np.asarray(J), atol=1e-12, err_msg=f'{G.__name__} {jac}')
+
+                        A, B = G.Identity(), G.Identity()
+                        A.arr[...], B.arr[...] = X.arr, Y.arr
+                        res, J = A.compose(B, out=B, **{jac: Jin})
+                        self.assertIs(B, res)
+                        np.testing.assert_allclose(res_true.arr, res.arr, atol=1e-12)
+                        np.testing.assert_allclose(np.asarray(J_true), np.asarray(J), atol=1e-12, err_msg=f'{G.__name__} {jac}')
+
+    def test_overwriting_clears_memoized_values(self):
+        q = Quaternion.random()
+        out = Quaternion.Identity()
+        out.R # Memoized before out is overwritten
+        q.compose(Quaternion.random(), out=out)
+        np.testing.assert_allclose(out.inv().q, out.q * np.array([1.0, -1.0, -1.0, -1.0]))
+        np.testing.assert_allclose(Quaternion(out.q).R, out.R)
+
+        T = SE3.random()
+        out = SE3.Identity()
+        out.R, out.Adj, out.inv() # Memoized before out is overwritten
+        T.inv(out=out)
+        np.testing.assert_allclose(T.inv().R, out.R)
+        np.testing.assert_allclose(T.inv().Adj, out.Adj)
+        np.testing.assert_allclose(T.arr, out.inv().arr)
+
+    def test_element_type(self):
+        ws = Workspace()
+        self.assertIs(ws.element('T', SE3), ws.element('T', SE3))
+        self.assertIn('T', ws)
+        with self.assertRaises(AssertionError):
+            ws.element('T', SO3)
+
+    def test_steady_state_does_not_allocate(self):
+        for G, dof in GROUPS:
+            ws = Workspace()
+            X, Y = G.random(), G.random()
+            xi = np.random.uniform(-1.0, 1.0, size=dof)
+
+            def step():
+                Z = X.compose(Y, out=ws.element('Z', G))
+                Z_inv = Z.inv(out=ws.element('Z_inv', G))
+                E = G.Exp(xi, out=ws.element('E', G))
+                G.Log(E, out=ws.vector('xi', dof))
+
+            step()
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            for i in range(1000):
+                step()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # Nothing outlives an iteration and only a few python floats are alive at once
+            self.assertLess(current - base, 1000, G.__name__)
+            self.assertLess(peak - base, 2048, G.__name__)
+
+
+if __name__=="__main__":
+    unittest.main()
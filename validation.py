@@ -0,0 +1,22 @@
+"""Global switch for the argument checks of the scalar group classes.
+
+By default the constructors and operations of SO2, SE2, SO3, Quaternion and
+SE3 check the shapes and types of their arguments. For tiny 2x2/3x3 operations
+these checks are a measurable fraction of the run time, so code that is known
+to pass well formed arguments can turn them off with set_validation(False)
+(running python with -O removes them as well). Results of the group
+operations are always built through the unchecked constructors (_unchecked)
+and never re-validate. The batch classes keep their checks since they are
+amortized over the whole batch.
+"""
+enabled = True
+
+def set_validation(enable):
+    """Turns the argument checks on or off and returns the previous setting."""
+    global enabled
+    previous = enabled
+    enabled = bool(enable)
+    return previous
+
+def validation_enabled():
+    return enabled
@@ -0,0 +1,45 @@
+"""Preallocated outputs for allocation free loops.
+
+compose, inv and Exp of SO3, Quaternion, SE2 and SE3 take an out= group
+element that is overwritten with the result, and Log takes an out= array.
+Without Jacobians these paths work on python floats and write straight into
+out, so no arrays or group objects are created. A Workspace hands out such
+outputs by name, creating them on first use:
+
+    ws = Workspace()
+    while running:
+        T_wc = T_wb.compose(T_bc, out=ws.element('T_wc', SE3))
+        xi = SE3.Log(T_wc, out=ws.vector('xi', 6))
+
+Every iteration after the first reuses the same objects, so a steady state
+loop does not leave garbage behind. An element is overwritten by the next
+operation that writes into it, and out must own its storage (an element from
+a workspace or Identity(), not a view such as the result of SO3.inv).
+Requesting Jacobians still allocates them.
+"""
+import numpy as np
+
+class Workspace:
+    def __init__(self):
+        self._outputs = {}
+
+    def element(self, name, group):
+        """The element of group stored under name, an identity on first use."""
+        X = self._outputs.get(name)
+        if X is None:
+            X = self._outputs[name] = group.Identity()
+        assert isinstance(X, group), f"{name} holds a {type(X).__name__}"
+        return X
+
+    def vector(self, name, dim):
+        """The (dim,) array stored under name, zeros on first use."""
+        v = self._outputs.get(name)
+        if v is None:
+            v = self._outputs[name] = np.zeros(dim)
+        return v
+
+    def __contains__(self, name):
+        return name in self._outputs
+
+    def __len__(self):
+        return len(self._outputs)